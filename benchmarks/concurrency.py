@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Drives concurrent validation and attachment hooks of the plugin against a
+local catalog stand-in and reports the throughput obtained for each number
+of threads. WStore must be importable, e.g.:
+
+    PYTHONPATH=/path/to/wstore/src python benchmarks/concurrency.py --threads 1,2,4,8
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from six.moves import BaseHTTPServer, queue, socketserver
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+class CatalogHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = os.path.join(self.server.wgt_dir, os.path.basename(self.path))
+        with open(path, 'rb') as f:
+            self._reply(f.read(), 'application/zip')
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.latency)
+        self._reply(b'{}', 'application/json')
+
+    def log_message(self, *args):
+        pass
+
+
+class CatalogServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+
+class BenchmarkAsset(object):
+
+    def __init__(self, pk, resource_path='', download_link=''):
+        self.pk = pk
+        self.resource_path = resource_path
+        self.download_link = download_link
+        self.content_type = None
+        self.meta_info = None
+
+    def save(self):
+        pass
+
+
+def run_hooks(plugin, assets, num_threads):
+    pending = queue.Queue()
+    for asset in assets:
+        pending.put(asset)
+
+    errors = []
+
+    def worker():
+        while True:
+            try:
+                asset = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                plugin.on_post_product_spec_validation(None, asset)
+                plugin.on_post_product_spec_attachment(asset, None, {
+                    'id': asset.pk,
+                    'productSpecCharacteristic': [{'name': 'Media type', 'productSpecCharacteristicValue': [{'value': ''}]}]
+                })
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker) for i in range(num_threads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return time.time() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', default='1,2,4,8', help='comma separated list of thread counts')
+    parser.add_argument('--assets', type=int, default=200, help='number of assets processed in each round')
+    parser.add_argument('--remote', action='store_true', help='download the wgt files from the stand-in server')
+    parser.add_argument('--latency', type=float, default=20, help='milliseconds taken by the catalog stand-in for each update')
+    parser.add_argument('--preferences', type=int, default=50, help='number of preferences of each widget')
+    args = parser.parse_args()
+
+    basedir = tempfile.mkdtemp()
+    wgt_dir = os.path.join(basedir, 'wgts')
+    os.mkdir(wgt_dir)
+
+    server = CatalogServer(('127.0.0.1', 0), CatalogHandler)
+    server.wgt_dir = wgt_dir
+    server.latency = args.latency / 1000.0
+    threading.Thread(target=server.serve_forever).start()
+    server_url = 'http://127.0.0.1:%d/' % server.server_address[1]
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(BASEDIR=basedir, CATALOG=server_url, STORE_NAME='benchmark', WSTOREMAIL='benchmark@example.com', USE_I18N=False)
+
+    from wirecloud_plugin.cache import get_parse_cache
+    from wirecloud_plugin.wirecloud_plugin import WirecloudPlugin
+
+    try:
+        # Every asset uses a different wgt file so the parse cache is only
+        # reused between the validation and the attachment hooks
+        assets = []
+        for i in range(args.assets):
+            file_name = 'widget%d.wgt' % i
+            with open(os.path.join(wgt_dir, file_name), 'wb') as f:
+                f.write(corpus.build_wgt(corpus.build_xml_widget(name='widget%d' % i, preferences=args.preferences)))
+
+            if args.remote:
+                assets.append(BenchmarkAsset(i, download_link=server_url + file_name))
+            else:
+                assets.append(BenchmarkAsset(i, resource_path='wgts/' + file_name))
+
+        plugin = WirecloudPlugin(None)
+        baseline = None
+        print('threads\telapsed (s)\tassets/s\tspeedup\terrors')
+        for num_threads in [int(value) for value in args.threads.split(',')]:
+            get_parse_cache().clear()
+            elapsed, errors = run_hooks(plugin, assets, num_threads)
+            throughput = len(assets) / elapsed
+            if baseline is None:
+                baseline = throughput
+
+            print('%d\t%.3f\t%.1f\t%.2f\t%d' % (num_threads, elapsed, throughput, throughput / baseline, len(errors)))
+    finally:
+        server.shutdown()
+        shutil.rmtree(basedir)
+
+
+if __name__ == '__main__':
+    main()
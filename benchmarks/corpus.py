@@ -0,0 +1,720 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Synthetic generator of wgt files used by the benchmarks
+"""
+
+from __future__ import unicode_literals
+
+import json
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape, quoteattr
+
+
+MACDESCRIPTION_NS = 'http://wirecloud.conwet.fi.upm.es/ns/macdescription/1'
+TEMPLATE_NS = 'http://wirecloud.conwet.fi.upm.es/ns/template#'
+
+
+def _attrs(**attrs):
+    return ''.join(' %s=%s' % (name, quoteattr(value)) for name, value in sorted(attrs.items()))
+
+
+def _details(title, description='Synthetic component used for benchmarking'):
+    return (
+        '<details>'
+        '<title>%s</title>'
+        '<authors>Benchmark author &lt;author@example.com&gt;</authors>'
+        '<contributors>First contributor, Second contributor &lt;second@example.com&gt;</contributors>'
+        '<email>author@example.com</email>'
+        '<description>%s</description>'
+        '<image>images/catalogue.png</image>'
+        '<doc>doc/index.md</doc>'
+        '<license>Apache License 2.0</license>'
+        '</details>'
+    ) % (escape(title), escape(description))
+
+
+def _requirements(requirements):
+    if requirements == 0:
+        return ''
+
+    return '<requirements>%s</requirements>' % ''.join('<feature name="feature%d"/>' % i for i in range(requirements))
+
+
+def _translate(text, lang):
+    return text if lang == 'en' else '%s (%s)' % (text, lang)
+
+
+class _Translator(object):
+    """
+    Replaces texts by translation indexes when the template has to be
+    translated, collecting the messages for the translations element
+    """
+
+    def __init__(self, languages):
+        self.languages = languages
+        self.messages = []
+
+    def __call__(self, index, text):
+        if self.languages == 0:
+            return text
+
+        self.messages.append((index, text))
+        return '__MSG_%s__' % index
+
+    def get_languages(self):
+        return ['en'] + ['x-lang%d' % i for i in range(self.languages)]
+
+    def get_catalogues(self):
+        return dict((lang, dict((index, _translate(text, lang)) for index, text in self.messages)) for lang in self.get_languages())
+
+    def render(self, translations_tag='translations', translation_tag='translation'):
+        if self.languages == 0:
+            return ''
+
+        parts = ['<%s default="en">' % translations_tag]
+        for lang in self.get_languages():
+            parts.append('<%s lang="%s">' % (translation_tag, lang))
+            for index, text in self.messages:
+                parts.append('<msg name=%s>%s</msg>' % (quoteattr(index), escape(_translate(text, lang))))
+            parts.append('</%s>' % translation_tag)
+        parts.append('</%s>' % translations_tag)
+
+        return ''.join(parts)
+
+
+
+def _build_xml_component(root, name, vendor, version, preferences, options, properties, inputs, outputs, translations, requirements, reverse_sections):
+    _ = _Translator(translations)
+    sections = [
+        _details(_('title', 'Benchmark %s %s' % (root, name)), _('description', 'Synthetic component used for benchmarking')),
+        _requirements(requirements),
+    ]
+
+    parts = ['<preferences>']
+    for i in range(preferences):
+        label = _('pref%d_label' % i, 'Preference %d' % i)
+        if options > 0 and i % 2 == 0:
+            parts.append('<preference%s>' % _attrs(name='pref%d' % i, type='list', label=label, description=_('pref%d_description' % i, 'List preference %d' % i), default='option0'))
+            for j in range(options):
+                parts.append('<option%s/>' % _attrs(label=_('pref%d_option%d' % (i, j), 'Option %d' % j), value='option%d' % j))
+            parts.append('</preference>')
+        else:
+            parts.append('<preference%s/>' % _attrs(name='pref%d' % i, type='text', label=label, description=_('pref%d_description' % i, 'Text preference %d' % i), default='value%d' % i))
+    parts.append('</preferences>')
+    sections.append(''.join(parts))
+
+    parts = ['<persistentvariables>']
+    for i in range(properties):
+        parts.append('<variable%s/>' % _attrs(name='prop%d' % i, type='text', label=_('prop%d_label' % i, 'Property %d' % i), description='Property %d' % i))
+    parts.append('</persistentvariables>')
+    sections.append(''.join(parts))
+
+    parts = ['<wiring>']
+    for i in range(outputs):
+        parts.append('<outputendpoint%s/>' % _attrs(name='output%d' % i, type='text', label=_('output%d_label' % i, 'Output %d' % i), description='Output endpoint %d' % i, friendcode='data'))
+    for i in range(inputs):
+        parts.append('<inputendpoint%s/>' % _attrs(name='input%d' % i, type='text', label=_('input%d_label' % i, 'Input %d' % i), actionlabel='Use %d' % i, description='Input endpoint %d' % i, friendcode='data'))
+    parts.append('</wiring>')
+    sections.append(''.join(parts))
+
+    if root == 'widget':
+        sections.append(
+            '<contents src="index.html" contenttype="text/html" charset="utf-8" useplatformstyle="true">'
+            '<altcontents scope="smartphone" src="mobile.html"/>'
+            '</contents>'
+        )
+        sections.append('<rendering width="33%" height="30"/>')
+    else:
+        sections.append('<scripts><script src="js/main.js"/><script src="js/lib.js"/></scripts>')
+
+    sections.append(_.render())
+
+    if reverse_sections:
+        sections.reverse()
+
+    template = '<?xml version="1.0" encoding="UTF-8"?><%s xmlns="%s"%s>%s</%s>' % (root, MACDESCRIPTION_NS, _attrs(vendor=vendor, name=name, version=version), ''.join(sections), root)
+    return template.encode('utf-8')
+
+
+def build_xml_widget(name='widget', vendor='Benchmark', version='1.0', preferences=10, options=3, properties=5, inputs=5, outputs=5, translations=0, requirements=0, reverse_sections=False):
+    return _build_xml_component('widget', name, vendor, version, preferences, options, properties, inputs, outputs, translations, requirements, reverse_sections)
+
+
+def build_xml_operator(name='operator', vendor='Benchmark', version='1.0', preferences=10, options=3, properties=5, inputs=5, outputs=5, translations=0, requirements=0, reverse_sections=False):
+    return _build_xml_component('operator', name, vendor, version, preferences, options, properties, inputs, outputs, translations, requirements, reverse_sections)
+
+
+def build_xml_mashup(name='mashup', vendor='Benchmark', version='1.0', tabs=2, resources=10, preferences=3, connections=20, operators=2,
+                     behaviours=0, params=0, embedded=0, translations=0, requirements=0, wiring_version='2.0', reverse_sections=False):
+    _ = _Translator(translations)
+    sections = [
+        _details(_('title', 'Benchmark mashup %s' % name), _('description', 'Synthetic component used for benchmarking')),
+        _requirements(requirements),
+    ]
+
+    if params > 0:
+        sections.append('<preferences>%s</preferences>' % ''.join('<preference%s/>' % _attrs(name='param%d' % i, type='text', label='Parameter %d' % i) for i in range(params)))
+
+    if embedded > 0:
+        sections.append('<embedded>%s</embedded>' % ''.join('<resource%s/>' % _attrs(vendor=vendor, name='widget%d' % i, version='1.0', src='macs/widget%d.wgt' % i) for i in range(embedded)))
+
+    parts = ['<structure>']
+    parts.append('<preferencevalue name="columns" value="20"/>')
+
+    widget_ids = []
+    for t in range(tabs):
+        parts.append('<tab%s>' % _attrs(id=str(t), name='Tab %d' % t))
+        parts.append('<preferencevalue name="smart" value="false"/>')
+        for r in range(resources):
+            resource_id = '%d' % (t * resources + r)
+            widget_ids.append(resource_id)
+            parts.append('<resource%s>' % _attrs(id=resource_id, vendor=vendor, name='widget%d' % (r % 5), version='1.0', title='Widget %s' % resource_id))
+            parts.append('<position x="%d" y="%d" z="%d"/>' % (r, r * 2, r))
+            parts.append('<rendering width="6" height="24" layout="0" minimized="false" fulldragboard="false"/>')
+            for p in range(preferences):
+                parts.append('<preferencevalue%s/>' % _attrs(name='pref%d' % p, value='value%d' % p, readonly='false', hidden='false'))
+                parts.append('<variablevalue%s/>' % _attrs(name='prop%d' % p, value='value%d' % p, readonly='false'))
+            parts.append('</resource>')
+        parts.append('</tab>')
+
+    parts.append('<wiring version=%s>' % quoteattr(wiring_version))
+    for o in range(operators):
+        parts.append('<operator%s>' % _attrs(id=str(o), vendor=vendor, name='operator%d' % o, version='1.0'))
+        parts.append('<preferencevalue name="pref0" value="value0"/>')
+        parts.append('</operator>')
+
+    component_type = 'widget' if wiring_version == '2.0' else 'iwidget'
+    connection_names = []
+    for c in range(connections):
+        source = widget_ids[c % len(widget_ids)] if widget_ids else '0'
+        target = widget_ids[(c + 1) % len(widget_ids)] if widget_ids else '0'
+        connection_names.append(('widget/%s/output%d' % (source, c % 5), 'widget/%s/input%d' % (target, c % 5)))
+        parts.append('<connection>')
+        parts.append('<source%s/>' % _attrs(type=component_type, id=source, endpoint='output%d' % (c % 5)))
+        parts.append('<target%s/>' % _attrs(type=component_type, id=target, endpoint='input%d' % (c % 5)))
+        parts.append('</connection>')
+
+    if wiring_version == '2.0':
+        parts.append('<visualdescription>')
+        for widget_id in widget_ids:
+            parts.append('<component type="widget" id=%s><position x="10" y="20"/><sources><endpoint>output0</endpoint></sources><targets><endpoint>input0</endpoint></targets></component>' % quoteattr(widget_id))
+        for i, (sourcename, targetname) in enumerate(connection_names):
+            handles = '<sourcehandle x="%d" y="10"/><targethandle x="%d" y="20"/>' % (i, i) if i % 2 == 0 else ''
+            parts.append('<connection%s>%s</connection>' % (_attrs(sourcename=sourcename, targetname=targetname), handles))
+        for b in range(behaviours):
+            parts.append('<behaviour%s>' % _attrs(title='Behaviour %d' % b, description='Behaviour %d description' % b))
+            for widget_id in widget_ids[b::max(behaviours, 1)]:
+                parts.append('<component type="widget" id=%s collapsed="true"/>' % quoteattr(widget_id))
+            for sourcename, targetname in connection_names[b::max(behaviours, 1)]:
+                parts.append('<connection%s/>' % _attrs(sourcename=sourcename, targetname=targetname))
+            parts.append('</behaviour>')
+        parts.append('</visualdescription>')
+
+    parts.append('</wiring>')
+    parts.append('</structure>')
+    sections.append(''.join(parts))
+
+    sections.append(_.render())
+
+    if reverse_sections:
+        sections.reverse()
+
+    template = '<?xml version="1.0" encoding="UTF-8"?><mashup xmlns="%s"%s>%s</mashup>' % (MACDESCRIPTION_NS, _attrs(vendor=vendor, name=name, version=version), ''.join(sections))
+    return template.encode('utf-8')
+
+
+def _legacy_description(_, name, vendor, version, title):
+    return (
+        '<Vendor>%s</Vendor><Name>%s</Name><Version>%s</Version>'
+        '<DisplayName>%s</DisplayName>'
+        '<Author>Benchmark author</Author><Mail>author@example.com</Mail>'
+        '<Description>%s</Description>'
+    ) % (escape(vendor), escape(name), escape(version), escape(_('title', title)), escape(_('description', 'Synthetic component used for benchmarking')))
+
+
+def build_legacy_widget(name='widget', vendor='Benchmark', version='1.0', preferences=10, options=3, properties=5, inputs=5, outputs=5, translations=0):
+    _ = _Translator(translations)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>']
+    parts.append('<Template xmlns="%s">' % TEMPLATE_NS)
+    parts.append('<Catalog.ResourceDescription>')
+    parts.append(_legacy_description(_, name, vendor, version, 'Benchmark widget %s' % name))
+    parts.append('<ImageURI>images/catalogue.png</ImageURI><WikiURI>doc/index.html</WikiURI>')
+    parts.append('</Catalog.ResourceDescription>')
+
+    parts.append('<Platform.Preferences>')
+    for i in range(preferences):
+        label = _('pref%d_label' % i, 'Preference %d' % i)
+        if options > 0 and i % 2 == 0:
+            parts.append('<Preference%s>' % _attrs(name='pref%d' % i, type='list', label=label, description='List preference %d' % i, default='option0'))
+            for j in range(options):
+                parts.append('<Option%s/>' % _attrs(name=_('pref%d_option%d' % (i, j), 'Option %d' % j), value='option%d' % j))
+            parts.append('</Preference>')
+        else:
+            parts.append('<Preference%s/>' % _attrs(name='pref%d' % i, type='text', label=label, description='Text preference %d' % i, default='value%d' % i))
+    parts.append('</Platform.Preferences>')
+
+    parts.append('<Platform.StateProperties>')
+    for i in range(properties):
+        parts.append('<Property%s/>' % _attrs(name='prop%d' % i, type='text', label=_('prop%d_label' % i, 'Property %d' % i)))
+    parts.append('</Platform.StateProperties>')
+
+    parts.append('<Platform.Wiring>')
+    for i in range(outputs):
+        parts.append('<OutputEndpoint%s/>' % _attrs(name='output%d' % i, type='text', label=_('output%d_label' % i, 'Output %d' % i), friendcode='data'))
+    for i in range(inputs):
+        parts.append('<InputEndpoint%s/>' % _attrs(name='input%d' % i, type='text', label=_('input%d_label' % i, 'Input %d' % i), actionlabel='Use %d' % i, friendcode='data'))
+    parts.append('</Platform.Wiring>')
+
+    parts.append('<Platform.Link><XHTML href="index.html"/></Platform.Link>')
+    parts.append('<Platform.Rendering width="6" height="24"/>')
+    parts.append(_.render('Translations', 'Translation'))
+    parts.append('</Template>')
+
+    return ''.join(parts).encode('utf-8')
+
+
+def build_legacy_mashup(name='mashup', vendor='Benchmark', version='1.0', tabs=2, resources=10, preferences=3, connections=20, operators=2, translations=0):
+    _ = _Translator(translations)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>']
+    parts.append('<Template xmlns="%s">' % TEMPLATE_NS)
+    parts.append('<Catalog.ResourceDescription>')
+    parts.append(_legacy_description(_, name, vendor, version, 'Benchmark mashup %s' % name))
+    parts.append('<IncludedResources>')
+    parts.append('<Preference name="columns" value="20"/>')
+
+    widget_ids = []
+    for t in range(tabs):
+        parts.append('<Tab%s>' % _attrs(id=str(t), name='Tab %d' % t))
+        for r in range(resources):
+            resource_id = '%d' % (t * resources + r)
+            widget_ids.append(resource_id)
+            parts.append('<Resource%s>' % _attrs(id=resource_id, vendor=vendor, name='widget%d' % (r % 5), version='1.0', title='Widget %s' % resource_id))
+            parts.append('<Position x="%d" y="%d" z="%d"/>' % (r, r * 2, r))
+            parts.append('<Rendering width="6" height="24" layout="0" minimized="false" fulldragboard="false"/>')
+            for p in range(preferences):
+                parts.append('<Preference%s/>' % _attrs(name='pref%d' % p, value='value%d' % p, readonly='false', hidden='false'))
+                parts.append('<Property%s/>' % _attrs(name='prop%d' % p, value='value%d' % p, readonly='false'))
+            parts.append('</Resource>')
+        parts.append('</Tab>')
+    parts.append('</IncludedResources>')
+    parts.append('</Catalog.ResourceDescription>')
+
+    parts.append('<Platform.Wiring>')
+    for o in range(operators):
+        parts.append('<Operator%s><Preference name="pref0" value="value0"/></Operator>' % _attrs(id=str(o), name='%s/operator%d/1.0' % (vendor, o)))
+    for c in range(connections):
+        source = widget_ids[c % len(widget_ids)] if widget_ids else '0'
+        target = widget_ids[(c + 1) % len(widget_ids)] if widget_ids else '0'
+        parts.append('<Connection>')
+        parts.append('<Source%s/>' % _attrs(type='iwidget', id=source, endpoint='output%d' % (c % 5)))
+        parts.append('<Target%s/>' % _attrs(type='iwidget', id=target, endpoint='input%d' % (c % 5)))
+        parts.append('</Connection>')
+    parts.append('</Platform.Wiring>')
+    parts.append(_.render('Translations', 'Translation'))
+    parts.append('</Template>')
+
+    return ''.join(parts).encode('utf-8')
+
+
+def _add_json_translations(_, resource):
+    if _.languages > 0:
+        resource['default_lang'] = 'en'
+        resource['translations'] = _.get_catalogues()
+
+
+def build_json_widget(name='widget', vendor='Benchmark', version='1.0', preferences=10, options=3, properties=5, inputs=5, outputs=5, translations=0):
+    _ = _Translator(translations)
+    widget = {
+        'type': 'widget',
+        'vendor': vendor,
+        'name': name,
+        'version': version,
+        'title': _('title', 'Benchmark widget %s' % name),
+        'description': _('description', 'Synthetic component used for benchmarking'),
+        'authors': 'Benchmark author <author@example.com>',
+        'image': 'images/catalogue.png',
+        'doc': 'doc/index.md',
+        'preferences': [],
+        'properties': [],
+        'wiring': {'inputs': [], 'outputs': []},
+        'contents': {'src': 'index.html', 'contenttype': 'text/html', 'charset': 'utf-8', 'useplatformstyle': True},
+        'altcontents': [{'scope': 'smartphone', 'src': 'mobile.html'}],
+        'widget_width': '33%',
+        'widget_height': '30',
+    }
+
+    for i in range(preferences):
+        preference = {'name': 'pref%d' % i, 'type': 'text', 'label': _('pref%d_label' % i, 'Preference %d' % i), 'description': 'Preference %d' % i, 'default': 'value%d' % i}
+        if options > 0 and i % 2 == 0:
+            preference['type'] = 'list'
+            preference['options'] = [{'label': _('pref%d_option%d' % (i, j), 'Option %d' % j), 'value': 'option%d' % j} for j in range(options)]
+        widget['preferences'].append(preference)
+
+    for i in range(properties):
+        widget['properties'].append({'name': 'prop%d' % i, 'type': 'text', 'label': _('prop%d_label' % i, 'Property %d' % i), 'description': 'Property %d' % i})
+
+    for i in range(outputs):
+        widget['wiring']['outputs'].append({'name': 'output%d' % i, 'type': 'text', 'label': _('output%d_label' % i, 'Output %d' % i), 'description': 'Output endpoint %d' % i, 'friendcode': 'data'})
+
+    for i in range(inputs):
+        widget['wiring']['inputs'].append({'name': 'input%d' % i, 'type': 'text', 'label': _('input%d_label' % i, 'Input %d' % i), 'actionlabel': 'Use %d' % i, 'description': 'Input endpoint %d' % i, 'friendcode': 'data'})
+
+    _add_json_translations(_, widget)
+    return json.dumps(widget).encode('utf-8')
+
+
+def build_json_mashup(name='mashup', vendor='Benchmark', version='1.0', tabs=2, resources=10, preferences=3, connections=20, operators=2, translations=0):
+    _ = _Translator(translations)
+    mashup = {
+        'type': 'mashup',
+        'vendor': vendor,
+        'name': name,
+        'version': version,
+        'title': _('title', 'Benchmark mashup %s' % name),
+        'description': _('description', 'Synthetic component used for benchmarking'),
+        'authors': 'Benchmark author <author@example.com>',
+        'preferences': {'columns': '20'},
+        'params': [],
+        'embedded': [],
+        'tabs': [],
+        'wiring': {
+            'version': '2.0',
+            'inputs': [],
+            'outputs': [],
+            'operators': {},
+            'connections': [],
+            'visualdescription': {'components': {'operator': {}, 'widget': {}}, 'connections': [], 'behaviours': []},
+        },
+    }
+
+    widget_ids = []
+    for t in range(tabs):
+        tab = {'name': 'Tab %d' % t, 'preferences': {}, 'resources': []}
+        for r in range(resources):
+            resource_id = '%d' % (t * resources + r)
+            widget_ids.append(resource_id)
+            tab['resources'].append({
+                'id': resource_id,
+                'vendor': vendor,
+                'name': 'widget%d' % (r % 5),
+                'version': '1.0',
+                'title': 'Widget %s' % resource_id,
+                'readonly': False,
+                'position': {'x': str(r), 'y': str(r * 2), 'z': str(r)},
+                'rendering': {'width': '6', 'height': '24', 'layout': '0', 'minimized': False, 'fulldragboard': False},
+                'preferences': dict(('pref%d' % p, {'value': 'value%d' % p, 'readonly': False, 'hidden': False}) for p in range(preferences)),
+                'properties': dict(('prop%d' % p, {'value': 'value%d' % p, 'readonly': False}) for p in range(preferences)),
+            })
+        mashup['tabs'].append(tab)
+
+    for o in range(operators):
+        mashup['wiring']['operators'][str(o)] = {'id': str(o), 'name': '%s/operator%d/1.0' % (vendor, o), 'preferences': {}}
+
+    for c in range(connections):
+        mashup['wiring']['connections'].append({
+            'readonly': False,
+            'source': {'type': 'widget', 'id': widget_ids[c % len(widget_ids)] if widget_ids else '0', 'endpoint': 'output%d' % (c % 5)},
+            'target': {'type': 'widget', 'id': widget_ids[(c + 1) % len(widget_ids)] if widget_ids else '0', 'endpoint': 'input%d' % (c % 5)},
+        })
+
+    _add_json_translations(_, mashup)
+    return json.dumps(mashup).encode('utf-8')
+
+
+def _build_rdf_graph():
+    import rdflib
+
+    graph = rdflib.Graph()
+    namespaces = {
+        'wire': rdflib.Namespace('http://wirecloud.conwet.fi.upm.es/ns/widget#'),
+        'wire_m': rdflib.Namespace('http://wirecloud.conwet.fi.upm.es/ns/mashup#'),
+        'foaf': rdflib.Namespace('http://xmlns.com/foaf/0.1/'),
+        'usdl': rdflib.Namespace('http://www.linked-usdl.org/ns/usdl-core#'),
+        'dcterms': rdflib.Namespace('http://purl.org/dc/terms/'),
+        'rdfs': rdflib.Namespace('http://www.w3.org/2000/01/rdf-schema#'),
+    }
+    for prefix, namespace in namespaces.items():
+        graph.bind(prefix, namespace)
+
+    return rdflib, graph, namespaces
+
+
+def _serialize_rdf(graph, rdf_format):
+    contents = graph.serialize(format=rdf_format)
+    if not isinstance(contents, bytes):
+        contents = contents.encode('utf-8')
+
+    return contents
+
+
+def _add_rdf_text(rdflib, graph, subject, predicate, text, translations):
+    graph.add((subject, predicate, rdflib.Literal(text)))
+    for i in range(translations):
+        lang = 'x-lang%d' % i
+        graph.add((subject, predicate, rdflib.Literal(_translate(text, lang), lang=lang)))
+
+
+def _add_rdf_basic_info(rdflib, graph, ns, root, resource_type, name, vendor, version, title, translations):
+    graph.add((root, rdflib.RDF.type, resource_type))
+
+    provider = rdflib.BNode()
+    graph.add((root, ns['usdl']['hasProvider'], provider))
+    graph.add((provider, ns['foaf']['name'], rdflib.Literal(vendor)))
+
+    graph.add((root, ns['dcterms']['title'], rdflib.Literal(name)))
+    graph.add((root, ns['usdl']['versionInfo'], rdflib.Literal(version)))
+    _add_rdf_text(rdflib, graph, root, ns['wire']['displayName'], title, translations)
+    _add_rdf_text(rdflib, graph, root, ns['dcterms']['abstract'], 'Synthetic component used for benchmarking', translations)
+    graph.add((root, ns['wire']['hasImageUri'], rdflib.URIRef('images/catalogue.png')))
+
+    author = rdflib.BNode()
+    graph.add((root, ns['dcterms']['creator'], author))
+    graph.add((author, ns['foaf']['name'], rdflib.Literal('Benchmark author')))
+
+
+def build_rdf_widget(name='widget', vendor='Benchmark', version='1.0', preferences=10, options=3, properties=5, inputs=5, outputs=5, translations=0, rdf_format='xml'):
+    rdflib, graph, ns = _build_rdf_graph()
+    wire, dcterms, rdfs = ns['wire'], ns['dcterms'], ns['rdfs']
+
+    widget = rdflib.URIRef('http://example.com/%s/%s/%s' % (vendor, name, version))
+    _add_rdf_basic_info(rdflib, graph, ns, widget, wire['Widget'], name, vendor, version, 'Benchmark widget %s' % name, translations)
+
+    for i in range(preferences):
+        preference = rdflib.BNode()
+        graph.add((widget, wire['hasPlatformPreference'], preference))
+        graph.add((preference, dcterms['title'], rdflib.Literal('pref%d' % i)))
+        _add_rdf_text(rdflib, graph, preference, rdfs['label'], 'Preference %d' % i, translations)
+        graph.add((preference, dcterms['description'], rdflib.Literal('Preference %d' % i)))
+        graph.add((preference, wire['default'], rdflib.Literal('value%d' % i)))
+        graph.add((preference, wire['index'], rdflib.Literal(str(i))))
+        if options > 0 and i % 2 == 0:
+            graph.add((preference, wire['type'], rdflib.Literal('list')))
+            for j in range(options):
+                option = rdflib.BNode()
+                graph.add((preference, wire['hasOption'], option))
+                graph.add((option, dcterms['title'], rdflib.Literal('Option %d' % j)))
+                graph.add((option, wire['value'], rdflib.Literal('option%d' % j)))
+                graph.add((option, wire['index'], rdflib.Literal(str(j))))
+        else:
+            graph.add((preference, wire['type'], rdflib.Literal('text')))
+
+    for i in range(properties):
+        prop = rdflib.BNode()
+        graph.add((widget, wire['hasPlatformStateProperty'], prop))
+        graph.add((prop, dcterms['title'], rdflib.Literal('prop%d' % i)))
+        graph.add((prop, wire['type'], rdflib.Literal('text')))
+        graph.add((prop, rdfs['label'], rdflib.Literal('Property %d' % i)))
+        graph.add((prop, wire['index'], rdflib.Literal(str(i))))
+
+    wiring = rdflib.BNode()
+    graph.add((widget, wire['hasPlatformWiring'], wiring))
+    for i in range(outputs):
+        endpoint = rdflib.BNode()
+        graph.add((wiring, wire['hasOutputEndpoint'], endpoint))
+        graph.add((endpoint, dcterms['title'], rdflib.Literal('output%d' % i)))
+        graph.add((endpoint, wire['type'], rdflib.Literal('text')))
+        _add_rdf_text(rdflib, graph, endpoint, rdfs['label'], 'Output %d' % i, translations)
+        graph.add((endpoint, wire['friendcode'], rdflib.Literal('data')))
+        graph.add((endpoint, wire['index'], rdflib.Literal(str(i))))
+    for i in range(inputs):
+        endpoint = rdflib.BNode()
+        graph.add((wiring, wire['hasInputEndpoint'], endpoint))
+        graph.add((endpoint, dcterms['title'], rdflib.Literal('input%d' % i)))
+        graph.add((endpoint, wire['type'], rdflib.Literal('text')))
+        _add_rdf_text(rdflib, graph, endpoint, rdfs['label'], 'Input %d' % i, translations)
+        graph.add((endpoint, wire['inputActionLabel'], rdflib.Literal('Use %d' % i)))
+        graph.add((endpoint, wire['friendcode'], rdflib.Literal('data')))
+        graph.add((endpoint, wire['index'], rdflib.Literal(str(i))))
+
+    contents = rdflib.URIRef('index.html')
+    graph.add((widget, ns['usdl']['utilizedResource'], contents))
+    graph.add((contents, wire['usePlatformStyle'], rdflib.Literal('true')))
+
+    rendering = rdflib.BNode()
+    graph.add((widget, wire['hasPlatformRendering'], rendering))
+    graph.add((rendering, wire['renderingWidth'], rdflib.Literal('6')))
+    graph.add((rendering, wire['renderingHeight'], rdflib.Literal('24')))
+
+    return _serialize_rdf(graph, rdf_format)
+
+
+def build_rdf_mashup(name='mashup', vendor='Benchmark', version='1.0', tabs=2, resources=10, preferences=3, connections=20, operators=2, translations=0, rdf_format='xml'):
+    rdflib, graph, ns = _build_rdf_graph()
+    wire, wire_m, dcterms, rdfs, usdl, foaf = ns['wire'], ns['wire_m'], ns['dcterms'], ns['rdfs'], ns['usdl'], ns['foaf']
+
+    mashup = rdflib.URIRef('http://example.com/%s/%s/%s' % (vendor, name, version))
+    _add_rdf_basic_info(rdflib, graph, ns, mashup, wire_m['Mashup'], name, vendor, version, 'Benchmark mashup %s' % name, translations)
+
+    widget_ids = []
+    for t in range(tabs):
+        tab = rdflib.BNode()
+        graph.add((mashup, wire_m['hasTab'], tab))
+        graph.add((tab, dcterms['title'], rdflib.Literal('Tab %d' % t)))
+        graph.add((tab, wire['index'], rdflib.Literal(str(t))))
+        for r in range(resources):
+            resource_id = '%d' % (t * resources + r)
+            widget_ids.append(resource_id)
+
+            resource = rdflib.BNode()
+            graph.add((tab, wire_m['hasiWidget'], resource))
+            graph.add((resource, wire_m['iWidgetId'], rdflib.Literal(resource_id)))
+            provider = rdflib.BNode()
+            graph.add((resource, usdl['hasProvider'], provider))
+            graph.add((provider, foaf['name'], rdflib.Literal(vendor)))
+            graph.add((resource, rdfs['label'], rdflib.Literal('widget%d' % (r % 5))))
+            graph.add((resource, usdl['versionInfo'], rdflib.Literal('1.0')))
+            graph.add((resource, dcterms['title'], rdflib.Literal('Widget %s' % resource_id)))
+
+            position = rdflib.BNode()
+            graph.add((resource, wire_m['hasPosition'], position))
+            graph.add((position, wire_m['x'], rdflib.Literal(str(r))))
+            graph.add((position, wire_m['y'], rdflib.Literal(str(r * 2))))
+            graph.add((position, wire_m['z'], rdflib.Literal(str(r))))
+
+            rendering = rdflib.BNode()
+            graph.add((resource, wire_m['hasiWidgetRendering'], rendering))
+            graph.add((rendering, wire['renderingWidth'], rdflib.Literal('6')))
+            graph.add((rendering, wire['renderingHeight'], rdflib.Literal('24')))
+            graph.add((rendering, wire_m['layout'], rdflib.Literal('0')))
+            graph.add((rendering, wire_m['fullDragboard'], rdflib.Literal('false')))
+            graph.add((rendering, wire_m['minimized'], rdflib.Literal('false')))
+
+            for p in range(preferences):
+                pref = rdflib.BNode()
+                graph.add((resource, wire_m['hasiWidgetPreference'], pref))
+                graph.add((pref, dcterms['title'], rdflib.Literal('pref%d' % p)))
+                graph.add((pref, wire['value'], rdflib.Literal('value%d' % p)))
+                prop = rdflib.BNode()
+                graph.add((resource, wire_m['hasiWidgetProperty'], prop))
+                graph.add((prop, dcterms['title'], rdflib.Literal('prop%d' % p)))
+                graph.add((prop, wire['value'], rdflib.Literal('value%d' % p)))
+
+    wiring = rdflib.BNode()
+    graph.add((mashup, wire_m['hasMashupWiring'], wiring))
+    graph.add((wiring, usdl['versionInfo'], rdflib.Literal('2.0')))
+
+    for o in range(operators):
+        operator = rdflib.BNode()
+        graph.add((wiring, wire_m['hasiOperator'], operator))
+        graph.add((operator, wire_m['iOperatorId'], rdflib.Literal(str(o))))
+        graph.add((operator, dcterms['title'], rdflib.Literal('%s/operator%d/1.0' % (vendor, o))))
+
+    for c in range(connections):
+        connection = rdflib.BNode()
+        graph.add((wiring, wire_m['hasConnection'], connection))
+        source = rdflib.BNode()
+        graph.add((connection, wire_m['hasSource'], source))
+        graph.add((source, wire_m['sourceId'], rdflib.Literal(widget_ids[c % len(widget_ids)] if widget_ids else '0')))
+        graph.add((source, wire_m['endpoint'], rdflib.Literal('output%d' % (c % 5))))
+        graph.add((source, wire['type'], rdflib.Literal('widget')))
+        target = rdflib.BNode()
+        graph.add((connection, wire_m['hasTarget'], target))
+        graph.add((target, wire_m['targetId'], rdflib.Literal(widget_ids[(c + 1) % len(widget_ids)] if widget_ids else '0')))
+        graph.add((target, wire_m['endpoint'], rdflib.Literal('input%d' % (c % 5))))
+        graph.add((target, wire['type'], rdflib.Literal('widget')))
+
+    return _serialize_rdf(graph, rdf_format)
+
+
+def build_wgt(template, template_filename='config.xml', extra_files=0, extra_file_size=1024):
+    """
+    Returns the contents of a wgt file including the given template and
+    extra_files additional members
+    """
+    output = BytesIO()
+
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as wgt:
+        wgt.writestr(template_filename, template)
+        wgt.writestr('index.html', '<!DOCTYPE html><html><body>Benchmark</body></html>')
+        for i in range(extra_files):
+            wgt.writestr('js/file%d.js' % i, ('// %d\n' % i) * (extra_file_size // 5 + 1))
+
+    return output.getvalue()
+
+
+def build_old_wiring_status(widgets=10, operators=2, connections=20, views=True):
+    """
+    Returns a wiring status using the old (1.0) wiring format, as accepted by
+    parse_wiring_old_version
+    """
+    status = {
+        'operators': {},
+        'connections': [],
+    }
+
+    for o in range(operators):
+        status['operators'][str(o)] = {
+            'id': str(o),
+            'name': 'Benchmark/operator%d/1.0' % o,
+            'preferences': {'pref0': {'value': 'value0', 'readOnly': False, 'hidden': False}},
+        }
+
+    for c in range(connections):
+        status['connections'].append({
+            'readOnly': False,
+            'source': {'type': 'iwidget', 'id': str(c % widgets), 'endpoint': 'output%d' % (c % 5)},
+            'target': {'type': 'iwidget', 'id': str((c + 1) % widgets), 'endpoint': 'input%d' % (c % 5)},
+        })
+
+    if views:
+        status['views'] = [{
+            'label': 'default',
+            'iwidgets': dict((str(w), {
+                'position': {'posX': w * 10, 'posY': w * 20},
+                'endPointsInOuts': {'sources': ['output0'], 'targets': ['input0']},
+                'name': 'Widget %d' % w,
+            }) for w in range(widgets)),
+            'operators': dict((str(o), {
+                'position': {'posX': o * 10, 'posY': 0},
+                'minimized': False,
+                'endPointsInOuts': {'sources': ['output0'], 'targets': ['input0']},
+            }) for o in range(operators)),
+            'connections': [{
+                'pullerStart': {'posX': c, 'posY': 10},
+                'pullerEnd': {'posX': c, 'posY': 20},
+            } for c in range(connections)],
+        }]
+
+    return status
+
+
+# Template flavours available through build_template
+FLAVOURS = ('xml', 'legacy', 'json', 'rdf-xml', 'rdf-n3')
+
+COMPONENT_KNOBS = ('preferences', 'options', 'properties', 'inputs', 'outputs', 'translations')
+MASHUP_KNOBS = ('tabs', 'resources', 'preferences', 'connections', 'operators', 'translations')
+
+
+def build_template(flavour, resource_type, **knobs):
+    """
+    Returns a template of the given flavour (see FLAVOURS) describing a
+    widget or a mashup. Knobs not applicable to the resource type are
+    ignored (e.g. connections for widgets).
+    """
+    accepted = MASHUP_KNOBS if resource_type == 'mashup' else COMPONENT_KNOBS
+    kwargs = dict((knob, value) for knob, value in knobs.items() if knob in accepted and value is not None)
+
+    if flavour.startswith('rdf-'):
+        kwargs['rdf_format'] = flavour[4:]
+        flavour = 'rdf'
+
+    return globals()['build_%s_%s' % (flavour, resource_type)](**kwargs)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time needed for resolving the dependencies of the mashups of a
+catalog by parsing again the templates of the mashups and of their
+components (one at a time) and by using the DependencyResolver index, both
+from scratch and after updating one of the components:
+
+    python benchmarks/dependencies.py [--rounds N] [--mashups N] [--check-only]
+
+A synthetic layered dependency graph (not expressible using templates, where
+only mashups have dependencies) is also used for measuring the memoization
+of deep transitive closures. On these graphs the first resolution is slower
+than a plain traversal, as the closures of all the intermediate components
+are also memoized.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_catalog(mashups):
+    templates = {}
+    for i in range(20):
+        templates['Benchmark/widget%d/1.0' % i] = corpus.build_xml_widget(name='widget%d' % i)
+    for i in range(5):
+        templates['Benchmark/operator%d/1.0' % i] = corpus.build_xml_operator(name='operator%d' % i)
+    # Some of the used widgets and operators are missing from the catalog
+    for i in range(mashups):
+        templates['Benchmark/mashup%d/1.0' % i] = corpus.build_xml_mashup(name='mashup%d' % i, tabs=2, resources=25, operators=8)
+
+    return templates
+
+
+def build_layered_graph(levels, width, seed=0):
+    rng = random.Random(seed)
+    graph = {}
+    for level in range(levels):
+        for i in range(width):
+            dependencies = set()
+            if level > 0:
+                dependencies.update('n%d-%d' % (level - 1, rng.randrange(width)) for j in range(3))
+                dependencies.add('missing%d' % rng.randrange(width))
+            graph['n%d-%d' % (level, i)] = dependencies
+
+    return graph
+
+
+def get_closure(graph, node):
+    closure = set()
+    pending = list(graph.get(node, ()))
+    while len(pending) > 0:
+        current = pending.pop()
+        if current not in closure:
+            closure.add(current)
+            pending.extend(graph.get(current, ()))
+
+    closure.discard(node)
+    return closure
+
+
+def resolve_by_parsing(templates, mashups):
+    from wirecloud_plugin.template import TemplateParser
+
+    results = {}
+    for mashup in mashups:
+        closure = set()
+        pending = list(TemplateParser(templates[mashup]).get_resource_dependencies())
+        while len(pending) > 0:
+            current = pending.pop()
+            if current not in closure:
+                closure.add(current)
+                if current in templates:
+                    pending.extend(TemplateParser(templates[current]).get_resource_dependencies())
+        results[mashup] = closure
+
+    return results
+
+
+def resolve_using_index(resolver, mashups):
+    return {mashup: resolver.get_closure(mashup) for mashup in mashups}
+
+
+def update_component(resolver, component, counter=[0]):
+    # Changes the dependencies of the component, invalidating the memoized
+    # info of the components depending on it
+    counter[0] += 1
+    resolver.add(component, ('Benchmark/new-dependency%d/1.0' % counter[0],))
+
+
+def check(templates, mashups, graph):
+    from wirecloud_plugin.template import TemplateParser
+    from wirecloud_plugin.template.dependencies import DependencyResolver
+
+    failures = 0
+
+    resolver = DependencyResolver()
+    for template in templates.values():
+        resolver.add_resource(TemplateParser(template).get_resource_info())
+
+    if resolve_by_parsing(templates, mashups) != resolve_using_index(resolver, mashups):
+        failures += 1
+        print('MISMATCH: catalog')
+
+    resolver = DependencyResolver()
+    for node, dependencies in graph.items():
+        resolver.add(node, dependencies)
+
+    for step in range(20):
+        for node in sorted(graph)[::37]:
+            closure = get_closure(graph, node)
+            order = resolver.get_install_order(node)
+            positions = dict((entry, i) for i, entry in enumerate(order))
+            if resolver.get_closure(node) != closure or set(order) != (closure | set((node,))) & set(graph) or \
+                    any(positions[dependency] > positions[entry] for entry in order for dependency in graph[entry] if dependency in graph):
+                failures += 1
+                print('MISMATCH: layered graph, step %d, node %s' % (step, node))
+
+        node = 'n%d-%d' % (step % 5, step)
+        graph[node] = set(('n0-%d' % step,)) if step % 5 > 0 else set()
+        resolver.add(node, graph[node])
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=3, help='number of times each measurement is repeated')
+    parser.add_argument('--mashups', type=int, default=100, help='number of mashups on the catalog')
+    parser.add_argument('--check-only', action='store_true', help='only check that the resolver returns the expected dependencies')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.template import TemplateParser
+    from wirecloud_plugin.template.dependencies import DependencyResolver
+
+    templates = build_catalog(args.mashups)
+    mashups = sorted(resource_id for resource_id in templates if '/mashup' in resource_id)
+
+    failures = check(templates, mashups, build_layered_graph(10, 200))
+    print('%d mismatches' % failures)
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('scenario\tstrategy\ttime (ms)')
+
+    def measure(func, setup=None):
+        times = []
+        for i in range(args.rounds):
+            state = setup() if setup is not None else None
+            times.append(timeit.timeit(lambda: func(state), number=1))
+        return min(times) * 1000
+
+    infos = [TemplateParser(template).get_resource_info() for template in templates.values()]
+
+    def build_resolver():
+        resolver = DependencyResolver()
+        for info in infos:
+            resolver.add_resource(info)
+        return resolver
+
+    def warm_resolver():
+        resolver = build_resolver()
+        resolve_using_index(resolver, mashups)
+        return resolver
+
+    def recheck(resolver):
+        update_component(resolver, 'Benchmark/widget0/1.0')
+        resolve_using_index(resolver, mashups)
+
+    scenario = 'catalog (%d mashups)' % len(mashups)
+    print('%s\tparsing the templates\t%.2f' % (scenario, measure(lambda state: resolve_by_parsing(templates, mashups))))
+    print('%s\tindexing the parsed info\t%.2f' % (scenario, measure(lambda state: build_resolver())))
+    print('%s\tresolver, cold\t%.2f' % (scenario, measure(lambda resolver: resolve_using_index(resolver, mashups), build_resolver)))
+    print('%s\tresolver, after an update\t%.2f' % (scenario, measure(recheck, warm_resolver)))
+
+    for levels, width in ((10, 200), (20, 250)):
+        graph = build_layered_graph(levels, width)
+        top = sorted(node for node in graph if node.startswith('n%d-' % (levels - 1)))
+
+        def build_graph_resolver():
+            resolver = DependencyResolver()
+            for node, dependencies in graph.items():
+                resolver.add(node, dependencies)
+            return resolver
+
+        def warm_graph_resolver():
+            resolver = build_graph_resolver()
+            resolve_using_index(resolver, top)
+            return resolver
+
+        def recheck_graph(resolver):
+            update_component(resolver, 'n%d-0' % (levels // 2))
+            resolve_using_index(resolver, top)
+
+        scenario = 'layered graph (%d nodes)' % len(graph)
+        print('%s\tgraph traversal\t%.2f' % (scenario, measure(lambda state: [get_closure(graph, node) for node in top])))
+        print('%s\tresolver, cold\t%.2f' % (scenario, measure(lambda resolver: resolve_using_index(resolver, top), build_graph_resolver)))
+        print('%s\tresolver, after an update\t%.2f' % (scenario, measure(recheck_graph, warm_graph_resolver)))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
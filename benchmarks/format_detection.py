@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time needed for building a TemplateParser for each of the
+supported template formats when the format is sniffed from the template
+contents and when all the parsers are tried in turn:
+
+    python benchmarks/format_detection.py [--rounds N] [--repeat N] [--preferences N]
+
+Sniffing only pays off for the formats whose parser is not the first one
+being tried: legacy XML templates (20-50% faster), JSON templates (15-20%)
+and RDF/XML widgets (13-28%; 0-7% for mashups, where graph building
+dominates). macdescription templates are already handled by the first
+parser of the trial loop and Turtle documents are rejected by the other
+parsers almost immediately, so the difference is within noise for both.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_templates(preferences):
+    return [
+        ('macdescription widget', corpus.build_xml_widget(preferences=preferences)),
+        ('macdescription mashup', corpus.build_xml_mashup()),
+        ('legacy widget', corpus.build_legacy_widget(preferences=preferences)),
+        ('legacy mashup', corpus.build_legacy_mashup()),
+        ('json widget', corpus.build_json_widget(preferences=preferences)),
+        ('json mashup', corpus.build_json_mashup()),
+        ('rdf/xml widget', corpus.build_rdf_widget(preferences=preferences, rdf_format='xml')),
+        ('rdf/xml mashup', corpus.build_rdf_mashup(rdf_format='xml')),
+        ('turtle widget', corpus.build_rdf_widget(preferences=preferences, rdf_format='turtle')),
+        ('turtle mashup', corpus.build_rdf_mashup(rdf_format='turtle')),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=50, help='number of parsers built for each template')
+    parser.add_argument('--repeat', type=int, default=10, help='number of interleaved timing runs, the best one is reported')
+    parser.add_argument('--preferences', type=int, default=10, help='number of preferences of each widget')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    # rdflib complains loudly about the failed parsing attempts
+    logging.disable(logging.CRITICAL)
+
+    from wirecloud_plugin.template import TemplateParser
+
+    class TrialTemplateParser(TemplateParser):
+
+        def _get_candidate_parsers(self, template):
+            return [(parser, (template,)) for parser in self.parsers]
+
+    print('template\ttrial (ms)\tsniffing (ms)\tsaving (ms)\tsaving (%)')
+    for name, template in build_templates(args.preferences):
+        # Interleave both approaches so they are equally affected by noise
+        trial_timer = timeit.Timer(lambda: TrialTemplateParser(template))
+        sniffing_timer = timeit.Timer(lambda: TemplateParser(template))
+        trial_times = []
+        sniffing_times = []
+        for i in range(args.repeat):
+            trial_times.append(trial_timer.timeit(number=args.rounds))
+            sniffing_times.append(sniffing_timer.timeit(number=args.rounds))
+        trial = min(trial_times) / args.rounds * 1000
+        sniffing = min(sniffing_times) / args.rounds * 1000
+
+        print('%s\t%.3f\t%.3f\t%.3f\t%.1f' % (name, trial, sniffing, trial - sniffing, (trial - sniffing) / trial * 100))
+
+
+if __name__ == '__main__':
+    main()
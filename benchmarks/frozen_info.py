@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that thawing the frozen info of a template returns the info provided by
+get_resource_info and compares the time needed for handing the info of a
+parsed template to a reader by deep copying it (as the parse cache used to
+do), by thawing the frozen info and by sharing the frozen info:
+
+    python benchmarks/frozen_info.py [--rounds N] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from copy import deepcopy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_corpus():
+    return (
+        ('widget', corpus.build_xml_widget()),
+        ('widget, large', corpus.build_xml_widget(preferences=200, options=10, properties=100, inputs=100, outputs=100, translations=5)),
+        ('mashup', corpus.build_xml_mashup()),
+        ('mashup, large', corpus.build_xml_mashup(tabs=10, resources=20, connections=500, operators=10, behaviours=5)),
+        ('json mashup', corpus.build_json_mashup()),
+        ('rdf widget', corpus.build_rdf_widget()),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=50, help='number of times the info of each template is handed')
+    parser.add_argument('--check-only', action='store_true', help='only check that the thawed info matches the original one')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.template import TemplateParser
+
+    infos = []
+    failures = 0
+    for name, template in build_corpus():
+        template_parser = TemplateParser(template)
+        info = template_parser.get_resource_info()
+        frozen_info = template_parser.get_frozen_resource_info()
+        infos.append((name, info, frozen_info))
+
+        expected = json.dumps(info, sort_keys=True)
+        if json.dumps(frozen_info.thaw(), sort_keys=True) != expected or json.dumps(frozen_info, sort_keys=True) != expected:
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+    print('%d templates checked, %d mismatches' % (len(infos), failures))
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('template\tdeepcopy (ms)\tthaw (ms)\tshared (ms)\tthaw speedup')
+    for name, info, frozen_info in infos:
+        deepcopy_time = min(timeit.repeat(lambda: deepcopy(info), number=args.rounds, repeat=3)) / args.rounds * 1000
+        thaw_time = min(timeit.repeat(lambda: frozen_info.thaw(), number=args.rounds, repeat=3)) / args.rounds * 1000
+        shared_time = min(timeit.repeat(lambda: frozen_info, number=args.rounds, repeat=3)) / args.rounds * 1000
+
+        print('%s\t%.3f\t%.3f\t%.5f\t%.2f' % (name, deepcopy_time, thaw_time, shared_time, deepcopy_time / thaw_time))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures, using fresh interpreters, the time needed for importing the
+template parsers and the extra time paid when the XML schema and the RDF
+parser are loaded on first use:
+
+    python benchmarks/import_time.py [--runs N]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = '''
+import sys, time
+sys.path.insert(0, %r)
+from django.conf import settings
+settings.configure(USE_I18N=False)
+import django.utils.translation
+start = time.time()
+''' % ROOT_DIR
+
+SCENARIOS = (
+    ('import', 'import wirecloud_plugin.template'),
+    ('import + xml schema', 'import wirecloud_plugin.template\nfrom wirecloud_plugin.template.parsers.xml import get_xml_schema\nget_xml_schema()'),
+    ('import + rdf parser', 'import wirecloud_plugin.template\nimport wirecloud_plugin.template.parsers.rdf'),
+    ('import + both (eager)', 'import wirecloud_plugin.template\nfrom wirecloud_plugin.template.parsers.xml import get_xml_schema\nget_xml_schema()\nimport wirecloud_plugin.template.parsers.rdf'),
+)
+
+
+def measure(code):
+    script = SETUP + code + '\nprint(time.time() - start)\n'
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return float(output.decode('ascii').strip()) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='number of interpreters launched for each scenario')
+    args = parser.parse_args()
+
+    print('scenario\tmin (ms)\tmedian (ms)')
+    for name, code in SCENARIOS:
+        timings = sorted(measure(code) for i in range(args.runs))
+        print('%s\t%.1f\t%.1f' % (name, timings[0], timings[len(timings) // 2]))
+
+
+if __name__ == '__main__':
+    main()
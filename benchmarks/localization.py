@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time needed for rendering the processed info of a template in
+all its languages using one get_resource_processed_info call per language
+and using the batch get_resource_processed_infos API (the first batch of a
+parser also freezes the shared info), with and without memoized results. It also checks that modifying the processed info does not
+affect the info returned by later calls:
+
+    python benchmarks/localization.py [--rounds N] [--languages N] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def modify_processed_info(info):
+    if info['type'] == 'mashup':
+        info['tabs'][0]['resources'][0]['title'] = 'HACKED'
+        info['wiring']['connections'].append(dict(info['wiring']['connections'][0]))
+    else:
+        info['preferences'][0]['value'] = 'HACKED'
+        info['variables']['all'][info['preferences'][0]['name']]['label'] = 'HACKED'
+        info['wiring']['inputs'].pop()
+
+
+def check_isolation(name, template_parser, lang):
+    failures = 0
+    info = json.dumps(template_parser.get_resource_info(), sort_keys=True)
+    processed_info = json.dumps(template_parser.get_resource_processed_info(lang=lang, process_variables=True), sort_keys=True)
+
+    modify_processed_info(template_parser.get_resource_processed_info(lang=lang, process_variables=True))
+
+    if json.dumps(template_parser.get_resource_info(), sort_keys=True) != info:
+        failures += 1
+        print('INFO MODIFIED: %s' % name)
+
+    if json.dumps(template_parser.get_resource_processed_info(lang=lang, process_variables=True), sort_keys=True) != processed_info:
+        failures += 1
+        print('PROCESSED INFO MODIFIED: %s' % name)
+
+    # Variables are still the definitions of the returned info
+    variables_info = template_parser.get_resource_processed_info(lang=lang, process_variables=True)
+    if variables_info['type'] != 'mashup' and variables_info['variables']['all'][variables_info['preferences'][0]['name']] is not variables_info['preferences'][0]:
+        failures += 1
+        print('VARIABLES NOT SHARED: %s' % name)
+
+    # Batch results are read only
+    batch_info = template_parser.get_resource_processed_infos(langs=[lang], process_variables=True)[lang]
+    try:
+        modify_processed_info(batch_info)
+    except TypeError:
+        pass
+    else:
+        failures += 1
+        print('BATCH RESULT MODIFIED: %s' % name)
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=50, help='number of times each template is rendered')
+    parser.add_argument('--languages', type=int, default=10, help='number of languages provided by each template')
+    parser.add_argument('--check-only', action='store_true', help='only check the rendered infos')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.cache import get_processed_info_cache
+    from wirecloud_plugin.template import TemplateParser
+
+    templates = (
+        ('widget', corpus.build_xml_widget(preferences=50, options=5, properties=20, inputs=20, outputs=20, translations=args.languages)),
+        ('operator', corpus.build_xml_operator(preferences=20, inputs=50, outputs=50, translations=args.languages)),
+        ('mashup', corpus.build_xml_mashup(tabs=10, resources=20, connections=500, translations=args.languages)),
+    )
+
+    cache = get_processed_info_cache()
+
+    def render_each(template_parser, langs):
+        return dict((lang, template_parser.get_resource_processed_info(lang=lang)) for lang in langs)
+
+    def render_batch(template_parser):
+        cache.clear()
+        return template_parser.get_resource_processed_infos()
+
+    def render_first_batch(template_parser):
+        # Includes freezing the shared info, done once by each parser
+        template_parser._frozen_info = None
+        return render_batch(template_parser)
+
+    failures = 0
+    for name, template in templates:
+        template_parser = TemplateParser(template, base='http://example.com/')
+        langs = list(template_parser.get_resource_info()['translations'])
+
+        if json.dumps(render_each(template_parser, langs), sort_keys=True) != json.dumps(render_batch(template_parser), sort_keys=True):
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+        failures += check_isolation(name, template_parser, langs[-1])
+
+    # Nothing is copied while translating templates without translations
+    failures += check_isolation('widget, untranslated', TemplateParser(corpus.build_xml_widget(translations=0)), 'en')
+
+    print('%d templates checked, %d failures' % (len(templates) + 1, failures))
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('template\tlanguages\tone call per language (ms)\tbatch, first call (ms)\tbatch (ms)\tbatch, memoized (ms)')
+    for name, template in templates:
+        template_parser = TemplateParser(template, base='http://example.com/')
+        langs = list(template_parser.get_resource_info()['translations'])
+
+        each = min(timeit.repeat(lambda: render_each(template_parser, langs), number=args.rounds, repeat=3)) / args.rounds * 1000
+        first_batch = min(timeit.repeat(lambda: render_first_batch(template_parser), number=args.rounds, repeat=3)) / args.rounds * 1000
+        batch = min(timeit.repeat(lambda: render_batch(template_parser), number=args.rounds, repeat=3)) / args.rounds * 1000
+        template_parser.get_resource_processed_infos()
+        memoized = min(timeit.repeat(lambda: template_parser.get_resource_processed_infos(), number=args.rounds, repeat=3)) / args.rounds * 1000
+
+        print('%s\t%d\t%.3f\t%.3f\t%.3f\t%.3f' % (name, len(langs), each, first_batch, batch, memoized))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
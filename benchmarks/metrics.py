@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures the overhead of the instrumentation of the plugin, parsing a set of
+templates with the metrics disabled and enabled, and checks the output of the
+Prometheus exporter:
+
+    python benchmarks/metrics.py [--rounds N] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import re
+import sys
+import threading
+import timeit
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+# metric_name{label="value",...} value
+SAMPLE_RE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*",?)*\})? [^ ]+$')
+
+
+def build_corpus():
+    return (
+        ('widget', corpus.build_xml_widget()),
+        ('widget, large', corpus.build_xml_widget(preferences=200, options=10, properties=100, inputs=100, outputs=100)),
+        ('mashup', corpus.build_xml_mashup()),
+        ('json widget', corpus.build_json_widget()),
+    )
+
+
+def parse(template):
+    from wirecloud_plugin.template import TemplateParser
+
+    parser = TemplateParser(template)
+    parser.get_resource_info()
+    return parser.get_resource_processed_info(lang='en')
+
+
+class CatalogResponse(object):
+
+    def raise_for_status(self):
+        pass
+
+
+class BlockedCatalogClient(object):
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def update_product_spec(self, product_spec):
+        self.event.wait()
+        return CatalogResponse()
+
+
+def check_catalog_queue():
+    from wirecloud_plugin import metrics
+    from wirecloud_plugin.catalog import CatalogUpdateQueue
+
+    failures = 0
+    client = BlockedCatalogClient()
+    queue = CatalogUpdateQueue(client=client, workers=1)
+    metrics.register_collector(queue.collect_metrics)
+    for i in range(3):
+        queue.put({'id': 'spec-%d' % i})
+
+    # One of the updates can be already being sent
+    while queue.get_metrics()['in_progress'] == 0:
+        queue.flush(0.01)
+
+    registry = metrics.get_registry()
+    text = metrics.render_metrics()
+    expected = (
+        ('wirecloud_plugin_catalog_queue_depth', 2),
+        ('wirecloud_plugin_catalog_queue_in_progress', 1),
+    )
+    for name, value in expected:
+        if registry.get(name) is None or registry.get(name).get() != value or '%s %d' % (name, value) not in text.splitlines():
+            failures += 1
+            print('INVALID GAUGE: %s' % name)
+
+    if registry.get('wirecloud_plugin_catalog_queue_lag_seconds').get() <= 0:
+        failures += 1
+        print('INVALID GAUGE: wirecloud_plugin_catalog_queue_lag_seconds')
+
+    client.event.set()
+    queue.shutdown()
+    if registry.get('wirecloud_plugin_catalog_queue_updates_total').get(outcome='processed') != 3:
+        failures += 1
+        print('INVALID COUNTER: wirecloud_plugin_catalog_queue_updates_total')
+
+    return failures
+
+
+def check_parse_phases():
+    from wirecloud_plugin import metrics
+    from wirecloud_plugin.template import TemplateParser
+
+    failures = 0
+    histogram = metrics.get_registry().histogram(metrics.PHASE_DURATION)
+    count = histogram.get(phase='resource_info')[0]
+    TemplateParser(corpus.build_xml_widget()).get_frozen_resource_info()
+    if histogram.get(phase='resource_info')[0] != count + 1:
+        failures += 1
+        print('MISSING PHASE: resource_info (get_frozen_resource_info)')
+
+    try:
+        from wirecloud_plugin.wirecloud_plugin import WirecloudPlugin
+    except ImportError:
+        print('SKIPPED: phases of the plugin (WStore is not importable)')
+        return failures
+
+    metrics.get_registry().clear()
+    WirecloudPlugin(None)._parse_wgt(BytesIO(corpus.build_wgt(corpus.build_xml_widget())))
+    histogram = metrics.get_registry().get(metrics.PHASE_DURATION)
+    for phase in ('open_wgt', 'parse', 'xsd_validation', 'resource_info'):
+        if histogram is None or histogram.get(phase=phase)[0] == 0:
+            failures += 1
+            print('MISSING PHASE: %s (WirecloudPlugin._parse_wgt)' % phase)
+
+    return failures
+
+
+def check(templates):
+    from wirecloud_plugin import metrics
+
+    metrics.set_enabled(True)
+    metrics.get_registry().clear()
+    for name, template in templates:
+        parse(template)
+
+    failures = 0
+    histogram = metrics.get_registry().get(metrics.PHASE_DURATION)
+    for phase in ('parse', 'xsd_validation', 'resource_info', 'translation'):
+        count, total = histogram.get(phase=phase)
+        if count == 0:
+            failures += 1
+            print('MISSING PHASE: %s' % phase)
+
+    for line in metrics.render_metrics().splitlines():
+        if not line.startswith('#') and SAMPLE_RE.match(line) is None:
+            failures += 1
+            print('INVALID SAMPLE: %s' % line)
+
+    failures += check_catalog_queue()
+    failures += check_parse_phases()
+
+    metrics.set_enabled(False)
+    metrics.get_registry().clear()
+    for name, template in templates:
+        parse(template)
+
+    if len(metrics.render_metrics()) > 0:
+        failures += 1
+        print('METRICS COLLECTED WHILE DISABLED')
+
+    print('%d templates checked, %d failures' % (len(templates), failures))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=100, help='number of times each template is parsed')
+    parser.add_argument('--check-only', action='store_true', help='only check the collected metrics')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin import metrics
+
+    templates = build_corpus()
+    if check(templates) > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    rounds = args.rounds * 1000
+    metrics.set_enabled(False)
+    disabled_phase = min(timeit.repeat(lambda: metrics.time_phase('parse').__enter__(), number=rounds, repeat=3)) / rounds * 1e9
+    print('time_phase when disabled: %.0f ns' % disabled_phase)
+
+    print('template\tdisabled (ms)\tenabled (ms)\toverhead (%)')
+    for name, template in templates:
+        metrics.set_enabled(False)
+        # Warm up the caches of lxml and the parsers
+        timeit.timeit(lambda: parse(template), number=args.rounds)
+        disabled = min(timeit.repeat(lambda: parse(template), number=args.rounds, repeat=5)) / args.rounds * 1000
+        metrics.set_enabled(True)
+        enabled = min(timeit.repeat(lambda: parse(template), number=args.rounds, repeat=5)) / args.rounds * 1000
+
+        print('%s\t%.3f\t%.3f\t%.1f' % (name, disabled, enabled, (enabled - disabled) / disabled * 100))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that parsing templates in the pool of worker processes returns the
+same info (and errors) than parsing them in the current process, that the
+timeout, memory and recycling limits are enforced, and compares the
+throughput of a set of threads parsing templates in-process and through the
+pool:
+
+    python benchmarks/parse_pool.py [--workers 1,2,4] [--jobs N] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from six.moves import queue
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_corpus():
+    templates = []
+    for flavour in corpus.FLAVOURS:
+        templates.append(('%s widget' % flavour, corpus.build_template(flavour, 'widget', preferences=20, translations=2)))
+        templates.append(('%s mashup' % flavour, corpus.build_template(flavour, 'mashup', connections=50, translations=2)))
+
+    widget = corpus.build_xml_widget()
+    templates += [
+        ('invalid, schema', widget.replace(b'<title>', b'<titles>', 1).replace(b'</title>', b'</titles>', 1)),
+        ('invalid, json', b'{"type": "widget"}'),
+        ('invalid, unknown format', b'<template/>'),
+    ]
+    return templates
+
+
+def serialize(result):
+    return json.dumps(result, sort_keys=True)
+
+
+def call(function, *args):
+    try:
+        return serialize(function(*args))
+    except Exception as e:
+        return '%s: %s' % (e.__class__.__name__, e)
+
+
+def check():
+    from wirecloud_plugin.parse_pool import ERROR_CLASSES, get_process_rss, parse_template, ParseMemoryLimitExceeded, ParseTimeout, ParseWorkerError, ParseWorkerPool
+
+    failures = 0
+    templates = build_corpus()
+
+    pool = ParseWorkerPool(2, max_jobs=3)
+    try:
+        for name, template in templates:
+            result = parse_template(template)
+            if 'error' in result:
+                expected = '%s: %s' % (ERROR_CLASSES.get(result['error'], ParseWorkerError).__name__, result['message'])
+            else:
+                expected = serialize(result)
+
+            if call(pool.parse, template) != expected:
+                failures += 1
+                print('MISMATCH: %s' % name)
+
+        # max_jobs
+        pids = set()
+        for i in range(7):
+            pool.parse(templates[0][1])
+            pids.update(worker.process.pid for worker in pool._idle)
+        if len(pids) < 3:
+            failures += 1
+            print('WORKERS NOT RECYCLED')
+    finally:
+        pool.shutdown()
+
+    big_mashup = corpus.build_template('rdf-n3', 'mashup', tabs=10, resources=20, connections=2000)
+
+    pool = ParseWorkerPool(1, timeout=0.05)
+    try:
+        if not call(pool.parse, big_mashup).startswith(ParseTimeout.__name__):
+            failures += 1
+            print('TIMEOUT NOT ENFORCED')
+        if call(pool.parse, templates[0][1]) != serialize(parse_template(templates[0][1])):
+            failures += 1
+            print('POOL NOT RECOVERED AFTER TIMEOUT')
+
+        # Limit the memory to the memory used by an idle worker
+        pool.max_rss = get_process_rss(pool._idle[0].process.pid)
+        if pool.max_rss is not None:
+            pool.timeout = None
+            if not call(pool.parse, big_mashup).startswith(ParseMemoryLimitExceeded.__name__):
+                failures += 1
+                print('MEMORY LIMIT NOT ENFORCED')
+    finally:
+        pool.shutdown()
+
+    print('%d templates checked, %d failures' % (len(templates), failures))
+    return failures
+
+
+def measure(parse, templates, threads, jobs):
+    pending = queue.Queue()
+    for i in range(jobs):
+        pending.put(templates[i % len(templates)])
+
+    def run():
+        while True:
+            try:
+                template = pending.get_nowait()
+            except queue.Empty:
+                return
+            parse(template)
+
+    start = time.time()
+    workers = [threading.Thread(target=run) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return jobs / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='comma separated list of numbers of threads/worker processes')
+    parser.add_argument('--jobs', type=int, default=40, help='number of templates parsed on each measurement')
+    parser.add_argument('--check-only', action='store_true', help='only check the pool of worker processes')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    if check() > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    from wirecloud_plugin.parse_pool import parse_template, ParseWorkerPool
+
+    templates = [corpus.build_template(flavour, resource_type, preferences=50, connections=200) for flavour in ('rdf-xml', 'rdf-n3') for resource_type in ('widget', 'mashup')]
+
+    print('CPUs: %d' % (os.cpu_count() if hasattr(os, 'cpu_count') else 1))
+    print('workers\tin-process (templates/s)\tpool (templates/s)')
+    for workers in (int(workers) for workers in args.workers.split(',')):
+        in_process = measure(parse_template, templates, workers, args.jobs)
+
+        pool = ParseWorkerPool(workers)
+        try:
+            # Start the workers before measuring
+            measure(pool.parse, templates, workers, workers)
+            pooled = measure(pool.parse, templates, workers, args.jobs)
+        finally:
+            pool.shutdown()
+
+        print('%d\t%.1f\t%.1f' % (workers, in_process, pooled))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that the info loaded from the persistent parse cache is the same
+returned by the parsers, that concurrent processes can share the cache and
+that its size is bounded, and compares the time needed for parsing the wgt
+files with the time needed for loading them from a warm persistent cache
+(e.g. after restarting a worker):
+
+    python benchmarks/persistent_cache.py [--rounds N] [--processes N] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import timeit
+import zlib
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def configure():
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+
+def build_corpus():
+    wgts = []
+    for flavour in corpus.FLAVOURS:
+        for resource_type, knobs in (('widget', {'preferences': 50, 'translations': 3}), ('mashup', {'tabs': 5, 'connections': 200, 'translations': 3})):
+            template = corpus.build_template(flavour, resource_type, **knobs)
+            wgts.append(('%s %s' % (flavour, resource_type), corpus.build_wgt(template)))
+
+    return wgts
+
+
+def parse(wgt):
+    from wirecloud_plugin.cache import ParsedResource
+    from wirecloud_plugin.template import TemplateParser
+    from wirecloud_plugin.wgt import WgtFile
+
+    wgt_file = WgtFile(BytesIO(wgt))
+    try:
+        template_parser = TemplateParser(wgt_file.get_template())
+        return ParsedResource(template_parser.get_resource_type(), template_parser.get_frozen_resource_info())
+    finally:
+        wgt_file.close()
+
+
+def _hammer(args):
+    # Run by the pool processes, reading and writing the same entries
+    path, wgts, rounds = args
+    configure()
+
+    from wirecloud_plugin.persistent_cache import PersistentParseCache
+
+    cache = PersistentParseCache(path)
+    for i in range(rounds):
+        for name, wgt in wgts:
+            cache.get_or_set(name, lambda: parse(wgt))
+
+    return [json.dumps(cache.get(name).get_resource_info()) for name, wgt in wgts]
+
+
+def check(tmpdir, wgts, processes):
+    from wirecloud_plugin.persistent_cache import PersistentParseCache, STALE_VERSION_TTL
+
+    failures = 0
+    path = os.path.join(tmpdir, 'check.sqlite3')
+
+    cache = PersistentParseCache(path)
+    expected = {}
+    for name, wgt in wgts:
+        parsed = parse(wgt)
+        expected[name] = json.dumps(parsed.get_resource_info())
+        cache.set(name, parsed)
+
+        stored = PersistentParseCache(path).get(name)
+        if stored is None or stored.resource_type != parsed.resource_type or json.dumps(stored.get_resource_info()) != expected[name]:
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+    # Entries of other versions are kept while they are used (e.g. during
+    # a rolling deploy), and unused entries expire
+    now = [time.time()]
+    current = PersistentParseCache(path, timer=lambda: now[0])
+    other = PersistentParseCache(path, version='other', timer=lambda: now[0])
+    other.set(wgts[0][0], parse(wgts[0][1]))
+    if len(current) != len(wgts) or other.get(wgts[0][0]) is None:
+        failures += 1
+        print('ENTRIES REMOVED WHILE IN USE')
+
+    now[0] += STALE_VERSION_TTL + 1
+    current.set(wgts[0][0], parse(wgts[0][1]))
+    if len(other) != 0 or len(current) != len(wgts):
+        failures += 1
+        print('ENTRIES OF OTHER VERSIONS NOT INVALIDATED')
+
+    now[0] += current.ttl + 1
+    current.set(wgts[1][0], parse(wgts[1][1]))
+    if len(current) != 1 or current.get(wgts[0][0]) is not None:
+        failures += 1
+        print('EXPIRED ENTRIES NOT REMOVED')
+
+    # Corrupted entries are misses and are removed
+    corrupted = PersistentParseCache(os.path.join(tmpdir, 'corrupted.sqlite3'))
+    for name, wgt in wgts[:2]:
+        corrupted.set(name, parse(wgt))
+    blobs = (
+        ('truncated', zlib.compress(expected[wgts[0][0]].encode('utf-8'))[:10]),
+        ('invalid json', zlib.compress(b'{"type": ')),
+    )
+    for (name, wgt), (label, blob) in zip(wgts, blobs):
+        corrupted._get_connection().execute('UPDATE parsed_resources SET info = ? WHERE hash = ?', (sqlite3.Binary(blob), name))
+        logging.disable(logging.WARNING)
+        try:
+            stored = corrupted.get(name)
+        except Exception as e:
+            stored = e
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if stored is not None or corrupted._get_connection().execute('SELECT COUNT(*) FROM parsed_resources WHERE hash = ?', (name,)).fetchone()[0] != 0:
+            failures += 1
+            print('CORRUPTED ENTRY NOT HANDLED: %s (%s)' % (label, stored))
+
+    path = os.path.join(tmpdir, 'concurrent.sqlite3')
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(_hammer, [(path, wgts, 5)] * processes)
+    finally:
+        pool.close()
+        pool.join()
+
+    for result in results:
+        for (name, wgt), info in zip(wgts, result):
+            if info != expected[name]:
+                failures += 1
+                print('MISMATCH (concurrent): %s' % name)
+
+    bounded = PersistentParseCache(path)
+    max_size = bounded._get_connection().execute('SELECT SUM(size) FROM parsed_resources').fetchone()[0] // 2
+    bounded.max_size = max_size
+    for name, wgt in wgts:
+        bounded.set(name, parse(wgt))
+    stored_size = bounded._get_connection().execute('SELECT SUM(size) FROM parsed_resources').fetchone()[0]
+    if stored_size > max_size or bounded.get(wgts[-1][0]) is None:
+        failures += 1
+        print('SIZE NOT BOUNDED: %d > %d' % (stored_size, max_size))
+
+    print('%d wgt files checked, %d failures' % (len(wgts), failures))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=20, help='number of times each wgt file is processed')
+    parser.add_argument('--processes', type=int, default=4, help='number of processes sharing the cache on the checks')
+    parser.add_argument('--check-only', action='store_true', help='only check the persistent cache')
+    args = parser.parse_args()
+
+    configure()
+
+    from wirecloud_plugin.persistent_cache import PersistentParseCache
+
+    wgts = build_corpus()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        if check(tmpdir, wgts, args.processes) > 0:
+            return 1
+
+        if args.check_only:
+            return 0
+
+        cache = PersistentParseCache(os.path.join(tmpdir, 'benchmark.sqlite3'))
+        print('wgt\tparse (ms)\tpersistent cache (ms)\tspeedup')
+        for name, wgt in wgts:
+            cache.set(name, parse(wgt))
+
+            parsing = min(timeit.repeat(lambda: parse(wgt), number=args.rounds, repeat=3)) / args.rounds * 1000
+            loading = min(timeit.repeat(lambda: cache.get(name).get_resource_info(), number=args.rounds, repeat=3)) / args.rounds * 1000
+
+            print('%s\t%.3f\t%.3f\t%.1f' % (name, parsing, loading, parsing / loading))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
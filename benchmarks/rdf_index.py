@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time spent by the RDF parser extracting the info of large RDF
+widgets and mashups when looking up the fields using the snapshot index
+(TripleIndex) and querying the rdflib graph on each lookup:
+
+    python benchmarks/rdf_index.py [--rounds N] [--check-only]
+
+The rdflib graphs are built before the measurements, so only the field
+extraction is measured.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_corpus():
+    return (
+        ('widget', corpus.build_rdf_widget()),
+        ('widget, large', corpus.build_rdf_widget(preferences=200, options=10, properties=100, inputs=100, outputs=100)),
+        ('operator, large', corpus.build_rdf_widget(preferences=100, options=5, properties=50, inputs=200, outputs=200)),
+        ('mashup', corpus.build_rdf_mashup()),
+        ('mashup, large', corpus.build_rdf_mashup(tabs=10, resources=20, preferences=5, connections=500, operators=10)),
+    )
+
+
+def build_parsers():
+    from wirecloud_plugin.template.parsers.rdf import RDFTemplateParser
+
+    class GraphScanRDFTemplateParser(RDFTemplateParser):
+
+        # rdflib graphs provide the same objects/subjects API, so the
+        # snapshot index can be replaced by the graph itself
+        _triples = property(lambda self: self._graph, lambda self, value: None)
+
+    return GraphScanRDFTemplateParser, RDFTemplateParser
+
+
+def parse(parser_class, graph):
+    parser = parser_class(graph)
+    parser._init()
+    return parser.get_resource_info()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=10, help='number of times each template is parsed')
+    parser.add_argument('--check-only', action='store_true', help='only check that both strategies return the same info')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    import rdflib
+
+    graph_scan_class, indexed_class = build_parsers()
+
+    graphs = []
+    failures = 0
+    for name, template in build_corpus():
+        graph = rdflib.Graph()
+        graph.parse(data=template, format='xml')
+        graphs.append((name, len(graph), graph))
+
+        if json.dumps(parse(graph_scan_class, graph)) != json.dumps(parse(indexed_class, graph)):
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+    print('%d templates checked, %d mismatches' % (len(graphs), failures))
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('template\ttriples\tgraph scan (ms)\tindexed (ms)\tspeedup')
+    for name, triples, graph in graphs:
+        graph_scan = min(timeit.repeat(lambda: parse(graph_scan_class, graph), number=args.rounds, repeat=3)) / args.rounds * 1000
+        indexed = min(timeit.repeat(lambda: parse(indexed_class, graph), number=args.rounds, repeat=3)) / args.rounds * 1000
+
+        print('%s\t%d\t%.2f\t%.2f\t%.2f' % (name, triples, graph_scan, indexed, graph_scan / indexed))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
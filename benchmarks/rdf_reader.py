@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that reading RDF/XML templates directly from their lxml tree returns
+the same info than loading them using the rdflib RDF/XML parser and compares
+the time needed by both approaches (parsing + info extraction):
+
+    python benchmarks/rdf_reader.py [--rounds N] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_corpus():
+    widget = corpus.build_rdf_widget()
+    return (
+        ('widget', widget),
+        ('widget, translated', widget.replace(b'<wire:displayName>', b'<wire:displayName xml:lang="es">', 1)),
+        ('widget, large', corpus.build_rdf_widget(preferences=200, options=10, properties=100, inputs=100, outputs=100)),
+        ('mashup', corpus.build_rdf_mashup()),
+        ('mashup, large', corpus.build_rdf_mashup(tabs=10, resources=20, preferences=5, connections=500, operators=10)),
+        # Unsupported by the native reader, both use rdflib
+        ('widget, xml:base', widget.replace(b'<rdf:RDF', b'<rdf:RDF xml:base="http://example.com/"', 1)),
+    )
+
+
+def parse_using_rdflib(template):
+    import rdflib
+    from wirecloud_plugin.template.parsers.rdf import RDFTemplateParser
+
+    graph = rdflib.Graph()
+    graph.parse(data=template, format='xml')
+    parser = RDFTemplateParser(graph)
+    parser._init()
+    return parser.get_resource_info()
+
+
+def parse(template):
+    from wirecloud_plugin.template.parsers.rdf import RDFTemplateParser
+
+    parser = RDFTemplateParser(template)
+    parser._init()
+    return parser.get_resource_info()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=10, help='number of times each template is parsed')
+    parser.add_argument('--check-only', action='store_true', help='only check that both readers return the same info')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    templates = build_corpus()
+
+    failures = 0
+    for name, template in templates:
+        if json.dumps(parse_using_rdflib(template)) != json.dumps(parse(template)):
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+    print('%d templates checked, %d mismatches' % (len(templates), failures))
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('template\tsize (KiB)\trdflib (ms)\tnative (ms)\tspeedup')
+    for name, template in templates:
+        rdflib_time = min(timeit.repeat(lambda: parse_using_rdflib(template), number=args.rounds, repeat=3)) / args.rounds * 1000
+        native_time = min(timeit.repeat(lambda: parse(template), number=args.rounds, repeat=3)) / args.rounds * 1000
+
+        print('%s\t%d\t%.2f\t%.2f\t%.2f' % (name, len(template) // 1024, rdflib_time, native_time, rdflib_time / native_time))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
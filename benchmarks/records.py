@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that the compact (record based) info of several templates can be
+expanded back into the info returned by the parsers and compares the memory
+needed for keeping the info of many parsed components using the usual dicts
+and using the compact records:
+
+    python benchmarks/records.py [--components N] [--check-only]
+
+Each template is parsed N times and the results are kept alive, the memory
+reported by tracemalloc is then divided by N for obtaining the bytes used by
+each parsed component.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_corpus():
+    return (
+        ('widget', corpus.build_xml_widget()),
+        ('widget, large', corpus.build_xml_widget(preferences=100, options=10, properties=50, inputs=50, outputs=50)),
+        ('operator', corpus.build_xml_operator()),
+        ('mashup', corpus.build_xml_mashup()),
+        ('mashup, large', corpus.build_xml_mashup(tabs=10, resources=20, connections=500, operators=10)),
+        ('legacy widget', corpus.build_legacy_widget()),
+        ('legacy mashup', corpus.build_legacy_mashup()),
+        ('json widget', corpus.build_json_widget()),
+        ('json mashup', corpus.build_json_mashup()),
+        ('rdf widget', corpus.build_rdf_widget()),
+        ('rdf mashup', corpus.build_rdf_mashup()),
+    )
+
+
+def parse(template):
+    from wirecloud_plugin.template import TemplateParser
+
+    return TemplateParser(template).get_resource_info()
+
+
+def parse_compact(template):
+    from wirecloud_plugin.template.records import compact_resource_info
+
+    return compact_resource_info(parse(template))
+
+
+def measure(builder, template, components):
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+
+    infos = [builder(template) for i in range(components)]
+
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    del infos
+    return used // components
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--components', type=int, default=100, help='number of parsed components kept on memory for each template')
+    parser.add_argument('--check-only', action='store_true', help='only check that the compact info can be expanded losslessly')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.template.records import expand_resource_info
+
+    templates = build_corpus()
+
+    failures = 0
+    for name, template in templates:
+        # Key order is also checked
+        if json.dumps(expand_resource_info(parse_compact(template))) != json.dumps(parse(template)):
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+    print('%d templates checked, %d mismatches' % (len(templates), failures))
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('template\tdicts (bytes/component)\trecords (bytes/component)\tsaving (%)')
+    for name, template in templates:
+        dicts = measure(parse, template, args.components)
+        records = measure(parse_compact, template, args.components)
+
+        print('%s\t%d\t%d\t%.1f' % (name, dicts, records, (dicts - records) * 100.0 / dicts))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the peak memory needed for parsing synthetic mashups of increasing
+size using the tree walk engine and the streaming (iterparse based) engine:
+
+    python benchmarks/streaming.py [--sizes 1,10,25,50,100] [--check-only]
+
+Each measurement runs in a fresh interpreter. tracemalloc only sees the
+memory allocated by Python objects (the parsed info, the template bytes),
+while the trees built by lxml are allocated by libxml2, so the increase of
+the peak resident set size is also reported. Note that the info returned by
+the parsers grows with the number of tabs and connections of the mashup, so
+only the memory used for the XML tree is expected to stay flat.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = '''
+import resource, sys, tracemalloc
+sys.path.insert(0, %(root)r)
+from django.conf import settings
+settings.configure(USE_I18N=False)
+from wirecloud_plugin.template.parsers.xml import ApplicationMashupStreamingParser, ApplicationMashupTreeWalkParser, get_xml_schema
+get_xml_schema()
+
+mode, path = sys.argv[1:]
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tracemalloc.start()
+
+if mode == 'tree walk':
+    with open(path, 'rb') as f:
+        parser = ApplicationMashupTreeWalkParser(f.read())
+elif mode == 'streaming (bytes)':
+    with open(path, 'rb') as f:
+        parser = ApplicationMashupStreamingParser(f.read())
+else:
+    parser = ApplicationMashupStreamingParser(open(path, 'rb'))
+
+parser._init()
+parser.get_resource_info()
+
+current, peak = tracemalloc.get_traced_memory()
+print(peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss)
+''' % {'root': ROOT_DIR}
+
+MODES = ('tree walk', 'streaming (bytes)', 'streaming (file)')
+
+# Number of tabs and connections added for each MiB of template
+TABS_PER_MIB = 10
+CONNECTIONS_PER_MIB = 1000
+
+
+def build_mashup(size):
+    return corpus.build_xml_mashup(tabs=TABS_PER_MIB * size, resources=100, connections=CONNECTIONS_PER_MIB * size, operators=10, behaviours=5)
+
+
+def serialize_result(parser_class, template):
+    try:
+        parser = parser_class(template)
+        parser._init()
+        return json.dumps(parser.get_resource_info())
+    except Exception as e:
+        # The streaming validator does not report line numbers
+        return re.sub(r', line \d+$', '', '%s: %s' % (e.__class__.__name__, e))
+
+
+def check():
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.template import TemplateParser
+    from wirecloud_plugin.template.parsers.xml import ApplicationMashupStreamingParser, ApplicationMashupTreeWalkParser
+    import tree_walk
+
+    templates = tree_walk.build_corpus()
+    mashup = corpus.build_xml_mashup(behaviours=2)
+    templates += [
+        ('mashup, big', build_mashup(2)),
+        ('invalid, missing position', mashup.replace(b'<position', b'<size', 1)),
+    ]
+
+    failures = 0
+    for name, template in templates:
+        expected = serialize_result(ApplicationMashupTreeWalkParser, template)
+        for source in (template, BytesIO(template)):
+            if serialize_result(ApplicationMashupStreamingParser, source) != expected:
+                failures += 1
+                print('MISMATCH: %s' % name)
+
+    # Mashups bigger than the threshold are parsed incrementally by
+    # TemplateParser, but their contents are still available
+    template = build_mashup(2)
+    template_parser = TemplateParser(template)
+    if not isinstance(template_parser._parser, ApplicationMashupStreamingParser) or template_parser.get_contents() != ApplicationMashupTreeWalkParser(template).get_contents():
+        failures += 1
+        print('MISMATCH: contents of mashup, big')
+
+    print('%d templates checked, %d mismatches' % (len(templates) + 1, failures))
+    return failures
+
+
+def measure(mode, path):
+    output = subprocess.check_output([sys.executable, '-c', MEASURE_SCRIPT, mode, path])
+    peak, rss = output.decode('ascii').split()
+    # ru_maxrss is reported in KiB
+    return int(peak) / 1024.0 / 1024.0, int(rss) / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,10,25,50,100', help='comma separated list of template sizes (in MiB)')
+    parser.add_argument('--check-only', action='store_true', help='only check the equivalence of both engines')
+    args = parser.parse_args()
+
+    if check() > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('size (MiB)\tmode\ttracemalloc peak (MiB)\trss increase (MiB)')
+        for size in (int(size) for size in args.sizes.split(',')):
+            path = os.path.join(tmpdir, 'mashup-%d.xml' % size)
+            with open(path, 'wb') as f:
+                f.write(build_mashup(size))
+
+            actual_size = os.path.getsize(path) / 1024.0 / 1024.0
+            for mode in MODES:
+                peak, rss = measure(mode, path)
+                print('%.1f\t%s\t%.1f\t%.1f' % (actual_size, mode, peak, rss))
+
+            os.remove(path)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
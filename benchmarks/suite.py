@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Times the main phases of processing synthetic wgt files of every template
+flavour (macdescription XML, legacy Template XML, JSON, RDF/XML and N3) and
+sizes, reporting the p50/p99 latencies and the peak memory allocated on
+each phase:
+
+    python benchmarks/suite.py [--sizes small,medium] [--flavours xml,json] [--rounds N]
+                               [--output results.json] [--compare baseline.json]
+
+The measured phases are opening the wgt file (WgtFile + get_template),
+building the TemplateParser, get_resource_info and
+get_resource_processed_info. parse_wiring_old_version is measured using old
+style wiring descriptions. The knobs of the size presets can be overridden
+using the corresponding options (e.g. --connections 10000). Results can be
+saved as JSON using --output and compared with the results of another
+revision using --compare.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import copy
+import datetime
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = {
+    'small': {
+        'preferences': 5, 'options': 2, 'properties': 3, 'endpoints': 3,
+        'tabs': 1, 'resources': 5, 'connections': 10, 'operators': 1,
+        'translations': 0, 'members': 5,
+    },
+    'medium': {
+        'preferences': 50, 'options': 5, 'properties': 20, 'endpoints': 20,
+        'tabs': 5, 'resources': 20, 'connections': 200, 'operators': 5,
+        'translations': 5, 'members': 50,
+    },
+    'large': {
+        'preferences': 200, 'options': 10, 'properties': 50, 'endpoints': 100,
+        'tabs': 20, 'resources': 50, 'connections': 5000, 'operators': 20,
+        'translations': 10, 'members': 500,
+    },
+}
+KNOBS = ('preferences', 'options', 'properties', 'endpoints', 'tabs', 'resources', 'connections', 'operators', 'translations', 'members')
+
+RESOURCE_TYPES = ('widget', 'mashup')
+PHASES = ('open', 'construct', 'info', 'processed_info')
+
+
+def percentile(samples, p):
+    # Nearest-rank method
+    ordered = sorted(samples)
+    return ordered[max(int(math.ceil(p / 100.0 * len(ordered))) - 1, 0)]
+
+
+def get_revision():
+    try:
+        output = subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=ROOT_DIR, stderr=subprocess.STDOUT)
+        return output.decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_scenarios(flavours, sizes):
+    scenarios = []
+    for size_name, knobs in sizes:
+        template_knobs = dict(knobs, inputs=knobs['endpoints'], outputs=knobs['endpoints'])
+        for flavour in flavours:
+            for resource_type in RESOURCE_TYPES:
+                template = corpus.build_template(flavour, resource_type, **template_knobs)
+                scenarios.append({
+                    'flavour': flavour,
+                    'type': resource_type,
+                    'size': size_name,
+                    'wgt': corpus.build_wgt(template, extra_files=knobs['members']),
+                    'lang': 'x-lang0' if knobs['translations'] > 0 else 'en',
+                })
+
+        scenarios.append({
+            'flavour': 'wiring 1.0',
+            'type': 'wiring',
+            'size': size_name,
+            'status': corpus.build_old_wiring_status(widgets=knobs['tabs'] * knobs['resources'], operators=knobs['operators'], connections=knobs['connections']),
+        })
+
+    return scenarios
+
+
+def get_template_steps(scenario):
+    from wirecloud_plugin.template import TemplateParser
+    from wirecloud_plugin.wgt import WgtFile
+
+    state = {}
+
+    def open_wgt():
+        wgt_file = WgtFile(BytesIO(scenario['wgt']))
+        try:
+            state['template'] = wgt_file.get_template()
+        finally:
+            wgt_file.close()
+
+    def construct():
+        state['parser'] = TemplateParser(state['template'])
+
+    def info():
+        state['parser'].get_resource_info()
+
+    def processed_info():
+        state['parser'].get_resource_processed_info(lang=scenario['lang'])
+
+    return list(zip(PHASES, (open_wgt, construct, info, processed_info)))
+
+
+def get_wiring_steps(scenario):
+    from wirecloud_plugin.template.wiring import parse_wiring_old_version
+
+    # parse_wiring_old_version modifies the given wiring status
+    status = copy.deepcopy(scenario['status'])
+
+    return [('parse_wiring_old_version', lambda: parse_wiring_old_version(status))]
+
+
+def get_steps(scenario):
+    return get_wiring_steps(scenario) if scenario['type'] == 'wiring' else get_template_steps(scenario)
+
+
+def run_timed(scenario):
+    timer = timeit.default_timer
+
+    times = []
+    for phase, step in get_steps(scenario):
+        start = timer()
+        step()
+        times.append(timer() - start)
+
+    return times
+
+
+def run_traced(scenario):
+
+    peaks = []
+    for phase, step in get_steps(scenario):
+        tracemalloc.start()
+        try:
+            step()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return peaks
+
+
+def measure(scenario, rounds):
+
+    # Warm up (e.g. loading the XML schemas)
+    run_timed(scenario)
+
+    samples = [run_timed(scenario) for i in range(rounds)]
+    # Measured on a different round, as tracing the allocations slows down
+    # the code
+    peaks = run_traced(scenario)
+
+    results = []
+    for i, (phase, step) in enumerate(get_steps(scenario)):
+        phase_samples = [sample[i] * 1000 for sample in samples]
+        results.append({
+            'flavour': scenario['flavour'],
+            'type': scenario['type'],
+            'size': scenario['size'],
+            'phase': phase,
+            'rounds': rounds,
+            'wgt_size': len(scenario['wgt']) if 'wgt' in scenario else None,
+            'p50_ms': percentile(phase_samples, 50),
+            'p99_ms': percentile(phase_samples, 99),
+            'mean_ms': sum(phase_samples) / len(phase_samples),
+            'min_ms': min(phase_samples),
+            'max_ms': max(phase_samples),
+            'peak_memory_kib': peaks[i] / 1024.0,
+        })
+
+    return results
+
+
+def get_result_key(result):
+    return (result['flavour'], result['type'], result['size'], result['phase'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='small,medium', help='comma separated list of size presets (%s)' % ', '.join(sorted(SIZES)))
+    parser.add_argument('--flavours', default=','.join(corpus.FLAVOURS), help='comma separated list of template flavours (%s)' % ', '.join(corpus.FLAVOURS))
+    parser.add_argument('--rounds', type=int, default=20, help='number of times each scenario is measured')
+    parser.add_argument('--output', help='file where the results are saved as JSON')
+    parser.add_argument('--compare', help='JSON file with the results of a previous run to compare with')
+    for knob in KNOBS:
+        parser.add_argument('--%s' % knob, type=int, help='overrides the number of %s of the size presets' % knob)
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    sizes = []
+    for size_name in args.sizes.split(','):
+        if size_name not in SIZES:
+            parser.error('unknown size: %s' % size_name)
+        knobs = dict(SIZES[size_name])
+        knobs.update((knob, getattr(args, knob)) for knob in KNOBS if getattr(args, knob) is not None)
+        sizes.append((size_name, knobs))
+
+    flavours = args.flavours.split(',')
+    for flavour in flavours:
+        if flavour not in corpus.FLAVOURS:
+            parser.error('unknown flavour: %s' % flavour)
+
+    baseline = {}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = dict((get_result_key(result), result) for result in json.load(f)['results'])
+
+    header = 'flavour\ttype\tsize\tphase\tp50 (ms)\tp99 (ms)\tpeak memory (KiB)'
+    if args.compare is not None:
+        header += '\tbaseline p50 (ms)\tp50 change (%)'
+    print(header)
+
+    results = []
+    for scenario in build_scenarios(flavours, sizes):
+        for result in measure(scenario, args.rounds):
+            results.append(result)
+
+            line = '%s\t%s\t%s\t%s\t%.3f\t%.3f\t%.1f' % (result['flavour'], result['type'], result['size'], result['phase'], result['p50_ms'], result['p99_ms'], result['peak_memory_kib'])
+            if args.compare is not None:
+                previous = baseline.get(get_result_key(result))
+                if previous is None:
+                    line += '\t-\t-'
+                else:
+                    line += '\t%.3f\t%+.1f' % (previous['p50_ms'], (result['p50_ms'] - previous['p50_ms']) * 100.0 / previous['p50_ms'])
+            print(line)
+            sys.stdout.flush()
+
+    if args.output is not None:
+        report = {
+            'metadata': {
+                'date': datetime.datetime.utcnow().isoformat(),
+                'revision': get_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'rounds': args.rounds,
+                'sizes': dict(sizes),
+                'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that the tree walk engine returns exactly the same info (or the same
+error) than the XPath based parser for a corpus of macdescription templates
+and compares the time needed by both engines:
+
+    python benchmarks/tree_walk.py [--rounds N] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_corpus():
+    templates = [
+        ('widget', corpus.build_xml_widget()),
+        ('widget, no preferences', corpus.build_xml_widget(preferences=0, properties=0, inputs=0, outputs=0)),
+        ('widget, translated', corpus.build_xml_widget(translations=3, requirements=2)),
+        ('widget, reversed sections', corpus.build_xml_widget(translations=1, requirements=1, reverse_sections=True)),
+        ('operator', corpus.build_xml_operator()),
+        ('operator, translated', corpus.build_xml_operator(translations=2, reverse_sections=True)),
+        ('mashup', corpus.build_xml_mashup()),
+        ('mashup, full', corpus.build_xml_mashup(behaviours=3, params=4, embedded=3, translations=2, requirements=2)),
+        ('mashup, reversed sections', corpus.build_xml_mashup(behaviours=2, params=1, embedded=1, reverse_sections=True)),
+        ('mashup, wiring 1.0', corpus.build_xml_mashup(wiring_version='1.0')),
+        ('mashup, large', corpus.build_xml_mashup(tabs=20, resources=25, preferences=5, connections=1000, operators=20, behaviours=5)),
+    ]
+
+    # Invalid templates must be rejected with the same error
+    widget = corpus.build_xml_widget(translations=1)
+    templates += [
+        ('invalid, missing default translation', widget.replace(b'<translation lang="en">', b'<translation lang="es">', 1)),
+        ('invalid, unused translation', widget.replace(b'</translation>', b'<msg name="unused">Unused</msg></translation>', 1)),
+        ('invalid, missing default value', widget.replace(b'<msg name="title">', b'<msg name="other">', 1)),
+        ('invalid, schema', widget.replace(b'<preferences>', b'<preferences><unknown/>', 1)),
+    ]
+
+    return templates
+
+
+def parse(parser_class, doc):
+    parser = parser_class(doc)
+    parser._init()
+    return parser.get_resource_info()
+
+
+def serialize_result(parser_class, template):
+    try:
+        info = parse(parser_class, etree.fromstring(template))
+        return json.dumps(info)
+    except Exception as e:
+        return '%s: %s' % (e.__class__.__name__, e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=20, help='number of times each template is parsed')
+    parser.add_argument('--check-only', action='store_true', help='only check the equivalence of both engines')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.template.parsers.xml import ApplicationMashupTemplateParser, ApplicationMashupTreeWalkParser
+
+    templates = build_corpus()
+
+    failures = 0
+    for name, template in templates:
+        expected = serialize_result(ApplicationMashupTemplateParser, template)
+        result = serialize_result(ApplicationMashupTreeWalkParser, template)
+        if result != expected:
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+    print('%d templates checked, %d mismatches' % (len(templates), failures))
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('template\tsize (KiB)\txpath (ms)\ttree walk (ms)\tspeedup')
+    for name, template in templates:
+        if name.startswith('invalid'):
+            continue
+
+        doc = etree.fromstring(template)
+        xpath = min(timeit.repeat(lambda: parse(ApplicationMashupTemplateParser, doc), number=args.rounds, repeat=5)) / args.rounds * 1000
+        tree_walk = min(timeit.repeat(lambda: parse(ApplicationMashupTreeWalkParser, doc), number=args.rounds, repeat=5)) / args.rounds * 1000
+
+        print('%s\t%d\t%.3f\t%.3f\t%.2f' % (name, len(template) // 1024, xpath, tree_walk, xpath / tree_walk))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
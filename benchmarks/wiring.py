@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time needed for validating the connections of big mashup
+wirings using the indexed WiringValidator and pairing each connection with
+the component instances, endpoints and previous connections using linear
+scans:
+
+    python benchmarks/wiring.py [--sizes 1000,5000,10000,20000] [--max-scan-size N] [--check-only]
+
+The synthetic wirings include dangling and duplicated connections.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+ENDPOINTS = 10
+
+
+def build_components():
+    components = {}
+    for i in range(20):
+        components['Benchmark/widget%d/1.0' % i] = {
+            'wiring': {
+                'inputs': [{'name': 'input%d' % e} for e in range(ENDPOINTS)],
+                'outputs': [{'name': 'output%d' % e} for e in range(ENDPOINTS)],
+            },
+        }
+    for i in range(5):
+        components['Benchmark/operator%d/1.0' % i] = {
+            'wiring': {
+                'inputs': [{'name': 'input%d' % e} for e in range(ENDPOINTS)],
+                'outputs': [{'name': 'output%d' % e} for e in range(ENDPOINTS)],
+            },
+        }
+
+    return components
+
+
+def build_mashup(connections, seed=0):
+    rng = random.Random(seed)
+    widgets = max(connections // 20, 10)
+
+    resources = [{'id': '%d' % i, 'vendor': 'Benchmark', 'name': 'widget%d' % (i % 20), 'version': '1.0'} for i in range(widgets)]
+    operators = {'%d' % i: {'id': '%d' % i, 'name': 'Benchmark/operator%d/1.0' % (i % 5), 'preferences': {}} for i in range(10)}
+
+    def endpoint(kind):
+        if rng.random() < 0.2:
+            component_type, component_id = 'operator', '%d' % rng.randrange(11)
+        else:
+            component_type, component_id = 'widget', '%d' % rng.randrange(widgets + 1)
+        return {'type': component_type, 'id': component_id, 'endpoint': '%s%d' % (kind, rng.randrange(ENDPOINTS + 1))}
+
+    wiring_connections = []
+    for c in range(connections):
+        if c > 0 and rng.random() < 0.05:
+            wiring_connections.append(dict(rng.choice(wiring_connections)))
+        else:
+            wiring_connections.append({'readonly': False, 'source': endpoint('output'), 'target': endpoint('input')})
+
+    return {
+        'type': 'mashup',
+        'tabs': [{'name': 'Tab', 'preferences': {}, 'resources': resources}],
+        'wiring': {'connections': wiring_connections, 'operators': operators},
+    }
+
+
+def validate_using_scans(info, components):
+    from wirecloud_plugin.template.wiring import get_endpoint_name
+
+    instances = []
+    for tab in info['tabs']:
+        for resource in tab['resources']:
+            instances.append(('widget', resource['id'], '/'.join((resource['vendor'], resource['name'], resource['version']))))
+    for operator_id, operator in info['wiring']['operators'].items():
+        instances.append(('operator', operator_id, operator['name']))
+
+    def check(endpoint, kind):
+        for component_type, component_id, resource_id in instances:
+            if component_type == endpoint['type'] and component_id == endpoint['id']:
+                break
+        else:
+            return 'missing component instance'
+
+        component = components.get(resource_id)
+        if component is not None:
+            for candidate in component['wiring'][kind]:
+                if candidate['name'] == endpoint['endpoint']:
+                    return None
+            return 'missing endpoint'
+
+    issues = []
+    connections = info['wiring']['connections']
+    for index, connection in enumerate(connections):
+        for side, kind in (('source', 'outputs'), ('target', 'inputs')):
+            reason = check(connection[side], kind)
+            if reason is not None:
+                issues.append({'issue': 'dangling', 'connection': index, 'side': side, 'endpoint': get_endpoint_name(connection[side]), 'reason': reason})
+
+        for previous in range(index):
+            if get_endpoint_name(connections[previous]['source']) == get_endpoint_name(connection['source']) and \
+                    get_endpoint_name(connections[previous]['target']) == get_endpoint_name(connection['target']):
+                issues.append({'issue': 'duplicated', 'connection': index, 'duplicate_of': previous, 'sourcename': get_endpoint_name(connection['source']), 'targetname': get_endpoint_name(connection['target'])})
+                break
+
+    return issues
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,5000,10000,20000', help='comma separated list of connection counts')
+    parser.add_argument('--max-scan-size', type=int, default=10000, help='biggest wiring validated using linear scans')
+    parser.add_argument('--check-only', action='store_true', help='only check that both strategies report the same issues')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.template.wiring import validate_wiring
+
+    components = build_components()
+
+    failures = 0
+    for size in (10, 100, 1000):
+        info = build_mashup(size)
+        if validate_wiring(info, components) != validate_using_scans(info, components):
+            failures += 1
+            print('MISMATCH: %d connections' % size)
+
+    print('3 wirings checked, %d mismatches' % failures)
+    if failures > 0:
+        return 1
+
+    if args.check_only:
+        return 0
+
+    print('connections\tissues\tlinear scans (ms)\tindexed (ms)\tspeedup')
+    for size in (int(size) for size in args.sizes.split(',')):
+        info = build_mashup(size)
+        issues = len(validate_wiring(info, components))
+        indexed = min(timeit.repeat(lambda: validate_wiring(info, components), number=1, repeat=3)) * 1000
+
+        if size <= args.max_scan_size:
+            scans = timeit.timeit(lambda: validate_using_scans(info, components), number=1) * 1000
+            print('%d\t%d\t%.2f\t%.2f\t%.1f' % (size, issues, scans, indexed, scans / indexed))
+        else:
+            print('%d\t%d\t-\t%.2f\t-' % (size, issues, indexed))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
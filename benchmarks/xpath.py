@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time spent parsing large mashup templates using precompiled
+XPath evaluators and compiling the XPath expressions on each lookup:
+
+    python benchmarks/xpath.py [--rounds N] [--tabs N] [--resources N] [--connections N]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import sys
+import timeit
+
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def build_parsers():
+    from wirecloud_plugin.template.parsers.old_xml import WirecloudTemplateParser
+    from wirecloud_plugin.template.parsers.xml import ApplicationMashupTemplateParser, WIRECLOUD_TEMPLATE_NS
+
+    class UncompiledApplicationMashupTemplateParser(ApplicationMashupTemplateParser):
+
+        def _xpath(self, query, element):
+            return element.xpath(query, namespaces={'t': WIRECLOUD_TEMPLATE_NS})
+
+    class UncompiledWirecloudTemplateParser(WirecloudTemplateParser):
+
+        def _xpath(self, query, element):
+            if self._namespace is not None:
+                return element.xpath(query, namespaces={'t': self._namespace})
+            else:
+                query = query.replace('t:', '')
+                return element.xpath(query)
+
+    return {
+        'macdescription': (UncompiledApplicationMashupTemplateParser, ApplicationMashupTemplateParser),
+        'legacy': (UncompiledWirecloudTemplateParser, WirecloudTemplateParser),
+    }
+
+
+def parse(parser_class, doc):
+    parser = parser_class(doc)
+    parser._init()
+    return parser.get_resource_info()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=10, help='number of times each template is parsed')
+    parser.add_argument('--tabs', type=int, default=20, help='number of tabs of each mashup')
+    parser.add_argument('--resources', type=int, default=25, help='number of widgets in each tab')
+    parser.add_argument('--connections', type=int, default=1000, help='number of connections of each mashup')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    size = dict(tabs=args.tabs, resources=args.resources, connections=args.connections, operators=10)
+    legacy_mashup = corpus.build_legacy_mashup(**size)
+    templates = (
+        ('macdescription', 'macdescription mashup', corpus.build_xml_mashup(**size)),
+        ('legacy', 'legacy mashup', legacy_mashup),
+        ('legacy', 'legacy mashup (no namespace)', legacy_mashup.replace((' xmlns="%s"' % corpus.TEMPLATE_NS).encode('utf-8'), b'')),
+    )
+
+    parsers = build_parsers()
+
+    print('template\tsize (KiB)\tuncompiled (ms)\tcompiled (ms)\tspeedup')
+    for kind, name, template in templates:
+        # Exclude the XML parsing from the measurements
+        doc = etree.fromstring(template)
+        uncompiled_class, compiled_class = parsers[kind]
+
+        uncompiled = min(timeit.repeat(lambda: parse(uncompiled_class, doc), number=args.rounds, repeat=3)) / args.rounds * 1000
+        compiled = min(timeit.repeat(lambda: parse(compiled_class, doc), number=args.rounds, repeat=3)) / args.rounds * 1000
+
+        print('%s\t%d\t%.2f\t%.2f\t%.2f' % (name, len(template) // 1024, uncompiled, compiled, uncompiled / compiled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that WgtFile reads and extracts regular wgt files as zipfile does
+while rejecting zip bombs (oversized members, too many contents, excessive
+compression ratios and members bigger than their declared size), that
+downloaded wgt files can be opened, and compares the peak memory needed for extracting a big member by zipfile and
+by the streaming extraction of WgtFile:
+
+    python benchmarks/zip_guard.py [--size MIB] [--check-only]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import tracemalloc
+import zipfile
+from io import BytesIO
+
+from six.moves import BaseHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+MIB = 1024 * 1024
+
+
+def build_zip(members, compression=zipfile.ZIP_DEFLATED):
+    output = BytesIO()
+    with zipfile.ZipFile(output, 'w', compression) as wgt:
+        for name, contents in members:
+            wgt.writestr(name, contents)
+
+    return output.getvalue()
+
+
+def understate_size(data, name, size):
+    # Patches the uncompressed size of the given member on both the local
+    # file header and the central directory
+    data = bytearray(data)
+    encoded_name = name.encode('utf-8')
+
+    local = data.find(b'PK\x03\x04')
+    while local != -1:
+        name_length = struct.unpack('<H', bytes(data[local + 26:local + 28]))[0]
+        if bytes(data[local + 30:local + 30 + name_length]) == encoded_name:
+            data[local + 22:local + 26] = struct.pack('<I', size)
+        local = data.find(b'PK\x03\x04', local + 4)
+
+    central = data.find(b'PK\x01\x02')
+    while central != -1:
+        name_length = struct.unpack('<H', bytes(data[central + 28:central + 30]))[0]
+        if bytes(data[central + 46:central + 46 + name_length]) == encoded_name:
+            data[central + 24:central + 28] = struct.pack('<I', size)
+        central = data.find(b'PK\x01\x02', central + 4)
+
+    return bytes(data)
+
+
+def open_and_extract(data, tmpdir, **limits):
+    from wirecloud_plugin.wgt import WgtFile
+
+    wgt_file = WgtFile(BytesIO(data), **limits)
+    try:
+        output = tempfile.mkdtemp(dir=tmpdir)
+        wgt_file.extract(output)
+        return wgt_file.get_template()
+    finally:
+        wgt_file.close()
+
+
+class WgtRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', '%d' % len(self.server.wgt))
+        self.end_headers()
+        self.wfile.write(self.server.wgt)
+
+    def log_message(self, *args):
+        pass
+
+
+def check_download(tmpdir):
+    from django.conf import settings
+    from wirecloud_plugin.download import download_wgt
+    from wirecloud_plugin.wgt import WgtFile
+
+    failures = 0
+    settings.BASEDIR = tmpdir
+    template = corpus.build_xml_widget()
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), WgtRequestHandler)
+    server.wgt = corpus.build_wgt(template, extra_files=5, extra_file_size=100 * 1024)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        # Kept in memory and rolled over to disk
+        for spool_size in (10 * MIB, 1024):
+            settings.WIRECLOUD_PLUGIN_DOWNLOAD_SPOOL_SIZE = spool_size
+            downloaded_wgt = download_wgt('http://127.0.0.1:%d/widget.wgt' % server.server_port)
+            try:
+                wgt_file = WgtFile(downloaded_wgt.file)
+                if wgt_file.get_template() != template:
+                    failures += 1
+                    print('MISMATCH: downloaded wgt (spool size %d)' % spool_size)
+                wgt_file.close()
+            except Exception as e:
+                failures += 1
+                print('NOT OPENED: downloaded wgt (spool size %d): %s' % (spool_size, e))
+            finally:
+                downloaded_wgt.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        del settings.WIRECLOUD_PLUGIN_DOWNLOAD_SPOOL_SIZE
+
+    return failures
+
+
+def get_open_files():
+    # Only supported on systems providing /proc
+    fd_dir = '/proc/self/fd'
+    if not os.path.isdir(fd_dir):
+        return None
+
+    open_files = set()
+    for fd in os.listdir(fd_dir):
+        try:
+            open_files.add(os.readlink(os.path.join(fd_dir, fd)))
+        except OSError:
+            pass
+
+    return open_files
+
+
+def check_rejected_files(tmpdir):
+    from wirecloud_plugin.wgt import InvalidContents, WgtFile
+
+    failures = 0
+    template = corpus.build_xml_widget()
+    rejected = (
+        ('member bigger than the limit', build_zip([('config.xml', template), ('big.bin', b'\0' * (2 * MIB))], zipfile.ZIP_STORED), InvalidContents, None),
+        ('relative file name', build_zip([('config.xml', template), ('../evil.js', b'')]), ValueError, 'Invalid file name: ../evil.js'),
+    )
+    for name, data, error_class, message in rejected:
+        path = os.path.join(tempfile.mkdtemp(dir=tmpdir), 'rejected.wgt')
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        try:
+            WgtFile(path, max_member_size=MIB)
+        except error_class as e:
+            if message is not None and '%s' % e != message:
+                failures += 1
+                print('INVALID MESSAGE: %s: %s' % (name, e))
+
+            # Checked while the traceback (and so the rejected WgtFile) is
+            # still alive, as zipfile closes the file when collected
+            open_files = get_open_files()
+            if open_files is not None and os.path.realpath(path) in open_files:
+                failures += 1
+                print('FILE LEFT OPEN: %s' % name)
+        else:
+            failures += 1
+            print('NOT REJECTED: %s' % name)
+
+    return failures
+
+
+def check(tmpdir):
+    from wirecloud_plugin.wgt import InvalidContents, WgtFile
+
+    failures = 0
+
+    regular = corpus.build_wgt(corpus.build_xml_mashup(), extra_files=20, extra_file_size=100 * 1024)
+    wgt_file = WgtFile(BytesIO(regular))
+    reference = zipfile.ZipFile(BytesIO(regular))
+    output = tempfile.mkdtemp(dir=tmpdir)
+    wgt_file.extract(output)
+    for name in reference.namelist():
+        with open(os.path.join(output, name), 'rb') as f:
+            extracted = f.read()
+        if wgt_file.read(name) != reference.read(name) or extracted != reference.read(name):
+            failures += 1
+            print('MISMATCH: %s' % name)
+
+    wgt_file.extract_file('js/file0.js', os.path.join(output, 'single', 'file0.js'))
+    wgt_file.extract_dir('js', os.path.join(output, 'js-copy'))
+    if sorted(os.listdir(os.path.join(output, 'js-copy'))) != sorted(name[3:] for name in reference.namelist() if name.startswith('js/')):
+        failures += 1
+        print('MISMATCH: extract_dir')
+
+    template = corpus.build_xml_widget()
+    bombs = (
+        ('member bigger than the limit', build_zip([('config.xml', template), ('big.bin', b'\0' * (2 * MIB))], zipfile.ZIP_STORED), {'max_member_size': MIB}),
+        ('contents bigger than the limit', build_zip([('config.xml', template)] + [('file%d.bin' % i, os.urandom(MIB // 2)) for i in range(4)]), {'max_total_size': MIB}),
+        ('compression ratio', build_zip([('config.xml', template), ('zeros.bin', b'\0' * (20 * MIB))]), {}),
+        ('template bigger than declared', understate_size(build_zip([('config.xml', template + b' ' * (20 * MIB))]), 'config.xml', len(template)), {}),
+        ('member bigger than declared', understate_size(build_zip([('config.xml', template), ('zeros.bin', b'\0' * (20 * MIB))]), 'zeros.bin', MIB), {}),
+    )
+    for name, data, limits in bombs:
+        try:
+            open_and_extract(data, tmpdir, **limits)
+        except InvalidContents:
+            pass
+        else:
+            failures += 1
+            print('NOT REJECTED: %s' % name)
+
+    failures += check_download(tmpdir)
+    failures += check_rejected_files(tmpdir)
+
+    print('%d wgt files checked, %d failures' % (len(bombs) + 5, failures))
+    return failures
+
+
+def measure(extract):
+    tracemalloc.start()
+    try:
+        extract()
+        return tracemalloc.get_traced_memory()[1] / float(MIB)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=50, help='size in MiB of the extracted member')
+    parser.add_argument('--check-only', action='store_true', help='only check the limits')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+    from wirecloud_plugin.wgt import WgtFile
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        if check(tmpdir) > 0:
+            return 1
+
+        if args.check_only:
+            return 0
+
+        data = build_zip([('config.xml', corpus.build_xml_widget()), ('big.bin', os.urandom(args.size * MIB))])
+        output = os.path.join(tmpdir, 'big.bin')
+
+        def extract_using_zipfile():
+            with open(output, 'wb') as f:
+                f.write(zipfile.ZipFile(BytesIO(data)).read('big.bin'))
+
+        def extract_using_wgtfile():
+            WgtFile(BytesIO(data)).extract_file('big.bin', output)
+
+        print('member size (MiB)\tzipfile peak (MiB)\tWgtFile peak (MiB)')
+        print('%d\t%.1f\t%.1f' % (args.size, measure(extract_using_zipfile), measure(extract_using_wgtfile)))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Validates wgt files in bulk using a pool of processes. Results are written
+as JSON lines as soon as each file is processed:
+
+    python -m wirecloud_plugin.bulk [--processes N] [--timeout SECONDS] [--manifest FILE] [PATH ...]
+
+PATH can be a wgt file or a directory, in which case all the wgt files found
+inside it are validated. The timeout is enforced by the parent process, which
+kills and replaces the workers exceeding it.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import select
+import signal
+import sys
+import time
+
+from django.conf import settings
+
+from .wgt import WgtFile
+from .template import TemplateParser
+from .template.dependencies import DependencyResolver, get_resource_id
+from .template.wiring import validate_wiring
+
+
+MEDIA_TYPES = {
+    'widget': 'wirecloud/widget',
+    'mashup': 'wirecloud/mashup',
+    'operator': 'wirecloud/operator'
+}
+
+
+def _init_worker():
+    # Interruptions are managed by the parent process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if not settings.configured:
+        settings.configure(USE_I18N=False)
+
+
+def _elapsed(start):
+    return round((time.time() - start) * 1000, 3)
+
+
+def _failed_result(path, start, error, error_type):
+    return {
+        'file': path,
+        'valid': False,
+        'timings': {'total': _elapsed(start)},
+        'error': error,
+        'error_type': error_type,
+    }
+
+
+def validate_wgt(path):
+    """
+    Validates the wgt file available at the given path returning a dict
+    with the details of the resource, the error found and the time spent
+    in each phase (in milliseconds)
+    """
+    result = {
+        'file': path,
+        'valid': False,
+        'timings': {},
+    }
+
+    start = time.time()
+    try:
+        phase_start = time.time()
+        wgt_file = WgtFile(path)
+        try:
+            template = wgt_file.get_template()
+        finally:
+            wgt_file.close()
+        result['timings']['open'] = _elapsed(phase_start)
+
+        phase_start = time.time()
+        template_parser = TemplateParser(template)
+        result['timings']['parse'] = _elapsed(phase_start)
+
+        phase_start = time.time()
+        info = template_parser.get_resource_info()
+        result['timings']['info'] = _elapsed(phase_start)
+
+        result.update({
+            'valid': True,
+            'media_type': MEDIA_TYPES[info['type']],
+            'vendor': info['vendor'],
+            'name': info['name'],
+            'version': info['version'],
+        })
+
+        if info['type'] == 'mashup':
+            result['dependencies'] = sorted(template_parser.get_resource_dependencies())
+
+            wiring_issues = validate_wiring(info)
+            if len(wiring_issues) > 0:
+                result['wiring_issues'] = wiring_issues
+    except Exception as e:
+        result['error'] = '%s' % e
+        result['error_type'] = e.__class__.__name__
+    finally:
+        result['timings']['total'] = _elapsed(start)
+
+    return result
+
+
+def _run_worker(connection):
+    _init_worker()
+
+    while True:
+        try:
+            path = connection.recv()
+        except EOFError:
+            return
+
+        if path is None:
+            return
+
+        connection.send(validate_wgt(path))
+
+
+def _wait(connections, timeout):
+    if hasattr(multiprocessing.connection, 'wait'):
+        return multiprocessing.connection.wait(connections, timeout)
+
+    # Python 2
+    return select.select(connections, [], [], timeout)[0]
+
+
+class ValidationWorker(object):
+    """
+    Worker process validating a wgt file at a time. The parser libraries
+    run C code that cannot be interrupted from inside the worker, so the
+    workers exceeding the timeout are killed from the parent process.
+    """
+
+    def __init__(self):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_run_worker, args=(child_connection,), name='wgt-validator')
+        self.process.daemon = True
+        self.process.start()
+        child_connection.close()
+
+        self.path = None
+        self.start = None
+
+    def submit(self, path):
+        self.path = path
+        self.start = time.time()
+        self.connection.send(path)
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except (IOError, OSError):
+            pass
+
+        self.process.join()
+        self.connection.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+def find_wgt_files(paths, manifest=None):
+    if manifest is not None:
+        with io.open(manifest, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line != '' and not line.startswith('#'):
+                    yield line
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for file_name in sorted(files):
+                    if file_name.lower().endswith('.wgt'):
+                        yield os.path.join(root, file_name)
+        else:
+            yield path
+
+
+def validate_wgt_files(paths, processes=None, timeout=None):
+    """
+    Validates the given wgt files across a pool of processes, yielding the
+    results as they are available. Workers spending more than timeout
+    seconds on a wgt file are killed and replaced by a new process.
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    paths = iter(paths)
+    idle = []
+    busy = []
+    pending = True
+    try:
+        while True:
+            while pending and len(busy) < processes:
+                path = next(paths, None)
+                if path is None:
+                    pending = False
+                    break
+
+                worker = idle.pop() if len(idle) > 0 else ValidationWorker()
+                worker.submit(path)
+                busy.append(worker)
+
+            if len(busy) == 0:
+                break
+
+            wait = None
+            if timeout:
+                wait = max(0, min(worker.start for worker in busy) + timeout - time.time())
+
+            ready = _wait([worker.connection for worker in busy], wait)
+            for worker in busy[:]:
+                if worker.connection in ready:
+                    busy.remove(worker)
+                    try:
+                        result = worker.connection.recv()
+                    except (EOFError, IOError, OSError):
+                        worker.kill()
+                        result = _failed_result(worker.path, worker.start, 'The validation process died unexpectedly', 'ValidationWorkerError')
+                    else:
+                        idle.append(worker)
+                elif timeout and time.time() - worker.start >= timeout:
+                    busy.remove(worker)
+                    worker.kill()
+                    result = _failed_result(worker.path, worker.start, 'Timeout: the wgt file could not be validated in %s seconds' % timeout, 'timeout')
+                else:
+                    continue
+
+                yield result
+    finally:
+        for worker in busy:
+            worker.kill()
+
+        for worker in idle:
+            worker.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m wirecloud_plugin.bulk', description='Validates wgt files in bulk.')
+    parser.add_argument('paths', nargs='*', metavar='PATH', help='wgt file or directory containing wgt files')
+    parser.add_argument('--manifest', help='file containing the paths of the wgt files to validate, one per line')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes (number of CPUs by default)')
+    parser.add_argument('--timeout', type=int, default=60, help='maximum number of seconds spent validating each wgt file')
+    parser.add_argument('--output', help='file where the results are written (standard output by default)')
+    parser.add_argument('--resolve-dependencies', action='store_true', help='resolve the dependencies of the mashups using the validated wgt files, mashup results are written once all the files are validated')
+    args = parser.parse_args(argv)
+
+    if len(args.paths) == 0 and args.manifest is None:
+        parser.error('at least a PATH or a manifest file is required')
+
+    _init_worker()
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    output = sys.stdout if args.output is None else io.open(args.output, 'w', encoding='utf-8')
+    failures = 0
+    resolver = DependencyResolver()
+    mashups = []
+    try:
+        for result in validate_wgt_files(find_wgt_files(args.paths, args.manifest), processes=args.processes, timeout=args.timeout):
+            if not result['valid']:
+                failures += 1
+            elif args.resolve_dependencies:
+                resource_id = get_resource_id(result)
+                resolver.add(resource_id, result.get('dependencies', ()))
+                if result['media_type'] == MEDIA_TYPES['mashup']:
+                    mashups.append((resource_id, result))
+                    continue
+
+            output.write('%s\n' % json.dumps(result, sort_keys=True))
+            output.flush()
+
+        for resource_id, result in mashups:
+            resolution = resolver.resolve(resource_id)
+            result.update({
+                'install_order': resolution['install_order'],
+                'missing_dependencies': resolution['missing'],
+                'dependency_cycles': resolution['cycles'],
+            })
+
+            output.write('%s\n' % json.dumps(result, sort_keys=True))
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .frozen import freeze
+
+
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_PROCESSED_INFO_CACHE_SIZE = 512
+DEFAULT_CACHE_TTL = 600
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def hash_wgt_file(wgt_file):
+    """
+    Returns the SHA-256 hex digest of the given wgt file. wgt_file can be
+    either a path or a seekable file-like object, in the later case the
+    current position is restored once the contents have been hashed.
+    """
+    digest = hashlib.sha256()
+
+    if hasattr(wgt_file, 'read'):
+        position = wgt_file.tell()
+        wgt_file.seek(0)
+        for chunk in iter(lambda: wgt_file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        wgt_file.seek(position)
+    else:
+        with open(wgt_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class ParsedResource(object):
+    """
+    Result of parsing a wgt file: the resource type and a frozen version of
+    the info returned by TemplateParser.get_resource_info
+    """
+
+    def __init__(self, resource_type, info):
+        self.resource_type = resource_type
+        self._info = freeze(info)
+
+    def get_resource_info(self):
+        return self._info.thaw()
+
+    def get_frozen_resource_info(self):
+        return self._info
+
+
+class ParseCache(object):
+    """
+    Thread safe LRU cache with TTL eviction for parsed wgt files, entries
+    are indexed using the hash of the wgt contents
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, timer=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._entries.pop(key)
+            except KeyError:
+                return None
+
+            if expires < self._timer():
+                return None
+
+            # Move the entry to the most recently used position
+            self._entries[key] = (expires, value)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self._timer() + self.ttl, value)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, builder):
+        """
+        Returns the value cached for the given key, calling builder for
+        creating it if needed. Concurrent callers requesting the same missing
+        key wait for the first one instead of building the value again
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock, waiters = self._key_locks.get(key, (None, 0))
+            if key_lock is None:
+                key_lock = threading.Lock()
+            self._key_locks[key] = (key_lock, waiters + 1)
+
+        try:
+            with key_lock:
+                value = self.get(key)
+                if value is None:
+                    value = builder()
+                    self.set(key, value)
+        finally:
+            with self._lock:
+                key_lock, waiters = self._key_locks[key]
+                if waiters == 1:
+                    del self._key_locks[key]
+                else:
+                    self._key_locks[key] = (key_lock, waiters - 1)
+
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache():
+    global _parse_cache
+
+    if _parse_cache is None:
+        with _parse_cache_lock:
+            if _parse_cache is None:
+                _parse_cache = ParseCache(
+                    max_size=getattr(settings, 'WIRECLOUD_PLUGIN_PARSE_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+                    ttl=getattr(settings, 'WIRECLOUD_PLUGIN_PARSE_CACHE_TTL', DEFAULT_CACHE_TTL)
+                )
+
+    return _parse_cache
+
+
+_processed_info_cache = None
+
+
+def get_processed_info_cache():
+    """
+    Returns the cache used for memoizing the localized renderings returned
+    by TemplateParser.get_resource_processed_infos
+    """
+    global _processed_info_cache
+
+    if _processed_info_cache is None:
+        with _parse_cache_lock:
+            if _processed_info_cache is None:
+                _processed_info_cache = ParseCache(
+                    max_size=getattr(settings, 'WIRECLOUD_PLUGIN_PROCESSED_INFO_CACHE_SIZE', DEFAULT_PROCESSED_INFO_CACHE_SIZE),
+                    ttl=getattr(settings, 'WIRECLOUD_PLUGIN_PARSE_CACHE_TTL', DEFAULT_CACHE_TTL)
+                )
+
+    return _processed_info_cache
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib3.util.retry import Retry
+except ImportError:
+    from requests.packages.urllib3.util.retry import Retry
+
+from django.conf import settings
+
+from .metrics import inc, register_collector, time_phase
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_QUEUE_WORKERS = 2
+DEFAULT_QUEUE_PUT_TIMEOUT = 1
+DEFAULT_SHUTDOWN_TIMEOUT = 30
+
+# get_metrics key, name and documentation of the gauges published by the
+# update queue
+QUEUE_GAUGES = (
+    ('depth', 'wirecloud_plugin_catalog_queue_depth', 'Number of product specification updates waiting in the catalog update queue'),
+    ('in_progress', 'wirecloud_plugin_catalog_queue_in_progress', 'Number of product specification updates being sent to the catalog'),
+    ('lag', 'wirecloud_plugin_catalog_queue_lag_seconds', 'Time the oldest pending update has been waiting in the catalog update queue'),
+    ('last_lag', 'wirecloud_plugin_catalog_queue_last_lag_seconds', 'Time between enqueuing and sending the last processed update'),
+    ('max_lag', 'wirecloud_plugin_catalog_queue_max_lag_seconds', 'Maximum time between enqueuing and sending an update'),
+)
+
+PRODUCT_SPEC_PATH = 'api/catalogManagement/v2/productSpecification/{}'
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_update_queue = None
+_update_queue_lock = threading.Lock()
+
+
+def _build_session():
+    pool_size = getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_POOL_SIZE', DEFAULT_POOL_SIZE)
+    retries = Retry(
+        total=getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_RETRIES', DEFAULT_RETRIES),
+        backoff_factor=getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_BACKOFF_FACTOR', DEFAULT_BACKOFF_FACTOR),
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+
+    return session
+
+
+def get_session():
+    """
+    Returns the HTTP session used for accessing the catalog. Sessions are
+    shared by all the threads of a process, but are never inherited by
+    forked processes as pooled connections cannot be shared between them
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+
+    return _session
+
+
+class CatalogClient(object):
+
+    def __init__(self, catalog_url=None, session=None):
+        if catalog_url is None:
+            catalog_url = settings.CATALOG
+
+        if not catalog_url.endswith('/'):
+            catalog_url += '/'
+
+        self._catalog_url = catalog_url
+        self._session = session
+        self._timeout = (
+            getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+            getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)
+        )
+
+    def _get_headers(self):
+        return {
+            'content-type': 'application/json',
+            'X-Nick-Name': settings.STORE_NAME,
+            'X-Roles': 'provider',
+            'X-Email': settings.WSTOREMAIL
+        }
+
+    def _request(self, method, path, **kwargs):
+        session = self._session if self._session is not None else get_session()
+        kwargs.setdefault('timeout', self._timeout)
+
+        response = session.request(method, self._catalog_url + path, headers=self._get_headers(), **kwargs)
+        inc('wirecloud_plugin_catalog_responses_total', 'Number of responses received from the catalog', method=method, status=response.status_code)
+        return response
+
+    def update_product_spec(self, product_spec):
+        with time_phase('catalog_update'):
+            return self._request('PUT', PRODUCT_SPEC_PATH.format(product_spec['id']), json=product_spec)
+
+
+class CatalogUpdateQueue(object):
+    """
+    Bounded in-process queue of product specification updates drained by a
+    pool of worker threads. Pending updates for the same product
+    specification are coalesced, so only the latest version is sent
+    """
+
+    def __init__(self, client=None, workers=DEFAULT_QUEUE_WORKERS, max_size=DEFAULT_QUEUE_SIZE, put_timeout=DEFAULT_QUEUE_PUT_TIMEOUT):
+        self._client = client
+        self._num_workers = workers
+        self._max_size = max_size
+        self._put_timeout = put_timeout
+
+        self._pending = OrderedDict()
+        self._in_progress = set()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._pid = None
+        self._stopping = False
+
+        self._enqueued = 0
+        self._coalesced = 0
+        self._rejected = 0
+        self._processed = 0
+        self._failed = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    def _start_workers(self):
+        # Worker threads are not inherited by forked processes
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._workers = []
+        for i in range(self._num_workers):
+            worker = threading.Thread(target=self._run, name='catalog-update-%d' % i)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def put(self, product_spec):
+        """
+        Schedules the update of the given product specification. Returns
+        False if the queue is full or stopped and the update has not been
+        scheduled
+        """
+        spec_id = product_spec['id']
+
+        with self._cond:
+            if self._stopping:
+                return False
+
+            self._start_workers()
+
+            if spec_id in self._pending:
+                # Replace the pending update, keeping its original position
+                # and enqueue time so lag metrics remain accurate
+                enqueued_at = self._pending[spec_id][1]
+                self._pending[spec_id] = (product_spec, enqueued_at)
+                self._coalesced += 1
+                _count_update('coalesced')
+                return True
+
+            deadline = time.time() + self._put_timeout
+            while len(self._pending) >= self._max_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._rejected += 1
+                    _count_update('rejected')
+                    return False
+                self._cond.wait(remaining)
+
+            self._pending[spec_id] = (product_spec, time.time())
+            self._enqueued += 1
+            _count_update('enqueued')
+            self._cond.notify_all()
+
+        return True
+
+    def _next_update(self):
+        # Updates of a product specification already being sent are delayed
+        # to keep them in order
+        for spec_id in self._pending:
+            if spec_id not in self._in_progress:
+                product_spec, enqueued_at = self._pending.pop(spec_id)
+                self._in_progress.add(spec_id)
+                return spec_id, product_spec, enqueued_at
+
+        return None
+
+    def _run(self):
+        client = self._client if self._client is not None else CatalogClient()
+
+        while True:
+            with self._cond:
+                update = self._next_update()
+                while update is None:
+                    if self._stopping and len(self._pending) == 0:
+                        return
+
+                    self._cond.wait()
+                    update = self._next_update()
+
+            spec_id, product_spec, enqueued_at = update
+            try:
+                response = client.update_product_spec(product_spec)
+                response.raise_for_status()
+            except Exception:
+                logger.exception('Error updating product specification %s in the catalog', spec_id)
+                failed = True
+            else:
+                failed = False
+
+            with self._cond:
+                lag = time.time() - enqueued_at
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+                self._processed += 1
+                _count_update('processed')
+                if failed:
+                    self._failed += 1
+                    _count_update('failed')
+
+                self._in_progress.discard(spec_id)
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Waits until all the pending updates have been sent. Returns False if
+        the timeout expires before that
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._cond:
+            while len(self._pending) > 0 or len(self._in_progress) > 0:
+                if self._pid != os.getpid():
+                    # There are no workers in this process
+                    return False
+
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+
+        return True
+
+    def shutdown(self, timeout=DEFAULT_SHUTDOWN_TIMEOUT):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+        flushed = self.flush(timeout)
+        if not flushed:
+            logger.warning('Catalog update queue stopped with %d pending updates', len(self._pending))
+
+        return flushed
+
+    def get_metrics(self):
+        with self._cond:
+            now = time.time()
+            oldest = min([enqueued_at for product_spec, enqueued_at in self._pending.values()] or [now])
+
+            return {
+                'depth': len(self._pending),
+                'in_progress': len(self._in_progress),
+                'enqueued': self._enqueued,
+                'coalesced': self._coalesced,
+                'rejected': self._rejected,
+                'processed': self._processed,
+                'failed': self._failed,
+                'lag': now - oldest,
+                'last_lag': self._last_lag,
+                'max_lag': self._max_lag,
+            }
+
+    def collect_metrics(self, registry):
+        """
+        Publishes the current state of the queue as gauges of the given
+        metrics registry
+        """
+        queue_metrics = self.get_metrics()
+        for key, name, documentation in QUEUE_GAUGES:
+            registry.gauge(name, documentation).set(queue_metrics[key])
+
+
+def _count_update(outcome):
+    inc('wirecloud_plugin_catalog_queue_updates_total', 'Number of product specification updates handled by the catalog update queue', outcome=outcome)
+
+
+def get_update_queue():
+    global _update_queue
+
+    if _update_queue is None:
+        with _update_queue_lock:
+            if _update_queue is None:
+                _update_queue = CatalogUpdateQueue(
+                    workers=getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_QUEUE_WORKERS', DEFAULT_QUEUE_WORKERS),
+                    max_size=getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+                )
+                atexit.register(_update_queue.shutdown)
+                register_collector(_update_queue.collect_metrics)
+
+    return _update_queue
+
+
+def update_product_spec(product_spec):
+    """
+    Updates the given product specification in the catalog, in background
+    if the asynchronous mode is enabled and the update queue is not full
+    """
+    if getattr(settings, 'WIRECLOUD_PLUGIN_CATALOG_ASYNC', False) and get_update_queue().put(product_spec):
+        return
+
+    CatalogClient().update_product_spec(product_spec)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import hashlib
+import os
+import time
+from tempfile import SpooledTemporaryFile
+
+import requests
+
+from django.conf import settings
+
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_TOTAL_TIMEOUT = 300
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+DEFAULT_SPOOL_SIZE = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadedWgt(object):
+    """
+    Wgt contents downloaded into a spooled temporal file, small files are
+    kept in memory and large ones are rolled over to disk
+    """
+
+    def __init__(self, wgt_file, wgt_hash, size):
+        # SpooledTemporaryFile does not provide the seekable method required
+        # by zipfile until Python 3.11, so the underlying file (in memory or
+        # rolled over to disk) is provided instead. The spooled file is kept
+        # as it closes the underlying file when collected
+        self._spooled_file = wgt_file
+        self.file = wgt_file._file
+        self.hash = wgt_hash
+        self.size = size
+
+    def close(self):
+        self._spooled_file.close()
+
+
+def _get_tmp_dir():
+    tmp_path = os.path.join(settings.BASEDIR, 'tmp')
+
+    if not os.path.isdir(tmp_path):
+        try:
+            os.mkdir(tmp_path)
+        except OSError:
+            # Already created by a concurrent download
+            pass
+
+    return tmp_path
+
+
+def download_wgt(url):
+    """
+    Downloads the wgt file located at the given url, hashing its contents
+    while they are read. Raises ValueError if the url cannot be downloaded,
+    the download takes too long or the file exceeds the configured size
+    """
+    max_size = getattr(settings, 'WIRECLOUD_PLUGIN_DOWNLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+    total_timeout = getattr(settings, 'WIRECLOUD_PLUGIN_DOWNLOAD_TIMEOUT', DEFAULT_TOTAL_TIMEOUT)
+    timeout = (
+        getattr(settings, 'WIRECLOUD_PLUGIN_DOWNLOAD_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+        getattr(settings, 'WIRECLOUD_PLUGIN_DOWNLOAD_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)
+    )
+
+    try:
+        response = requests.get(url, stream=True, timeout=timeout)
+        response.raise_for_status()
+    except Exception:
+        # The URL is not valid
+        raise ValueError('The URL provided is not valid: does not exists')
+
+    try:
+        content_length = response.headers.get('content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_size:
+            raise ValueError('The wgt file exceeds the maximum allowed size')
+
+        wgt_file = SpooledTemporaryFile(
+            max_size=getattr(settings, 'WIRECLOUD_PLUGIN_DOWNLOAD_SPOOL_SIZE', DEFAULT_SPOOL_SIZE),
+            suffix='_tmp.wgt',
+            dir=_get_tmp_dir()
+        )
+        digest = hashlib.sha256()
+        size = 0
+        deadline = time.time() + total_timeout
+
+        try:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError('The wgt file exceeds the maximum allowed size')
+
+                if time.time() > deadline:
+                    raise ValueError('The wgt file could not be downloaded in time')
+
+                digest.update(chunk)
+                wgt_file.write(chunk)
+        except ValueError:
+            wgt_file.close()
+            raise
+        except Exception:
+            wgt_file.close()
+            raise ValueError('The URL provided is not valid: the wgt file could not be downloaded')
+    finally:
+        response.close()
+
+    wgt_file.seek(0)
+    return DownloadedWgt(wgt_file, digest.hexdigest(), size)
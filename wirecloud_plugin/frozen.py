@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Immutable versions of the structures returned by the template parsers. Frozen
+info can be shared between threads and cache entries without copying it, and
+can be converted back into the usual dict/list structure using thaw.
+"""
+
+from __future__ import unicode_literals
+
+import six
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError("'%s' object does not support item assignment" % self.__class__.__name__)
+
+
+class FrozenDict(dict):
+    """
+    Read only dict. It is a dict subclass so frozen info can still be
+    serialized (e.g. using json.dumps) and checked as the mutable info.
+    """
+
+    __slots__ = ()
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+    __ior__ = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, dict.__repr__(self))
+
+    def thaw(self):
+        return thaw(self)
+
+
+class FrozenList(tuple):
+    """
+    Read only list, used instead of plain tuples so thaw can restore lists
+    without affecting the tuples found on the original structure.
+    """
+
+    __slots__ = ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, list.__repr__(list(self)))
+
+    def thaw(self):
+        return thaw(self)
+
+
+# Most common immutable values, returned without further checks
+_LEAF_TYPES = frozenset(six.string_types + six.integer_types + (six.binary_type, six.text_type, bool, float, type(None)))
+_FROZEN_TYPES = _LEAF_TYPES | frozenset((FrozenDict, FrozenList))
+
+
+def freeze(value):
+    """
+    Returns an immutable version of value, replacing recursively dicts by
+    FrozenDict instances and lists by FrozenList instances. Already frozen
+    structures are returned as is.
+    """
+
+    # Values that are already immutable are checked inline, avoiding a
+    # recursive call for each of them
+    value_type = type(value)
+    if value_type in _FROZEN_TYPES:
+        return value
+    elif isinstance(value, dict):
+        return FrozenDict({key: item if type(item) in _FROZEN_TYPES else freeze(item) for key, item in value.items()})
+    elif isinstance(value, list):
+        return FrozenList([item if type(item) in _FROZEN_TYPES else freeze(item) for item in value])
+    elif value_type is tuple:
+        return tuple([item if type(item) in _FROZEN_TYPES else freeze(item) for item in value])
+
+    return value
+
+
+def thaw(value):
+    """
+    Returns a new mutable copy of the given (frozen) structure using the
+    shape returned by the parsers (dicts and lists). Immutable leafs are
+    shared with the frozen structure.
+    """
+
+    if isinstance(value, dict):
+        return {key: item if type(item) in _LEAF_TYPES else thaw(item) for key, item in value.items()}
+    elif isinstance(value, (FrozenList, list)):
+        return [item if type(item) in _LEAF_TYPES else thaw(item) for item in value]
+    elif type(value) is tuple:
+        return tuple([item if type(item) in _LEAF_TYPES else thaw(item) for item in value])
+
+    return value
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Process-local registry of counters and histograms measuring the time spent
+in each phase of the processing of wgt files (download, zip opening, XSD
+validation, parsing, asset saving, catalog updates...) and of gauges
+reporting the state of the plugin components (e.g. the catalog update
+queue). The metrics can be exported using the Prometheus text format.
+
+Metrics are only collected when the WIRECLOUD_PLUGIN_METRICS setting is
+enabled, otherwise the instrumented code only pays for a function call.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import sys
+import threading
+from timeit import default_timer
+
+import six
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+INF = float('inf')
+
+PHASE_DURATION = 'wirecloud_plugin_phase_duration_seconds'
+PHASE_ERRORS = 'wirecloud_plugin_phase_errors_total'
+
+_enabled = None
+
+_registry = None
+_registry_pid = None
+_registry_lock = threading.Lock()
+
+
+def _escape_label_value(value):
+    return six.text_type(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if len(labels) == 0:
+        return ''
+
+    return '{' + ','.join('%s="%s"' % (name, _escape_label_value(value)) for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == INF:
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else '%d' % value
+
+
+class Metric(object):
+
+    type = None
+
+    def __init__(self, name, documentation, lock):
+        self.name = name
+        self.documentation = documentation
+        self._lock = lock
+        # sorted label items -> value
+        self._values = {}
+
+    def _get_key(self, labels):
+        return tuple(sorted(six.iteritems(labels)))
+
+    def render(self):
+        lines = [
+            '# HELP %s %s' % (self.name, self.documentation.replace('\\', '\\\\').replace('\n', '\\n')),
+            '# TYPE %s %s' % (self.name, self.type),
+        ]
+
+        with self._lock:
+            # Histogram counts are updated in place
+            values = sorted((labels, value[:] if isinstance(value, list) else value) for labels, value in six.iteritems(self._values))
+
+        for labels, value in values:
+            lines.extend(self._render_value(labels, value))
+
+        return lines
+
+
+class Counter(Metric):
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._get_key(labels), 0)
+
+    def _render_value(self, labels, value):
+        return ['%s%s %s' % (self.name, _format_labels(labels), _format_value(value))]
+
+
+class Gauge(Metric):
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        return self._values.get(self._get_key(labels), 0)
+
+    def _render_value(self, labels, value):
+        return ['%s%s %s' % (self.name, _format_labels(labels), _format_value(value))]
+
+
+class Histogram(Metric):
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, lock, buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, lock)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._get_key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count for each bucket plus the +Inf bucket and the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-2] += 1
+
+            counts[-1] += value
+
+    def get(self, **labels):
+        """
+        Returns the number of observations and their sum
+        """
+        counts = self._values.get(self._get_key(labels))
+        if counts is None:
+            return 0, 0.0
+
+        return sum(counts[:-1]), counts[-1]
+
+    def _render_value(self, labels, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (INF,), counts):
+            cumulative += count
+            lines.append('%s_bucket%s %d' % (self.name, _format_labels(labels + (('le', _format_value(bound)),)), cumulative))
+
+        lines.append('%s_sum%s %s' % (self.name, _format_labels(labels), repr(counts[-1])))
+        lines.append('%s_count%s %d' % (self.name, _format_labels(labels), cumulative))
+        return lines
+
+
+class MetricsRegistry(object):
+    """
+    Thread safe collection of metrics indexed by name
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_metric(self, metric_class, name, documentation, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = metric_class(name, documentation, self._lock, **kwargs)
+
+        if not isinstance(metric, metric_class):
+            raise ValueError('%s is already registered as a %s' % (name, metric.type))
+
+        return metric
+
+    def counter(self, name, documentation=''):
+        return self._get_metric(Counter, name, documentation)
+
+    def gauge(self, name, documentation=''):
+        return self._get_metric(Gauge, name, documentation)
+
+    def histogram(self, name, documentation='', buckets=DEFAULT_BUCKETS):
+        return self._get_metric(Histogram, name, documentation, buckets=buckets)
+
+    def add_collector(self, collector):
+        """
+        Registers a callable updating the gauges of the registry (passed as
+        argument) each time the metrics are rendered
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """
+        Returns the metrics using the Prometheus text exposition format
+        """
+        # Metrics take the registry lock while rendering or being updated by
+        # the collectors, so it is only held while taking the snapshots
+        with self._lock:
+            collectors = self._collectors[:]
+
+        for collector in collectors:
+            collector(self)
+
+        with self._lock:
+            metrics = sorted(six.iteritems(self._metrics))
+
+        lines = []
+        for name, metric in metrics:
+            lines.extend(metric.render())
+
+        return '\n'.join(lines) + '\n' if len(lines) > 0 else ''
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+            del self._collectors[:]
+
+
+def get_registry():
+    """
+    Returns the registry of the current process. Forked processes start with
+    an empty registry instead of reporting the metrics of their parent
+    """
+    global _registry, _registry_pid
+
+    pid = os.getpid()
+    if _registry is None or _registry_pid != pid:
+        with _registry_lock:
+            if _registry is None or _registry_pid != pid:
+                _registry = MetricsRegistry()
+                _registry_pid = pid
+
+    return _registry
+
+
+def is_enabled():
+    global _enabled
+
+    if _enabled is None:
+        if not settings.configured:
+            # Parsers and wgt files can be used without configuring Django,
+            # the setting is read again once it is configured
+            return False
+
+        _enabled = bool(getattr(settings, 'WIRECLOUD_PLUGIN_METRICS', False))
+
+    return _enabled
+
+
+def set_enabled(enabled):
+    """
+    Enables or disables the collection of metrics, overriding the
+    WIRECLOUD_PLUGIN_METRICS setting. Use None to read the setting again.
+    """
+    global _enabled
+
+    _enabled = enabled
+
+
+class _NoopTimer(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_noop_timer = _NoopTimer()
+
+
+class _PhaseTimer(object):
+
+    __slots__ = ('phase', 'start')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = default_timer() - self.start
+
+        registry = get_registry()
+        registry.histogram(PHASE_DURATION, 'Time spent in each phase of the processing of wgt files').observe(elapsed, phase=self.phase)
+        if exc_type is not None:
+            registry.counter(PHASE_ERRORS, 'Number of times each phase of the processing of wgt files failed').inc(phase=self.phase)
+
+        return False
+
+
+def time_phase(phase):
+    """
+    Returns a context manager recording the time spent in the given phase,
+    failures are also counted. Nothing is recorded if metrics are disabled.
+    """
+
+    if _enabled is False or not is_enabled():
+        return _noop_timer
+
+    return _PhaseTimer(phase)
+
+
+def inc(name, documentation='', amount=1, **labels):
+
+    if _enabled is False or not is_enabled():
+        return
+
+    get_registry().counter(name, documentation).inc(amount, **labels)
+
+
+def register_collector(collector):
+    """
+    Registers a callable updating gauges of the current process registry
+    before rendering the metrics. Nothing is registered if metrics are
+    disabled.
+    """
+
+    if _enabled is False or not is_enabled():
+        return
+
+    get_registry().add_collector(collector)
+
+
+def render_metrics():
+    return get_registry().render()
+
+
+def dump_metrics(stream=None):
+    """
+    Writes the metrics of the current process using the Prometheus text
+    format into stream (stdout by default), intended to be used from
+    management commands and scripts
+    """
+
+    if stream is None:
+        stream = sys.stdout
+
+    stream.write(render_metrics())
+    stream.flush()
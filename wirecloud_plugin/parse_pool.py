@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Pool of long-lived worker processes parsing templates outside the WStore
+request threads. Each job is bounded by a wall-clock timeout and a resident
+memory limit (the worker is killed and replaced when they are exceeded) and
+workers are recycled after a number of jobs.
+"""
+
+from __future__ import unicode_literals
+
+import atexit
+import mmap
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import django
+from django.conf import settings
+
+from .template import TemplateParser, TemplateParseException, UnsupportedFeature
+from .wgt import InvalidContents
+
+
+DEFAULT_TIMEOUT = 60
+DEFAULT_MAX_RSS = 512 * 1024 * 1024
+DEFAULT_MAX_JOBS = 100
+DEFAULT_STOP_TIMEOUT = 5
+# Maximum number of seconds a new worker can spend loading the parsers
+STARTUP_TIMEOUT = 60
+# Interval in seconds between checks of the memory used by a busy worker
+RSS_CHECK_INTERVAL = 0.05
+
+# Settings passed to the workers, in addition to the settings of the plugin
+WORKER_SETTINGS = ('USE_I18N', 'LANGUAGE_CODE', 'LANGUAGES')
+
+# Exceptions raised again when reported by the workers
+ERROR_CLASSES = dict((error_class.__name__, error_class) for error_class in (TemplateParseException, UnsupportedFeature, InvalidContents, ValueError))
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+class ParseWorkerError(Exception):
+    pass
+
+
+class ParseTimeout(TemplateParseException):
+    pass
+
+
+class ParseMemoryLimitExceeded(TemplateParseException):
+    pass
+
+
+def get_process_rss(pid):
+    """
+    Returns the resident set size in bytes of the given process, or None if
+    it cannot be obtained (only supported on systems providing /proc)
+    """
+    try:
+        with open('/proc/%d/statm' % pid, 'rb') as f:
+            return int(f.read().split()[1]) * mmap.PAGESIZE
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+def _preload():
+    # Compiled schemas and the parsers (including rdflib and its parser
+    # plugins, loaded lazily by the web processes) are ready before the
+    # first job
+    from .template.parsers import rdf, xml  # noqa
+    import rdflib
+
+    xml.get_xml_schema()
+    for rdf_format in ('xml', 'n3'):
+        rdflib.plugin.get(rdf_format, rdflib.parser.Parser)
+
+
+def parse_template(template):
+    """
+    Parses the given template returning a plain dict with either the type
+    and the info of the resource or the details of the error found
+    """
+    try:
+        template_parser = TemplateParser(template)
+        return {
+            'resource_type': template_parser.get_resource_type(),
+            'info': template_parser.get_resource_info(),
+        }
+    except Exception as e:
+        return {
+            'error': e.__class__.__name__,
+            'message': '%s' % e,
+        }
+
+
+def _get_context():
+    # Forking a multithreaded process may leave the child waiting forever
+    # for a lock held by another thread of the parent (e.g. the XML schema
+    # or logging locks), so workers are started from a clean process
+    if not hasattr(multiprocessing, 'get_context'):
+        # Python 2 only supports fork
+        return multiprocessing
+
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(start_method)
+
+
+def _get_worker_settings():
+    if not settings.configured:
+        return {}
+
+    worker_settings = dict((name, getattr(settings, name)) for name in dir(settings) if name.startswith('WIRECLOUD_PLUGIN_') or name in WORKER_SETTINGS)
+    # Workers always parse the templates by themselves
+    worker_settings['WIRECLOUD_PLUGIN_PARSE_WORKERS'] = 0
+    return worker_settings
+
+
+def _run_worker(connection, worker_settings):
+    # Interruptions and termination are managed by the parent process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Workers only load the settings needed by the parsers instead of the
+    # whole WStore project
+    if not settings.configured:
+        settings.configure(**worker_settings)
+        # The translation catalogs require the app registry
+        if settings.USE_I18N and hasattr(django, 'setup'):
+            django.setup()
+
+    _preload()
+    connection.send('ready')
+
+    while True:
+        try:
+            template = connection.recv()
+        except EOFError:
+            return
+
+        if template is None:
+            return
+
+        connection.send(parse_template(template))
+
+
+class ParseWorker(object):
+
+    def __init__(self, worker_settings=None):
+        context = _get_context()
+        if worker_settings is None:
+            worker_settings = _get_worker_settings()
+
+        self._connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_run_worker, args=(child_connection, worker_settings), name='template-parser')
+        self.process.daemon = True
+        self.process.start()
+        child_connection.close()
+        self.jobs = 0
+        self._ready = False
+
+    def _wait_ready(self):
+        # Loading the parsers is not accounted in the timeout of the jobs
+        try:
+            if self._connection.poll(STARTUP_TIMEOUT) and self._connection.recv() == 'ready':
+                self._ready = True
+                return
+        except (EOFError, IOError, OSError):
+            pass
+
+        self.kill()
+        raise ParseWorkerError('The template parser process could not be started')
+
+    def run(self, template, timeout=None, max_rss=None):
+        """
+        Parses the given template in the worker process, killing the worker
+        if the job exceeds the given timeout or memory limit
+        """
+        if not self._ready:
+            self._wait_ready()
+
+        self.jobs += 1
+        deadline = None if timeout is None else time.time() + timeout
+
+        try:
+            self._connection.send(template)
+            while True:
+                wait = RSS_CHECK_INTERVAL if max_rss is not None else None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.kill()
+                        raise ParseTimeout('The template could not be parsed in %s seconds' % timeout)
+                    wait = remaining if wait is None else min(wait, remaining)
+
+                if self._connection.poll(wait):
+                    return self._connection.recv()
+
+                rss = get_process_rss(self.process.pid) if max_rss is not None else None
+                if rss is not None and rss > max_rss:
+                    self.kill()
+                    raise ParseMemoryLimitExceeded('The memory required for parsing the template exceeds the limit of %d MiB' % (max_rss // (1024 * 1024)))
+        except (EOFError, IOError, OSError):
+            self.kill()
+            raise ParseWorkerError('The template parser process died unexpectedly')
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self, timeout=DEFAULT_STOP_TIMEOUT):
+        try:
+            self._connection.send(None)
+        except (IOError, OSError):
+            pass
+
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self._connection.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self._connection.close()
+
+
+class ParseWorkerPool(object):
+    """
+    Thread safe pool of template parser processes. Workers are started on
+    demand, up to the configured number of workers, and each of them
+    parses a template at a time
+    """
+
+    def __init__(self, workers, timeout=DEFAULT_TIMEOUT, max_rss=DEFAULT_MAX_RSS, max_jobs=DEFAULT_MAX_JOBS):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.max_jobs = max_jobs
+
+        self._worker_settings = _get_worker_settings()
+        self._idle = []
+        self._started = 0
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._stopping = False
+
+    def _acquire_worker(self):
+        with self._cond:
+            if self._pid != os.getpid():
+                # Workers are not inherited by forked processes
+                self._pid = os.getpid()
+                self._idle = []
+                self._started = 0
+
+            while len(self._idle) == 0 and self._started >= self.workers:
+                self._cond.wait()
+
+            if self._stopping:
+                raise ParseWorkerError('The template parser pool has been stopped')
+
+            if len(self._idle) > 0:
+                return self._idle.pop()
+
+            self._started += 1
+
+        try:
+            return ParseWorker(self._worker_settings)
+        except:
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            raise
+
+    def _is_reusable(self, worker):
+        if self._stopping or not worker.is_alive():
+            return False
+        elif self.max_jobs is not None and worker.jobs >= self.max_jobs:
+            return False
+
+        # Memory is not always returned to the system once the job finishes
+        rss = get_process_rss(worker.process.pid) if self.max_rss is not None else None
+        return rss is None or rss <= self.max_rss
+
+    def _release_worker(self, worker):
+        reusable = self._is_reusable(worker)
+        if not reusable:
+            worker.stop()
+
+        with self._cond:
+            if reusable:
+                self._idle.append(worker)
+            else:
+                self._started -= 1
+            self._cond.notify()
+
+    def parse(self, template):
+        """
+        Parses the given template in one of the workers, returning a dict
+        with the type (resource_type) and the info (info) of the resource
+        """
+        worker = self._acquire_worker()
+        try:
+            result = worker.run(template, self.timeout, self.max_rss)
+        finally:
+            self._release_worker(worker)
+
+        if 'error' in result:
+            error_class = ERROR_CLASSES.get(result['error'])
+            if error_class is None:
+                raise ParseWorkerError(result['message'])
+            raise error_class(result['message'])
+
+        return result
+
+    def shutdown(self):
+        with self._cond:
+            self._stopping = True
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+            self._cond.notify_all()
+
+        if self._pid == os.getpid():
+            for worker in idle:
+                worker.stop()
+
+
+def get_parse_pool():
+    """
+    Returns the pool of template parser processes or None if templates
+    have to be parsed in the current process
+    """
+    global _parse_pool
+
+    workers = getattr(settings, 'WIRECLOUD_PLUGIN_PARSE_WORKERS', 0)
+    if not workers:
+        return None
+
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ParseWorkerPool(
+                    workers,
+                    timeout=getattr(settings, 'WIRECLOUD_PLUGIN_PARSE_TIMEOUT', DEFAULT_TIMEOUT),
+                    max_rss=getattr(settings, 'WIRECLOUD_PLUGIN_PARSE_WORKER_MAX_RSS', DEFAULT_MAX_RSS),
+                    max_jobs=getattr(settings, 'WIRECLOUD_PLUGIN_PARSE_WORKER_MAX_JOBS', DEFAULT_MAX_JOBS),
+                )
+                atexit.register(_parse_pool.shutdown)
+
+    return _parse_pool
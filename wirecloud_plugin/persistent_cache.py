@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+SQLite store keeping the parsed info of wgt files across process restarts,
+used as a second level for the in-memory parse cache. Entries are indexed
+by the hash of the wgt contents and by a version key computed from the
+plugin version, the template schemas, the parser code and the wgt checks,
+so updating any of them invalidates the previous entries.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+from .cache import ParsedResource
+from .wgt import get_wgt_limits
+
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_FILENAME = 'wirecloud_plugin_cache.sqlite3'
+DEFAULT_BUSY_TIMEOUT = 5
+# Access times are only updated when older than this number of seconds, so
+# most lookups do not need to write into the database
+ACCESS_TIME_RESOLUTION = 60
+# Entries of other versions are kept while they are being used, e.g. by the
+# processes still running the previous version during a rolling deploy
+STALE_VERSION_TTL = 60 * 60
+# Bumped when the layout of the stored entries changes
+FORMAT_VERSION = '1'
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+# Entries found on the cache skip the checks done by WgtFile, so they are
+# also invalidated when these checks or their limits change
+VERSION_SOURCES = ('package.json', 'cache.py', 'frozen.py', 'wgt.py', 'template')
+
+logger = logging.getLogger(__name__)
+
+_version = None
+
+_persistent_cache = None
+_persistent_cache_lock = threading.Lock()
+
+
+def get_version():
+    """
+    Returns a key identifying the plugin version, the template schemas, the
+    code of the parsers and the wgt checks currently installed and the
+    configured wgt limits
+    """
+    global _version
+
+    if _version is None:
+        digest = hashlib.sha256(FORMAT_VERSION.encode('ascii'))
+        digest.update(json.dumps(get_wgt_limits()).encode('ascii'))
+
+        paths = []
+        for source in VERSION_SOURCES:
+            path = os.path.join(PLUGIN_DIR, source)
+            if not os.path.isdir(path):
+                paths.append(path)
+                continue
+
+            for root, dirs, files in os.walk(path):
+                dirs[:] = [directory for directory in dirs if directory != '__pycache__']
+                paths.extend(os.path.join(root, filename) for filename in files if filename.endswith(('.py', '.xsd', '.rdf', '.json')))
+
+        for path in sorted(paths):
+            digest.update(os.path.relpath(path, PLUGIN_DIR).replace(os.sep, '/').encode('utf-8'))
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+
+        _version = digest.hexdigest()
+
+    return _version
+
+
+class PersistentParseCache(object):
+    """
+    Size bounded SQLite store of parsed wgt files shared by all the
+    processes using the same database file. The database uses the WAL
+    journal mode, so readers are not blocked by writers. The least recently
+    used entries are evicted when the stored info exceeds max_size bytes,
+    and entries not used in the last ttl seconds expire.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL, version=None, busy_timeout=DEFAULT_BUSY_TIMEOUT, timer=time.time):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = version if version is not None else get_version()
+        self._busy_timeout = busy_timeout
+        self._timer = timer
+        # SQLite connections can be neither shared by threads nor inherited
+        # by forked processes
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=self._busy_timeout, isolation_level=None)
+        try:
+            self._init_database(connection)
+        except:
+            connection.close()
+            raise
+
+        return connection
+
+    def _set_wal_mode(self, connection):
+        # The journal mode is stored in the database file, but changing it
+        # requires an exclusive lock not covered by the busy timeout
+        deadline = time.time() + self._busy_timeout
+        while connection.execute('PRAGMA journal_mode').fetchone()[0] != 'wal':
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.OperationalError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.01)
+
+    def _init_database(self, connection):
+        self._set_wal_mode(connection)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS parsed_resources ('
+            'hash TEXT NOT NULL, '
+            'version TEXT NOT NULL, '
+            'resource_type TEXT NOT NULL, '
+            'info BLOB NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'accessed REAL NOT NULL, '
+            'PRIMARY KEY (hash, version))'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS parsed_resources_accessed ON parsed_resources (accessed)')
+
+    def _get_connection(self):
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.connection = self._connect()
+            self._local.pid = pid
+
+        return self._local.connection
+
+    def get(self, key):
+        try:
+            connection = self._get_connection()
+            row = connection.execute(
+                'SELECT resource_type, info, accessed FROM parsed_resources WHERE hash = ? AND version = ?',
+                (key, self.version)
+            ).fetchone()
+            if row is None:
+                return None
+
+            resource_type, info, accessed = row
+            now = self._timer()
+            if now - accessed > self.ttl:
+                # Expired, it will be removed on the next write
+                return None
+            elif now - accessed > ACCESS_TIME_RESOLUTION:
+                connection.execute(
+                    'UPDATE parsed_resources SET accessed = ? WHERE hash = ? AND version = ?',
+                    (now, key, self.version)
+                )
+        except sqlite3.Error:
+            logger.warning('Error reading the persistent parse cache', exc_info=True)
+            return None
+
+        try:
+            return ParsedResource(resource_type, json.loads(zlib.decompress(info).decode('utf-8')))
+        except (zlib.error, ValueError, TypeError):
+            # Corrupted entries are handled as misses, so the wgt file is
+            # parsed and stored again
+            logger.warning('Corrupted entry found on the persistent parse cache', exc_info=True)
+            self._delete(key)
+            return None
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        info = zlib.compress(json.dumps(value.get_frozen_resource_info(), separators=(',', ':')).encode('utf-8'))
+        if len(info) > self.max_size:
+            return
+
+        try:
+            connection = self._get_connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute(
+                    'INSERT OR REPLACE INTO parsed_resources (hash, version, resource_type, info, size, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, self.version, value.resource_type, sqlite3.Binary(info), len(info), self._timer())
+                )
+                self._purge(connection)
+                self._evict(connection)
+            except:
+                connection.execute('ROLLBACK')
+                raise
+            else:
+                connection.execute('COMMIT')
+        except sqlite3.Error:
+            logger.warning('Error writing into the persistent parse cache', exc_info=True)
+
+    def _purge(self, connection):
+        # Removes the expired entries and the entries of other versions no
+        # longer used
+        now = self._timer()
+        connection.execute(
+            'DELETE FROM parsed_resources WHERE accessed < ? AND (accessed < ? OR version != ?)',
+            (now - min(self.ttl, STALE_VERSION_TTL), now - self.ttl, self.version)
+        )
+
+    def _evict(self, connection):
+        size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM parsed_resources').fetchone()[0]
+        if size <= self.max_size:
+            return
+
+        rows = connection.execute('SELECT hash, version, size FROM parsed_resources ORDER BY accessed').fetchall()
+        evicted = []
+        for hash_, version, entry_size in rows:
+            if size <= self.max_size:
+                break
+
+            evicted.append((hash_, version))
+            size -= entry_size
+
+        connection.executemany('DELETE FROM parsed_resources WHERE hash = ? AND version = ?', evicted)
+
+    def get_or_set(self, key, builder):
+        value = self.get(key)
+        if value is None:
+            value = builder()
+            self.set(key, value)
+
+        return value
+
+    def _delete(self, key):
+        try:
+            self._get_connection().execute('DELETE FROM parsed_resources WHERE hash = ? AND version = ?', (key, self.version))
+        except sqlite3.Error:
+            logger.warning('Error writing into the persistent parse cache', exc_info=True)
+
+    def invalidate(self, key):
+        try:
+            self._get_connection().execute('DELETE FROM parsed_resources WHERE hash = ?', (key,))
+        except sqlite3.Error:
+            logger.warning('Error writing into the persistent parse cache', exc_info=True)
+
+    def clear(self):
+        self._get_connection().execute('DELETE FROM parsed_resources')
+
+    def __len__(self):
+        return self._get_connection().execute('SELECT COUNT(*) FROM parsed_resources WHERE version = ?', (self.version,)).fetchone()[0]
+
+
+def get_persistent_parse_cache():
+    """
+    Returns the persistent parse cache or None if it is not enabled
+    """
+    global _persistent_cache
+
+    if not getattr(settings, 'WIRECLOUD_PLUGIN_PERSISTENT_CACHE', False):
+        return None
+
+    if _persistent_cache is None:
+        with _persistent_cache_lock:
+            if _persistent_cache is None:
+                path = getattr(settings, 'WIRECLOUD_PLUGIN_PERSISTENT_CACHE_PATH', None)
+                if path is None:
+                    path = os.path.join(settings.BASEDIR, DEFAULT_FILENAME)
+
+                _persistent_cache = PersistentParseCache(
+                    path,
+                    max_size=getattr(settings, 'WIRECLOUD_PLUGIN_PERSISTENT_CACHE_MAX_SIZE', DEFAULT_MAX_SIZE),
+                    ttl=getattr(settings, 'WIRECLOUD_PLUGIN_PERSISTENT_CACHE_TTL', DEFAULT_TTL)
+                )
+
+    return _persistent_cache
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Index of the dependencies of the parsed components, able to resolve the
+transitive dependencies of mashups without parsing their templates again.
+"""
+
+from __future__ import unicode_literals
+
+import threading
+
+import six
+
+
+def get_resource_id(info):
+    return '/'.join((info['vendor'], info['name'], info['version']))
+
+
+def get_resource_dependencies(info):
+    """
+    Returns the ids (vendor/name/version) of the components directly used
+    by the resource described by info (only mashups have dependencies)
+    """
+
+    dependencies = set()
+
+    if info['type'] != 'mashup':
+        return dependencies
+
+    for tab_entry in info['tabs']:
+        for resource in tab_entry['resources']:
+            dependencies.add('/'.join([resource['vendor'], resource['name'], resource['version']]))
+
+    for id_, op in six.iteritems(info['wiring']['operators']):
+        dependencies.add(op['name'])
+
+    return dependencies
+
+
+class DependencyResolver(object):
+    """
+    Thread safe index of the direct dependencies of a set of components. The
+    transitive closure and the install order of each component are memoized
+    and only invalidated for the components depending (directly or
+    indirectly) on an added, updated or removed component.
+    """
+
+    def __init__(self):
+        self._dependencies = {}
+        # component id -> ids of the components directly depending on it
+        # (including not available components)
+        self._dependents = {}
+        self._closures = {}
+        # Install orders are only memoized for the requested components
+        self._orders = {}
+        # component id -> ids of the components of its cycle
+        self._cycles = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, resource_id):
+        return resource_id in self._dependencies
+
+    def __len__(self):
+        return len(self._dependencies)
+
+    def add_resource(self, info):
+        """
+        Adds (or updates) the component described by info, as returned by
+        TemplateParser.get_resource_info. Returns the id of the component.
+        """
+
+        resource_id = get_resource_id(info)
+        self.add(resource_id, get_resource_dependencies(info))
+        return resource_id
+
+    def add(self, resource_id, dependencies=()):
+
+        dependencies = frozenset(dependencies)
+
+        with self._lock:
+            previous = self._dependencies.get(resource_id)
+            if previous == dependencies:
+                return
+
+            for dependency in previous or ():
+                self._dependents[dependency].discard(resource_id)
+
+            for dependency in dependencies:
+                self._dependents.setdefault(dependency, set()).add(resource_id)
+
+            self._dependencies[resource_id] = dependencies
+            self._invalidate(resource_id)
+
+    def remove(self, resource_id):
+
+        with self._lock:
+            dependencies = self._dependencies.pop(resource_id, None)
+            if dependencies is None:
+                return
+
+            for dependency in dependencies:
+                self._dependents[dependency].discard(resource_id)
+
+            self._invalidate(resource_id)
+
+    def _invalidate(self, resource_id):
+
+        # Components depending on a not memoized component are not memoized
+        # either, so the search stops on them
+        pending = [resource_id]
+        while len(pending) > 0:
+            current = pending.pop()
+            if current not in self._closures:
+                continue
+
+            del self._closures[current]
+            self._orders.pop(current, None)
+            self._cycles.pop(current, None)
+            pending.extend(self._dependents.get(current, ()))
+
+    def get_dependencies(self, resource_id):
+        return self._dependencies.get(resource_id, frozenset())
+
+    def _get_sorted_dependencies(self, resource_id):
+        return sorted(self._dependencies.get(resource_id, ()))
+
+    def _find_components(self, root):
+        # Iterative version of the Tarjan's strongly connected components
+        # algorithm, components are returned in reverse topological order
+        # (dependencies first). Memoized components are not visited again.
+        index = {root: 0}
+        lowlink = {root: 0}
+        stack = [root]
+        on_stack = set(stack)
+        components = []
+
+        work = [(root, iter(self._dependencies.get(root, ())))]
+        while len(work) > 0:
+            node, children = work[-1]
+            for child in children:
+                if child in self._closures:
+                    continue
+                elif child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(self._dependencies.get(child, ()))))
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if len(work) > 0:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+
+        return components
+
+    def _resolve(self, root):
+
+        if root in self._closures:
+            return
+
+        for component in self._find_components(root):
+            members = set(component)
+            closure = set()
+
+            is_cycle = len(component) > 1 or component[0] in self._dependencies.get(component[0], ())
+            if is_cycle:
+                closure.update(members)
+
+            for member in component:
+                for dependency in self._dependencies.get(member, ()):
+                    if dependency not in members:
+                        closure.add(dependency)
+                        closure.update(self._closures[dependency])
+
+            if not is_cycle:
+                self._closures[component[0]] = frozenset(closure)
+                continue
+
+            cycle = tuple(component)
+            for member in component:
+                self._closures[member] = frozenset(closure - set((member,)))
+                self._cycles[member] = cycle
+
+    def get_closure(self, resource_id):
+        """
+        Returns the ids of all the components used directly or indirectly
+        by the given component (including not available components)
+        """
+
+        with self._lock:
+            self._resolve(resource_id)
+            return self._closures[resource_id]
+
+    def get_install_order(self, resource_id):
+        """
+        Returns the available components required for installing the given
+        component (including itself), sorted so components are placed after
+        their dependencies (except inside dependency cycles)
+        """
+
+        with self._lock:
+            self._resolve(resource_id)
+
+            order = self._orders.get(resource_id)
+            if order is None:
+                order = self._orders[resource_id] = tuple(self._sort(resource_id))
+
+            return list(order)
+
+    def _sort(self, root):
+        # Depth first post-order traversal
+        order = []
+        visited = set((root,))
+        work = [(root, iter(self._get_sorted_dependencies(root)))]
+        while len(work) > 0:
+            node, children = work[-1]
+            for child in children:
+                if child not in visited:
+                    visited.add(child)
+                    work.append((child, iter(self._get_sorted_dependencies(child))))
+                    break
+            else:
+                work.pop()
+                if node in self._dependencies:
+                    order.append(node)
+
+        return order
+
+    def get_missing(self, resource_id):
+
+        with self._lock:
+            return set(dependency for dependency in self.get_closure(resource_id) if dependency not in self._dependencies)
+
+    def get_cycles(self, resource_id):
+        """
+        Returns the dependency cycles (as sorted tuples of component ids)
+        found while resolving the dependencies of the given component
+        """
+
+        with self._lock:
+            closure = self.get_closure(resource_id)
+
+            cycles = set()
+            for component in closure | set((resource_id,)):
+                cycle = self._cycles.get(component)
+                if cycle is not None:
+                    cycles.add(cycle)
+
+            return sorted(cycles)
+
+    def resolve(self, resource_id):
+
+        with self._lock:
+            return {
+                'id': resource_id,
+                'available': resource_id in self._dependencies,
+                'closure': sorted(self.get_closure(resource_id)),
+                'install_order': self.get_install_order(resource_id),
+                'missing': sorted(self.get_missing(resource_id)),
+                'cycles': [list(cycle) for cycle in self.get_cycles(resource_id)],
+            }
@@ -17,16 +17,23 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
-from copy import deepcopy
+import codecs
+import hashlib
+from io import BytesIO
+from lxml import etree
 from six.moves.urllib.parse import urljoin
 
 import six
 
+from ...cache import get_processed_info_cache
+from ...frozen import freeze, thaw, FrozenDict, FrozenList
+from ...metrics import time_phase
 from ..base import TemplateParseException
+from ..dependencies import get_resource_dependencies
+from ..translation import TranslationPlan
 from .json import JSONTemplateParser
-from .xml import ApplicationMashupTemplateParser
-from .rdf import RDFTemplateParser
-from .old_xml import WirecloudTemplateParser
+from .xml import ApplicationMashupStreamingParser, ApplicationMashupTreeWalkParser, WIRECLOUD_TEMPLATE_NS
+from .old_xml import WirecloudTemplateParser, WIRECLOUD_TEMPLATE_NS as OLD_WIRECLOUD_TEMPLATE_NS
 
 
 __all__ = ('TemplateParseException', 'TemplateParser')
@@ -35,6 +42,17 @@ __all__ = ('TemplateParseException', 'TemplateParser')
 BASIC_URL_FIELDS = ['doc', 'image', 'smartphoneimage']
 
 
+RDF_NS = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+XML_WHITESPACE = ' \t\r\n'
+
+
+def RDFTemplateParser(template, doc=None):
+    # rdflib is expensive to import and rarely needed, so the RDF parser is
+    # only loaded when a template may be using that format
+    from .rdf import RDFTemplateParser
+    return RDFTemplateParser(template, doc)
+
+
 def absolutize_url_field(value, base_url):
     value = value.strip()
     if value != '':
@@ -47,15 +65,33 @@ class TemplateParser(object):
 
     _doc = None
     _parser = None
-    parsers = (ApplicationMashupTemplateParser, WirecloudTemplateParser, JSONTemplateParser, RDFTemplateParser)
+    _template_hash = None
+    _translation_plan = None
+    _frozen_info = None
+    _streamed_template = None
+    parsers = (ApplicationMashupTreeWalkParser, WirecloudTemplateParser, JSONTemplateParser, RDFTemplateParser)
+
+    # macdescription mashups bigger than this size (in bytes) are parsed
+    # incrementally, see ApplicationMashupStreamingParser. Only their raw
+    # document is retained (for get_contents) instead of their whole tree
+    streaming_threshold = 1024 * 1024
 
     def __init__(self, template, base=None):
 
+        with time_phase('parse'):
+            self._parse(template, base)
+
+    def _parse(self, template, base):
+
         self.base = base
 
-        for parser in self.parsers:
+        if isinstance(template, (bytes, six.text_type)):
+            data = template if isinstance(template, bytes) else template.encode('utf-8')
+            self._template_hash = hashlib.sha256(data).hexdigest()
+
+        for parser, args in self._get_candidate_parsers(template):
             try:
-                self._parser = parser(template)
+                self._parser = parser(*args)
                 break
             except:
                 pass
@@ -65,10 +101,81 @@ class TemplateParser(object):
 
         self._parser._init()
 
+    def _get_candidate_parsers(self, template):
+        """
+        Returns the (parser, args) pairs able to parse the given template,
+        sniffing its format so the template is parsed at most once. Parsed
+        XML documents are directly passed to the matching parser.
+        """
+
+        if isinstance(template, bytes):
+            if template.startswith(codecs.BOM_UTF8):
+                first_char = template[len(codecs.BOM_UTF8):].lstrip(XML_WHITESPACE.encode('ascii'))[:1]
+            elif template.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+                first_char = None
+            else:
+                first_char = template.lstrip(XML_WHITESPACE.encode('ascii'))[:1]
+            first_char = first_char.decode('ascii', 'replace') if first_char is not None else None
+        elif isinstance(template, six.text_type):
+            first_char = template.lstrip('\ufeff').lstrip(XML_WHITESPACE)[:1]
+        else:
+            first_char = None
+
+        if first_char is None:
+            # Unknown format, use all the available parsers
+            return [(parser, (template,)) for parser in self.parsers]
+
+        elif first_char == '{':
+            return [(JSONTemplateParser, (template,)), (RDFTemplateParser, (template,))]
+
+        elif first_char == '<':
+            data = template if isinstance(template, bytes) else template.encode('utf-8')
+
+            if len(data) > self.streaming_threshold and self._is_macdescription_mashup(data):
+                self._streamed_template = data
+                return [(ApplicationMashupStreamingParser, (data,))]
+
+            try:
+                doc = etree.fromstring(data)
+            except etree.XMLSyntaxError:
+                # May be a n3 document starting with an IRI
+                return [(RDFTemplateParser, (template,))]
+
+            root_element_qname = etree.QName(doc)
+            xmlns = root_element_qname.namespace
+            localname = root_element_qname.localname
+
+            if xmlns in (None, WIRECLOUD_TEMPLATE_NS) and localname in ('widget', 'operator', 'mashup'):
+                return [(ApplicationMashupTreeWalkParser, (doc,))]
+            elif xmlns in (None, OLD_WIRECLOUD_TEMPLATE_NS) and localname == 'Template':
+                return [(WirecloudTemplateParser, (doc,))]
+            elif xmlns == RDF_NS and localname == 'RDF':
+                return [(RDFTemplateParser, (template, doc))]
+            else:
+                return []
+
+        else:
+            return [(RDFTemplateParser, (template,))]
+
+    def _is_macdescription_mashup(self, template):
+
+        try:
+            event, root = next(etree.iterparse(BytesIO(template), events=('start',)))
+        except (etree.XMLSyntaxError, StopIteration):
+            return False
+
+        root_element_qname = etree.QName(root)
+        return root_element_qname.namespace in (None, WIRECLOUD_TEMPLATE_NS) and root_element_qname.localname == 'mashup'
+
     def set_base(self, base):
         self.base = base
 
     def get_contents(self):
+
+        if self._streamed_template is not None:
+            # The streaming parser does not retain the document
+            return ApplicationMashupTreeWalkParser(self._streamed_template).get_contents()
+
         return self._parser.get_contents()
 
     def get_resource_type(self):
@@ -85,7 +192,22 @@ class TemplateParser(object):
 
     def get_resource_info(self):
 
-        return self._parser.get_resource_info()
+        with time_phase('resource_info'):
+            return self._parser.get_resource_info()
+
+    def get_frozen_resource_info(self):
+        """
+        Returns an immutable version of the info returned by
+        get_resource_info. The frozen info is built only once and can be
+        shared without copying it, use its thaw method for obtaining a
+        mutable copy.
+        """
+
+        if self._frozen_info is None:
+            with time_phase('resource_info'):
+                self._frozen_info = freeze(self._parser.get_resource_info())
+
+        return self._frozen_info
 
     def get_absolute_url(self, url, base=None):
 
@@ -94,48 +216,179 @@ class TemplateParser(object):
 
         return urljoin(base, url)
 
+    def _get_translation_plan(self, info, variables):
+
+        if self._translation_plan is not None:
+            return self._translation_plan
+
+        # Indexes that can be used by each target
+        targets = {}
+        for index, usages in six.iteritems(info['translation_index_usage']):
+            for use in usages:
+                if use['type'] == 'resource':
+                    targets.setdefault(('resource', use['field']), set()).add(index)
+                elif use['type'] in ('vdef', 'inputendpoint', 'outputendpoint'):
+                    targets.setdefault(('variable', use['variable']), set()).add(index)
+                elif use['type'] == 'upo':
+                    targets.setdefault(('options', use['variable']), set()).add(index)
+
+        plan = TranslationPlan()
+        for (target_type, name), indexes in six.iteritems(targets):
+            if target_type == 'resource':
+                plan.add_target(('resource', name), info[name], indexes)
+                continue
+
+            container, i = variables[name]
+            if target_type == 'variable':
+                for field, value in six.iteritems(container[i]):
+                    if isinstance(value, six.string_types):
+                        plan.add_target(('variable', name, field), value, indexes)
+            else:
+                for position, option in enumerate(container[i]['options']):
+                    for field, value in six.iteritems(option):
+                        if isinstance(value, six.string_types):
+                            plan.add_target(('option', name, position, field), value, indexes)
+
+        self._translation_plan = plan
+        return plan
+
     def get_resource_processed_info(self, base=None, lang=None, process_urls=True, translate=True, process_variables=False):
-        info = deepcopy(self.get_resource_info())
 
         if translate and lang is None:
             from django.utils import translation
             lang = translation.get_language()
 
-        variables = {}
-        if info['type'] in ('widget', 'operator'):
-            for pref in info['preferences']:
-                variables[pref['name']] = pref
-            for prop in info['properties']:
-                variables[prop['name']] = prop
-            for inputendpoint in info['wiring']['inputs']:
-                variables[inputendpoint['name']] = inputendpoint
-            for outputendpoint in info['wiring']['outputs']:
-                variables[outputendpoint['name']] = outputendpoint
+        info = self._get_shared_processed_info(self.get_resource_info(), base, process_urls)
+        with time_phase('translation'):
+            return self._localize_processed_info(info, lang, translate, process_variables)
+
+    def get_resource_processed_infos(self, langs=None, base=None, process_urls=True, translate=True, process_variables=False):
+        """
+        Batch version of get_resource_processed_info returning a dict with
+        the processed info of the template for each of the languages in
+        langs (by default, all the languages provided by the template). The
+        language independent work is only done once and the results are
+        memoized, so they are returned frozen (see get_frozen_resource_info)
+        and shared by all the callers. Use their thaw method for obtaining a
+        mutable copy.
+        """
+
+        info = self.get_resource_info()
+        if langs is None:
+            langs = list(info['translations'])
+            if len(langs) == 0:
+                from django.utils import translation
+                langs = [translation.get_language()]
+
+        if base is None:
+            base = self.base
+
+        cache = get_processed_info_cache()
+        shared_info = None
+        results = {}
+
+        for lang in langs:
+            key = (self._template_hash, lang, base, process_urls, translate, process_variables)
+            processed_info = cache.get(key) if self._template_hash is not None else None
+
+            if processed_info is None:
+                if shared_info is None:
+                    # Starting from the frozen info, only the containers
+                    # modified for each language have to be frozen again
+                    shared_info = self._get_shared_processed_info(self.get_frozen_resource_info(), base, process_urls)
+
+                with time_phase('translation'):
+                    processed_info = freeze(self._localize_processed_info(shared_info, lang, translate, process_variables, frozen=True))
+                if self._template_hash is not None:
+                    cache.set(key, processed_info)
+
+            results[lang] = processed_info
+
+        return results
+
+    def _get_shared_processed_info(self, info, base, process_urls):
+        # Only the containers modified while processing the info are copied,
+        # the rest of the structure is shared with the given info (the one
+        # returned by get_resource_info or get_frozen_resource_info)
+        info = dict(info)
+
+        if process_urls is False:
+            return info
+
+        if base is None:
+            base = self.base
+
+        # process url fields
+        for field in BASIC_URL_FIELDS:
+            info[field] = absolutize_url_field(info[field], base)
+
+        if info['type'] == 'widget':
+            info['contents'] = dict(info['contents'])
+            info['contents']['src'] = absolutize_url_field(info['contents']['src'], base)
+            info['altcontents'] = [dict(altcontent) for altcontent in info['altcontents']]
+            for altcontent in info['altcontents']:
+                altcontent['src'] = absolutize_url_field(altcontent['src'], base)
+        elif info['type'] == 'operator':
+            info['js_files'] = [absolutize_url_field(js_file, base) for js_file in info['js_files']]
+
+        return info
+
+    def _localize_processed_info(self, shared_info, lang, translate, process_variables, frozen=False):
+
+        info = dict(shared_info)
 
         # process translations
         if translate and len(info['translations']) > 0:
 
-            translation = info['translations'][info['default_lang']]
+            # variable name -> (list, position) of its definition
+            variables = {}
+            if info['type'] in ('widget', 'operator'):
+                info['preferences'] = list(info['preferences'])
+                info['properties'] = list(info['properties'])
+                info['wiring'] = dict(info['wiring'])
+                info['wiring']['inputs'] = list(info['wiring']['inputs'])
+                info['wiring']['outputs'] = list(info['wiring']['outputs'])
+
+                for container in (info['preferences'], info['properties'], info['wiring']['inputs'], info['wiring']['outputs']):
+                    for i, variable in enumerate(container):
+                        variables[variable['name']] = (container, i)
+
+            copied_variables = set()
+            copied_options = set()
+
+            def get_writable_variable(name):
+                container, i = variables[name]
+                if name not in copied_variables:
+                    container[i] = dict(container[i])
+                    copied_variables.add(name)
+                return container[i]
+
+            translation = dict(info['translations'][info['default_lang']])
             if lang in info['translations']:
                 translation.update(info['translations'][lang])
 
-            for index in translation:
-                value = translation[index]
-                usages = info['translation_index_usage'][index]
-                for use in usages:
-                    if use['type'] == 'resource':
-                        info[use['field']] = info[use['field']].replace('__MSG_' + index + '__', value)
-                    elif use['type'] in ('vdef', 'inputendpoint', 'outputendpoint'):
-                        variable = variables[use['variable']]
-                        for field in variable:
-                            if isinstance(variable[field], six.string_types):
-                                variable[field] = variable[field].replace('__MSG_' + index + '__', value)
-                    elif use['type'] == 'upo':
-                        variable = variables[use['variable']]
-                        for option in variable['options']:
-                            for field in option:
-                                if isinstance(option[field], six.string_types):
-                                    option[field] = option[field].replace('__MSG_' + index + '__', value)
+            for target, text in self._get_translation_plan(info, variables).apply(translation):
+                if target[0] == 'resource':
+                    info[target[1]] = text
+                elif target[0] == 'variable':
+                    get_writable_variable(target[1])[target[2]] = text
+                else:
+                    variable = get_writable_variable(target[1])
+                    if target[1] not in copied_options:
+                        variable['options'] = [dict(option) for option in variable['options']]
+                        copied_options.add(target[1])
+                    variable['options'][target[2]][target[3]] = text
+
+            if frozen:
+                # The rest of the variable definitions come from the frozen
+                # info, so shallow copies are enough for freezing them
+                for name in copied_variables:
+                    container, i = variables[name]
+                    variable = container[i]
+                    if name in copied_options:
+                        variable['options'] = FrozenList([FrozenDict(option) for option in variable['options']])
+                    container[i] = FrozenDict(variable)
+
         del info['translations']
         del info['translation_index_usage']
 
@@ -143,6 +396,11 @@ class TemplateParser(object):
         if info['title'] == '':
             info['title'] = info['name']
 
+        if not frozen:
+            # Untouched containers are still shared with the parsed info,
+            # callers get their own copy so they can modify the result
+            info = thaw(info)
+
         # Process resource variables
         if process_variables and info['type'] in ('widget', 'operator'):
 
@@ -160,38 +418,8 @@ class TemplateParser(object):
                 info['variables']['all'][vardef['name']] = vardef
                 info['variables']['properties'][vardef['name']] = vardef
 
-        if process_urls is False:
-            return info
-
-        if base is None:
-            base = self.base
-
-        # process url fields
-        for field in BASIC_URL_FIELDS:
-            info[field] = absolutize_url_field(info[field], base)
-
-        if info['type'] == 'widget':
-            info['contents']['src'] = absolutize_url_field(info['contents']['src'], base)
-            for altcontent in info['altcontents']:
-                altcontent['src'] = absolutize_url_field(altcontent['src'], base)
-        elif info['type'] == 'operator':
-            info['js_files'] = [absolutize_url_field(js_file, base) for js_file in info['js_files']]
-
         return info
 
     def get_resource_dependencies(self):
 
-        dependencies = set()
-
-        info = self.get_resource_info()
-        if info['type'] != 'mashup':
-            return dependencies
-
-        for tab_entry in info['tabs']:
-            for resource in tab_entry['resources']:
-                dependencies.add('/'.join([resource['vendor'], resource['name'], resource['version']]))
-
-        for id_, op in six.iteritems(info['wiring']['operators']):
-            dependencies.add(op['name'])
-
-        return dependencies
+        return get_resource_dependencies(self.get_resource_info())
@@ -19,22 +19,17 @@
 
 from __future__ import unicode_literals
 
-import codecs
 from lxml import etree
-import os
 
 from django.utils.translation import ugettext as _
 from six import text_type
 
 from ..base import parse_contacts_info, TemplateParseException
 from ..translation import get_trans_index
+from ..xpath import get_xpath_evaluator
+from .xml import get_xml_schema
 
 
-XMLSCHEMA_FILE = codecs.open(os.path.join(os.path.dirname(__file__), '../schemas/xml_schema.xsd'), 'rb')
-XMLSCHEMA_DOC = etree.parse(XMLSCHEMA_FILE)
-XMLSCHEMA_FILE.close()
-XMLSCHEMA = etree.XMLSchema(XMLSCHEMA_DOC)
-
 WIRECLOUD_TEMPLATE_NS = 'http://wirecloud.conwet.fi.upm.es/ns/macdescription/1'
 
 RESOURCE_DESCRIPTION_XPATH = 't:details'
@@ -122,7 +117,7 @@ class ApplicationMashupTemplateParser(object):
     def _init(self):
 
         try:
-            XMLSCHEMA.assertValid(self._doc)
+            get_xml_schema().assertValid(self._doc)
         except Exception as e:
             raise TemplateParseException('%s' % e)
 
@@ -130,7 +125,7 @@ class ApplicationMashupTemplateParser(object):
         self._parse_basic_info()
 
     def _xpath(self, query, element):
-        return element.xpath(query, namespaces={'t': self._namespace})
+        return get_xpath_evaluator(query, self._namespace)(element)
 
     def get_xpath(self, query, element):
         elements = self._xpath(query, element)
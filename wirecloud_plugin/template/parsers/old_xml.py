@@ -25,6 +25,7 @@ from six import text_type
 from ..base import is_valid_name, is_valid_vendor, is_valid_version, parse_contacts_info, TemplateParseException
 from ..translation import get_trans_index
 from ..wiring import get_wiring_skeleton
+from ..xpath import get_xpath_evaluator
 
 
 WIRECLOUD_TEMPLATE_NS = 'http://wirecloud.conwet.fi.upm.es/ns/template#'
@@ -123,11 +124,7 @@ class WirecloudTemplateParser(object):
             self._info['type'] = 'widget'
 
     def _xpath(self, query, element):
-        if self._namespace is not None:
-            return element.xpath(query, namespaces={'t': self._namespace})
-        else:
-            query = query.replace('t:', '')
-            return element.xpath(query)
+        return get_xpath_evaluator(query, self._namespace)(element)
 
     def get_xpath(self, query, element):
         elements = self._xpath(query, element)
@@ -28,6 +28,7 @@ from six import text_type
 from ..http import parse_mime_type
 from ..base import is_valid_name, is_valid_vendor, is_valid_version, TemplateParseException
 from ..wiring import parse_wiring_old_version, get_wiring_skeleton
+from .rdfxml import read_rdfxml, UnsupportedRDFXML
 
 # Namespaces used by rdflib
 WIRE = rdflib.Namespace("http://wirecloud.conwet.fi.upm.es/ns/widget#")
@@ -50,20 +51,82 @@ def possible_int(value):
         return value
 
 
+class TripleIndex(object):
+    """
+    Snapshot of the triples of a graph indexed by subject and predicate, so
+    looking up the objects of a subject is a dictionary hit instead of a
+    store scan. Objects and subjects are returned in the same order used by
+    the graph. Indexes can also be filled directly using the add method.
+    """
+
+    def __init__(self, graph=None):
+
+        self._graph = graph
+        self._spo = {}
+        self._pos = {}
+
+        if graph is None:
+            return
+
+        for subject, predicate, obj in graph:
+            predicates = self._spo.setdefault(subject, {})
+            if predicate not in predicates:
+                predicates[predicate] = tuple(graph.objects(subject, predicate))
+
+    def add(self, subject, predicate, obj):
+
+        # Duplicated triples are ignored, keeping the position of the first
+        # occurrence as rdflib does
+        objects = self._spo.setdefault(subject, {}).setdefault(predicate, {})
+        if obj not in objects:
+            objects[obj] = None
+            self._pos.setdefault((predicate, obj), {})[subject] = None
+
+    def objects(self, subject, predicate):
+
+        predicates = self._spo.get(subject)
+        if predicates is None:
+            return iter(())
+
+        return iter(predicates.get(predicate, ()))
+
+    def subjects(self, predicate, obj):
+
+        key = (predicate, obj)
+        if key not in self._pos and self._graph is not None:
+            self._pos[key] = tuple(self._graph.subjects(predicate, obj))
+
+        return iter(self._pos.get(key, ()))
+
+
 class RDFTemplateParser(object):
 
     _graph = None
+    _template = None
+    _triples = None
     _parsed = False
     _rootURI = None
 
-    def __init__(self, template):
+    def __init__(self, template, doc=None):
+        # doc can be used for passing the lxml tree of template when it has
+        # already been parsed. The n3 parser is only tried when template is
+        # not a XML document
 
         if isinstance(template, rdflib.Graph):
             self._graph = template
-        else:
+            return
+
+        if doc is None and isinstance(template, (bytes, text_type)):
+            try:
+                doc = etree.fromstring(template if isinstance(template, bytes) else template.encode('utf-8'))
+            except etree.XMLSyntaxError:
+                pass
+
+        if doc is None:
             try:
                 self._graph = rdflib.Graph()
                 self._graph.parse(data=template, format='n3')
+                return
             except:
                 if isinstance(template, bytes):
                     doc = etree.fromstring(template)
@@ -72,36 +135,47 @@ class RDFTemplateParser(object):
                     # declaration are not supported.
                     doc = etree.fromstring(template.encode('utf-8'))
 
-                root_element_qname = etree.QName(doc)
+        root_element_qname = etree.QName(doc)
 
-                if root_element_qname.namespace is None:
-                    raise TemplateParseException("XML document does not contain a valid rdf namespace")
+        if root_element_qname.namespace is None:
+            raise TemplateParseException("XML document does not contain a valid rdf namespace")
 
-                if root_element_qname.namespace != RDF_NS:
-                    raise TemplateParseException("Invalid namespace: " + root_element_qname.namespace)
+        if root_element_qname.namespace != RDF_NS:
+            raise TemplateParseException("Invalid namespace: " + root_element_qname.namespace)
 
-                if root_element_qname.localname != 'RDF':
-                    raise TemplateParseException("Invalid root element: " + root_element_qname.localname)
+        if root_element_qname.localname != 'RDF':
+            raise TemplateParseException("Invalid root element: " + root_element_qname.localname)
 
-                self._graph = rdflib.Graph()
-                self._graph.parse(data=template, format='xml')
+        self._template = template
+        try:
+            # Read the triples directly from the lxml tree, the rdflib graph
+            # will only be built if the contents of the template are requested
+            self._triples = TripleIndex()
+            read_rdfxml(doc, self._triples)
+        except UnsupportedRDFXML:
+            self._triples = None
+            self._graph = rdflib.Graph()
+            self._graph.parse(data=template, format='xml')
 
     def _init(self):
 
+        if self._triples is None:
+            self._triples = TripleIndex(self._graph)
+
         self._info = {}
         self._translation_indexes = {}
         self._translations = {}
 
         # check if is a mashup, a widget or an operator
-        for type_ in self._graph.subjects(RDF['type'], WIRE['Widget']):
+        for type_ in self._triples.subjects(RDF['type'], WIRE['Widget']):
             self._info['type'] = 'widget'
             break
         else:
-            for t in self._graph.subjects(RDF['type'], WIRE['Operator']):
+            for t in self._triples.subjects(RDF['type'], WIRE['Operator']):
                 self._info['type'] = 'operator'
                 break
             else:
-                for t in self._graph.subjects(RDF['type'], WIRE_M['Mashup']):
+                for t in self._triples.subjects(RDF['type'], WIRE_M['Mashup']):
                     self._info['type'] = 'mashup'
                     break
                 else:
@@ -120,7 +194,7 @@ class RDFTemplateParser(object):
         translated = False
         base_value = None
 
-        for field_element in self._graph.objects(subject, namespace[element]):
+        for field_element in self._triples.objects(subject, namespace[element]):
 
             if not isinstance(field_element, rdflib.Literal):
                 msg = _('invalid content for field: %(field)s')
@@ -161,7 +235,7 @@ class RDFTemplateParser(object):
 
     def _get_field(self, namespace, element, subject, required=True, id_=False, default=''):
 
-        fields = self._graph.objects(subject, namespace[element])
+        fields = self._triples.objects(subject, namespace[element])
         for field_element in fields:
             if not id_:
                 result = text_type(field_element)
@@ -180,7 +254,7 @@ class RDFTemplateParser(object):
     def _parse_people_field(self, namespace, element, subject):
 
         people = []
-        sorted_people = sorted(self._graph.objects(subject, namespace[element]), key=lambda person: possible_int(self._get_field(WIRE, 'index', person, required=False)))
+        sorted_people = sorted(self._triples.objects(subject, namespace[element]), key=lambda person: possible_int(self._get_field(WIRE, 'index', person, required=False)))
         for person in sorted_people:
             name = self._get_field(FOAF, 'name', person, required=False)
             if name == '':
@@ -217,11 +291,11 @@ class RDFTemplateParser(object):
 
         # ------------------------------------------
         if self._info['type'] == 'widget':
-            self._rootURI = next(self._graph.subjects(RDF['type'], WIRE['Widget']))
+            self._rootURI = next(self._triples.subjects(RDF['type'], WIRE['Widget']))
         elif self._info['type'] == 'mashup':
-            self._rootURI = next(self._graph.subjects(RDF['type'], WIRE_M['Mashup']))
+            self._rootURI = next(self._triples.subjects(RDF['type'], WIRE_M['Mashup']))
         elif self._info['type'] == 'operator':
-            self._rootURI = next(self._graph.subjects(RDF['type'], WIRE['Operator']))
+            self._rootURI = next(self._triples.subjects(RDF['type'], WIRE['Operator']))
 
         vendor = self._get_field(USDL, 'hasProvider', self._rootURI, id_=True)
         self._info['vendor'] = self._get_field(FOAF, 'name', vendor)
@@ -276,8 +350,8 @@ class RDFTemplateParser(object):
     def _parse_requirements(self):
         self._info['requirements'] = []
 
-        for wrequirement in self._graph.objects(self._rootURI, WIRE['hasRequirement']):
-            if next(self._graph.objects(wrequirement, RDF['type'])) == WIRE['Feature']:
+        for wrequirement in self._triples.objects(self._rootURI, WIRE['hasRequirement']):
+            if next(self._triples.objects(wrequirement, RDF['type'])) == WIRE['Feature']:
                 self._info['requirements'].append({
                     'type': 'feature',
                     'name': self._get_field(RDFS, 'label', wrequirement, required=True),
@@ -301,7 +375,7 @@ class RDFTemplateParser(object):
         if self._info['type'] == 'mashup':
             self._info['wiring']['version'] = self._get_field(USDL, 'versionInfo', wiring_element, default="1.0", required=False)
 
-        sorted_inputs = sorted(self._graph.objects(wiring_element, WIRE['hasInputEndpoint']), key=lambda source: possible_int(self._get_field(WIRE, 'index', source, required=False)))
+        sorted_inputs = sorted(self._triples.objects(wiring_element, WIRE['hasInputEndpoint']), key=lambda source: possible_int(self._get_field(WIRE, 'index', source, required=False)))
 
         for input_endpoint in sorted_inputs:
             var_name = self._get_field(DCTERMS, 'title', input_endpoint, required=True)
@@ -314,7 +388,7 @@ class RDFTemplateParser(object):
                 'friendcode': self._get_field(WIRE, 'friendcode', input_endpoint, required=False),
             })
 
-        sorted_outputs = sorted(self._graph.objects(wiring_element, WIRE['hasOutputEndpoint']), key=lambda output: possible_int(self._get_field(WIRE, 'index', output, required=False)))
+        sorted_outputs = sorted(self._triples.objects(wiring_element, WIRE['hasOutputEndpoint']), key=lambda output: possible_int(self._get_field(WIRE, 'index', output, required=False)))
 
         for output_endpoint in sorted_outputs:
             var_name = self._get_field(DCTERMS, 'title', output_endpoint, required=True)
@@ -339,14 +413,14 @@ class RDFTemplateParser(object):
 
         connections = []
 
-        for connection in self._graph.objects(wiring_element, WIRE_M['hasConnection']):
+        for connection in self._triples.objects(wiring_element, WIRE_M['hasConnection']):
             connection_info = {
                 'readonly': self._get_field(WIRE_M, 'readonly', connection, required=False).lower() == 'true',
                 'source': {},
                 'target': {},
             }
 
-            for source in self._graph.objects(connection, WIRE_M['hasSource']):
+            for source in self._triples.objects(connection, WIRE_M['hasSource']):
                 connection_info['source'] = {
                     'id': self._get_field(WIRE_M, 'sourceId', source),
                     'endpoint': self._get_field(WIRE_M, 'endpoint', source),
@@ -356,7 +430,7 @@ class RDFTemplateParser(object):
             else:
                 raise TemplateParseException(_('missing required field: source'))
 
-            for target in self._graph.objects(connection, WIRE_M['hasTarget']):
+            for target in self._triples.objects(connection, WIRE_M['hasTarget']):
                 connection_info['target'] = {
                     'id': self._get_field(WIRE_M, 'targetId', target),
                     'endpoint': self._get_field(WIRE_M, 'endpoint', target),
@@ -374,14 +448,14 @@ class RDFTemplateParser(object):
 
         self._info['wiring']['operators'] = {}
 
-        for operator in self._graph.objects(wiring_element, WIRE_M['hasiOperator']):
+        for operator in self._triples.objects(wiring_element, WIRE_M['hasiOperator']):
             operator_info = {
                 'id': self._get_field(WIRE_M, 'iOperatorId', operator),
                 'name': self._get_field(DCTERMS, 'title', operator),
                 'preferences': {},
             }
 
-            for pref in self._graph.objects(operator, WIRE_M['hasiOperatorPreference']):
+            for pref in self._triples.objects(operator, WIRE_M['hasiOperatorPreference']):
                 operator_info['preferences'][self._get_field(DCTERMS, 'title', pref)] = {
                     'readonly': self._get_field(WIRE_M, 'readonly', pref, required=False).lower() == 'true',
                     'hidden': self._get_field(WIRE_M, 'hidden', pref, required=False).lower() == 'true',
@@ -397,7 +471,7 @@ class RDFTemplateParser(object):
             'widget': {}
         }
 
-        for entity_view in self._graph.objects(element, WIRE_M['hasComponentView']):
+        for entity_view in self._triples.objects(element, WIRE_M['hasComponentView']):
 
             type_ = self._get_field(WIRE, 'type', entity_view)
             id_ = self._get_field(WIRE, 'id', entity_view)
@@ -406,8 +480,8 @@ class RDFTemplateParser(object):
 
             component_view_description['collapsed'] = self._get_field(WIRE_M, 'collapsed', entity_view, required=False).lower() == 'true'
 
-            sorted_sources = sorted(self._graph.objects(entity_view, WIRE_M['hasSource']), key=lambda source: possible_int(self._get_field(WIRE, 'index', source, required=False)))
-            sorted_targets = sorted(self._graph.objects(entity_view, WIRE_M['hasTarget']), key=lambda target: possible_int(self._get_field(WIRE, 'index', target, required=False)))
+            sorted_sources = sorted(self._triples.objects(entity_view, WIRE_M['hasSource']), key=lambda source: possible_int(self._get_field(WIRE, 'index', source, required=False)))
+            sorted_targets = sorted(self._triples.objects(entity_view, WIRE_M['hasTarget']), key=lambda target: possible_int(self._get_field(WIRE, 'index', target, required=False)))
 
             component_view_description['endpoints'] = {}
             component_view_description['endpoints']['source'] = [self._get_field(RDFS, 'label', sourc) for sourc in sorted_sources]
@@ -440,10 +514,10 @@ class RDFTemplateParser(object):
 
         behaviour['connections'] = []
 
-        for connection in self._graph.objects(element, WIRE_M['hasConnectionView']):
+        for connection in self._triples.objects(element, WIRE_M['hasConnectionView']):
             connection_info = {}
 
-            for source in self._graph.objects(connection, WIRE_M['hasSourceEndpoint']):
+            for source in self._triples.objects(connection, WIRE_M['hasSourceEndpoint']):
                 connection_info['sourcename'] = self._join_endpoint_name(source)
                 break
             else:
@@ -451,7 +525,7 @@ class RDFTemplateParser(object):
 
             connection_info['sourcehandle'] = self._parse_position(connection, relation_name='hasSourceHandlePosition', default="auto")
 
-            for target in self._graph.objects(connection, WIRE_M['hasTargetEndpoint']):
+            for target in self._triples.objects(connection, WIRE_M['hasTargetEndpoint']):
                 connection_info['targetname'] = self._join_endpoint_name(target)
                 break
             else:
@@ -470,7 +544,7 @@ class RDFTemplateParser(object):
         self._parse_wiring_components(wiring_element, visualdescription)
         self._parse_wiring_connections(wiring_element, visualdescription)
 
-        sorted_behaviours = sorted(self._graph.objects(wiring_element, WIRE_M['hasBehaviour']), key=lambda behaviour: possible_int(self._get_field(WIRE, 'index', behaviour, required=False)))
+        sorted_behaviours = sorted(self._triples.objects(wiring_element, WIRE_M['hasBehaviour']), key=lambda behaviour: possible_int(self._get_field(WIRE, 'index', behaviour, required=False)))
         for view in sorted_behaviours:
             behaviour = {
                 'title': self._get_field(RDFS, 'label', view),
@@ -488,7 +562,7 @@ class RDFTemplateParser(object):
 
         wiring_views = []
 
-        for view in self._graph.objects(wiring_element, WIRE_M['hasWiringView']):
+        for view in self._triples.objects(wiring_element, WIRE_M['hasWiringView']):
             element_view = {
                 'label': self._get_field(RDFS, 'label', view),
                 'iwidgets': {},
@@ -496,7 +570,7 @@ class RDFTemplateParser(object):
                 'connections': []
             }
 
-            for entity_view in self._graph.objects(view, WIRE_M['hasView']):
+            for entity_view in self._triples.objects(view, WIRE_M['hasView']):
 
                 type_ = self._get_field(WIRE, 'type', entity_view)
                 id_ = self._get_field(WIRE, 'id', entity_view)
@@ -506,14 +580,14 @@ class RDFTemplateParser(object):
                     'posY': self._get_field(WIRE_M, 'y', position)
                 }
                 endPointOut = {}
-                sorted_sources = sorted(self._graph.objects(entity_view, WIRE_M['hasSource']), key=lambda source: possible_int(self._get_field(WIRE, 'index', source, required=False)))
+                sorted_sources = sorted(self._triples.objects(entity_view, WIRE_M['hasSource']), key=lambda source: possible_int(self._get_field(WIRE, 'index', source, required=False)))
                 source = []
                 for sourc in sorted_sources:
                     source.append(self._get_field(RDFS, 'label', sourc))
 
                 endPointOut['sources'] = source
 
-                sorted_targets = sorted(self._graph.objects(entity_view, WIRE_M['hasTarget']), key=lambda target: possible_int(self._get_field(WIRE, 'index', target, required=False)))
+                sorted_targets = sorted(self._triples.objects(entity_view, WIRE_M['hasTarget']), key=lambda target: possible_int(self._get_field(WIRE, 'index', target, required=False)))
                 target = []
                 for targ in sorted_targets:
                     target.append(self._get_field(RDFS, 'label', targ))
@@ -548,7 +622,7 @@ class RDFTemplateParser(object):
         self._info['preferences'] = []
 
         # Platform preferences must be sorted
-        sorted_preferences = sorted(self._graph.objects(self._rootURI, WIRE['hasPlatformPreference']), key=lambda pref: possible_int(self._get_field(WIRE, 'index', pref, required=False)))
+        sorted_preferences = sorted(self._triples.objects(self._rootURI, WIRE['hasPlatformPreference']), key=lambda pref: possible_int(self._get_field(WIRE, 'index', pref, required=False)))
 
         for preference in sorted_preferences:
             var_name = self._get_field(DCTERMS, 'title', preference, required=True)
@@ -565,7 +639,7 @@ class RDFTemplateParser(object):
             if preference_info['type'] == 'list':
                 preference_info['options'] = []
 
-                sorted_options = sorted(self._graph.objects(preference, WIRE['hasOption']), key=lambda option: possible_int(self._get_field(WIRE, 'index', option, required=False)))
+                sorted_options = sorted(self._triples.objects(preference, WIRE['hasOption']), key=lambda option: possible_int(self._get_field(WIRE, 'index', option, required=False)))
                 for option_index, option in enumerate(sorted_options):
                     preference_info['options'].append({
                         'label': self._get_translation_field(DCTERMS, 'title', option, var_name + '_option' + str(option_index) + '_label', required=False, type='upo', variable=preference_info['name'], option=option_index),
@@ -577,7 +651,7 @@ class RDFTemplateParser(object):
         # State properties info
         self._info['properties'] = []
 
-        sorted_properties = sorted(self._graph.objects(self._rootURI, WIRE['hasPlatformStateProperty']), key=lambda prop: possible_int(self._get_field(WIRE, 'index', prop, required=False)))
+        sorted_properties = sorted(self._triples.objects(self._rootURI, WIRE['hasPlatformStateProperty']), key=lambda prop: possible_int(self._get_field(WIRE, 'index', prop, required=False)))
         for prop in sorted_properties:
             var_name = self._get_field(DCTERMS, 'title', prop, required=True)
             self._info['properties'].append({
@@ -594,7 +668,7 @@ class RDFTemplateParser(object):
         if self._info['type'] == 'widget':
             # It contains the widget code
             self._info['altcontents'] = []
-            sorted_contents = sorted(self._graph.objects(self._rootURI, USDL['utilizedResource']), key=lambda contents: possible_int(self._get_field(WIRE, 'index', contents, required=False)))
+            sorted_contents = sorted(self._triples.objects(self._rootURI, USDL['utilizedResource']), key=lambda contents: possible_int(self._get_field(WIRE, 'index', contents, required=False)))
 
             for contents_node in sorted_contents:
                 contents_info = {
@@ -637,7 +711,7 @@ class RDFTemplateParser(object):
             # The tamplate has 1-n javascript elements
 
             # Javascript files must be sorted
-            sorted_js_files = sorted(self._graph.objects(self._rootURI, USDL['utilizedResource']), key=lambda js_file: possible_int(self._get_field(WIRE, 'index', js_file, required=True)))
+            sorted_js_files = sorted(self._triples.objects(self._rootURI, USDL['utilizedResource']), key=lambda js_file: possible_int(self._get_field(WIRE, 'index', js_file, required=True)))
 
             self._info['js_files'] = []
             for js_element in sorted_js_files:
@@ -655,12 +729,12 @@ class RDFTemplateParser(object):
 
         preferences = {}
 
-        for preference in self._graph.objects(self._rootURI, WIRE_M['hasMashupPreference']):
+        for preference in self._triples.objects(self._rootURI, WIRE_M['hasMashupPreference']):
             preferences[self._get_field(DCTERMS, 'title', preference)] = self._get_field(WIRE, 'value', preference)
 
         self._info['preferences'] = preferences
 
-        ordered_params = sorted(self._graph.objects(self._rootURI, WIRE_M['hasMashupParam']), key=lambda raw_param: possible_int(self._get_field(WIRE, 'index', raw_param, required=False)))
+        ordered_params = sorted(self._triples.objects(self._rootURI, WIRE_M['hasMashupParam']), key=lambda raw_param: possible_int(self._get_field(WIRE, 'index', raw_param, required=False)))
         self._info['params'] = []
         for param in ordered_params:
             self._info['params'].append({
@@ -670,7 +744,7 @@ class RDFTemplateParser(object):
             })
 
         self._info['embedded'] = []
-        for resource in self._graph.objects(self._rootURI, WIRE_M['hasEmbeddedResource']):
+        for resource in self._triples.objects(self._rootURI, WIRE_M['hasEmbeddedResource']):
             vendor = self._get_field(USDL, 'hasProvider', resource, id_=True, required=True)
 
             self._info['embedded'].append({
@@ -680,7 +754,7 @@ class RDFTemplateParser(object):
                 'src': text_type(resource)
             })
 
-        ordered_tabs = sorted(self._graph.objects(self._rootURI, WIRE_M['hasTab']), key=lambda raw_tab: possible_int(self._get_field(WIRE, 'index', raw_tab, required=False)))
+        ordered_tabs = sorted(self._triples.objects(self._rootURI, WIRE_M['hasTab']), key=lambda raw_tab: possible_int(self._get_field(WIRE, 'index', raw_tab, required=False)))
 
         tabs = []
         for tab in ordered_tabs:
@@ -690,10 +764,10 @@ class RDFTemplateParser(object):
                 'resources': [],
             }
 
-            for preference in self._graph.objects(tab, WIRE_M['hasTabPreference']):
+            for preference in self._triples.objects(tab, WIRE_M['hasTabPreference']):
                 tab_info['preferences'][self._get_field(DCTERMS, 'title', preference)] = self._get_field(WIRE, 'value', preference)
 
-            for resource in self._graph.objects(tab, WIRE_M['hasiWidget']):
+            for resource in self._triples.objects(tab, WIRE_M['hasiWidget']):
                 position = self._get_field(WIRE_M, 'hasPosition', resource, id_=True, required=False)
                 rendering = self._get_field(WIRE_M, 'hasiWidgetRendering', resource, id_=True, required=False)
                 vendor = self._get_field(USDL, 'hasProvider', resource, id_=True, required=True)
@@ -721,13 +795,13 @@ class RDFTemplateParser(object):
                     },
                 }
 
-                for prop in self._graph.objects(resource, WIRE_M['hasiWidgetProperty']):
+                for prop in self._triples.objects(resource, WIRE_M['hasiWidgetProperty']):
                     resource_info['properties'][self._get_field(DCTERMS, 'title', prop)] = {
                         'readonly': self._get_field(WIRE_M, 'readonly', prop, required=False).lower() == 'true',
                         'value': self._get_field(WIRE, 'value', prop, default=None, required=False),
                     }
 
-                for pref in self._graph.objects(resource, WIRE_M['hasiWidgetPreference']):
+                for pref in self._triples.objects(resource, WIRE_M['hasiWidgetPreference']):
                     resource_info['preferences'][self._get_field(DCTERMS, 'title', pref)] = {
                         'readonly': self._get_field(WIRE_M, 'readonly', pref, required=False).lower() == 'true',
                         'hidden': self._get_field(WIRE_M, 'hidden', pref, required=False).lower() == 'true',
@@ -742,6 +816,11 @@ class RDFTemplateParser(object):
         self._parse_wiring_info(wiring_property='hasMashupWiring')
 
     def get_contents(self):
+
+        if self._graph is None:
+            self._graph = rdflib.Graph()
+            self._graph.parse(data=self._template, format='xml')
+
         return self._graph.serialize(format='pretty-xml')
 
     def get_resource_type(self):
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Reader extracting the triples of RDF/XML documents directly from their lxml
+tree. It only understands the subset of the RDF/XML syntax used by the
+WireCloud templates (node elements identified by rdf:about or rdf:nodeID,
+typed node elements, nested node elements, rdf:resource, rdf:nodeID,
+rdf:parseType="Resource", plain and typed literals), raising
+UnsupportedRDFXML for anything else so the caller can fall back to rdflib.
+The triples are emitted in the same order used by rdflib.
+"""
+
+from __future__ import unicode_literals
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import is_ncname
+from six import string_types
+
+
+RDF_NS = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+
+RDF_TYPE = URIRef(RDF_NS + 'type')
+
+ABOUT_ATTR = '{%s}about' % RDF_NS
+ID_ATTR = '{%s}ID' % RDF_NS
+NODEID_ATTR = '{%s}nodeID' % RDF_NS
+RESOURCE_ATTR = '{%s}resource' % RDF_NS
+DATATYPE_ATTR = '{%s}datatype' % RDF_NS
+PARSETYPE_ATTR = '{%s}parseType' % RDF_NS
+TYPE_ATTR = '{%s}type' % RDF_NS
+LANG_ATTR = '{%s}lang' % XML_NS
+BASE_ATTR = '{%s}base' % XML_NS
+
+RDF_DESCRIPTION = RDF_NS + 'Description'
+
+# Unqualified attributes accepted by rdflib as RDF terms
+UNQUALIFIED_ATTRS = {
+    'about': ABOUT_ATTR,
+    'ID': ID_ATTR,
+    'type': TYPE_ATTR,
+    'resource': RESOURCE_ATTR,
+    'parseType': PARSETYPE_ATTR,
+}
+
+# RDF terms that cannot be used as the name of node and property elements
+SYNTAX_TERMS = frozenset(RDF_NS + name for name in ('RDF', 'ID', 'about', 'parseType', 'resource', 'nodeID', 'datatype', 'aboutEach', 'aboutEachPrefix', 'bagID'))
+NODE_ELEMENT_EXCEPTIONS = SYNTAX_TERMS | frozenset((RDF_NS + 'li',))
+PROPERTY_ELEMENT_EXCEPTIONS = SYNTAX_TERMS | frozenset((RDF_NS + 'Description', RDF_NS + 'li'))
+
+
+class UnsupportedRDFXML(Exception):
+    pass
+
+
+class RDFXMLReader(object):
+
+    def __init__(self, index):
+        self._index = index
+        self._bnodes = {}
+
+    def read(self, doc):
+
+        if doc.tag != '{%s}RDF' % RDF_NS:
+            raise UnsupportedRDFXML('root element')
+
+        language = self._get_language(doc, None)
+        for element in self._get_children(doc):
+            self._read_node_element(element, language)
+
+    def _get_children(self, element):
+
+        for child in element:
+            if not isinstance(child.tag, string_types):
+                # Comments and processing instructions are ignored by rdflib
+                continue
+            yield child
+
+    def _get_language(self, element, inherited):
+
+        if BASE_ATTR in element.attrib:
+            # xml:base changes how URIs are resolved
+            raise UnsupportedRDFXML('xml:base')
+
+        return element.get(LANG_ATTR, inherited)
+
+    def _get_attributes(self, element):
+
+        attributes = []
+        for name, value in element.items():
+            if name.startswith('{'):
+                if name.startswith('{%s}' % XML_NS):
+                    continue
+            elif name[:3].lower() == 'xml':
+                continue
+            elif name in UNQUALIFIED_ATTRS:
+                name = UNQUALIFIED_ATTRS[name]
+            else:
+                raise UnsupportedRDFXML('unqualified attribute')
+
+            attributes.append((name, value))
+
+        return attributes
+
+    def _get_uri(self, value):
+
+        # Templates are parsed from strings, so there is no document base and
+        # rdflib keeps the URIs as written on the document (unless using
+        # xml:base, that is not supported)
+        return URIRef(value)
+
+    def _get_name_uri(self, element):
+
+        return self._expand_name(element.tag)
+
+    def _expand_name(self, name):
+
+        if not name.startswith('{'):
+            raise UnsupportedRDFXML('unqualified name')
+
+        return name[1:].replace('}', '', 1)
+
+    def _get_bnode(self, node_id):
+
+        if not is_ncname(node_id):
+            raise UnsupportedRDFXML('rdf:nodeID')
+
+        if node_id not in self._bnodes:
+            self._bnodes[node_id] = BNode()
+
+        return self._bnodes[node_id]
+
+    def _read_node_element(self, element, language):
+
+        language = self._get_language(element, language)
+        name = self._get_name_uri(element)
+        if name in NODE_ELEMENT_EXCEPTIONS:
+            raise UnsupportedRDFXML('node element name')
+
+        attributes = self._get_attributes(element)
+        values = dict(attributes)
+        if ID_ATTR in values:
+            raise UnsupportedRDFXML('rdf:ID')
+        elif NODEID_ATTR in values and ABOUT_ATTR in values:
+            raise UnsupportedRDFXML('rdf:nodeID and rdf:about')
+
+        if NODEID_ATTR in values:
+            subject = self._get_bnode(values[NODEID_ATTR])
+        elif ABOUT_ATTR in values:
+            subject = self._get_uri(values[ABOUT_ATTR])
+        else:
+            subject = BNode()
+
+        if name != RDF_DESCRIPTION:
+            self._index.add(subject, RDF_TYPE, self._get_uri(name))
+
+        for name, value in attributes:
+            if name in (ABOUT_ATTR, NODEID_ATTR):
+                continue
+            elif name == TYPE_ATTR:
+                self._index.add(subject, RDF_TYPE, self._get_uri(value))
+            elif name.startswith('{%s}' % RDF_NS):
+                raise UnsupportedRDFXML('rdf attribute')
+            else:
+                self._index.add(subject, URIRef(self._expand_name(name)), Literal(value, language))
+
+        for child in self._get_children(element):
+            self._read_property_element(subject, child, language)
+
+        return subject
+
+    def _read_property_element(self, subject, element, language):
+
+        language = self._get_language(element, language)
+        predicate = self._get_name_uri(element)
+        if predicate in PROPERTY_ELEMENT_EXCEPTIONS:
+            raise UnsupportedRDFXML('property element name')
+
+        attributes = dict(self._get_attributes(element))
+        children = list(self._get_children(element))
+
+        resource = attributes.pop(RESOURCE_ATTR, None)
+        node_id = attributes.pop(NODEID_ATTR, None)
+        parse_type = attributes.pop(PARSETYPE_ATTR, None)
+        datatype = attributes.pop(DATATYPE_ATTR, None)
+        if len(attributes) > 0:
+            # rdf:ID (reification) and property attributes
+            raise UnsupportedRDFXML('property element attributes')
+
+        if resource is not None or node_id is not None:
+            if len(children) > 0 or parse_type is not None or datatype is not None or (resource is not None and node_id is not None):
+                raise UnsupportedRDFXML('property element contents')
+
+            obj = self._get_uri(resource) if resource is not None else self._get_bnode(node_id)
+
+        elif parse_type is not None:
+            if parse_type != 'Resource' or datatype is not None:
+                raise UnsupportedRDFXML('rdf:parseType')
+
+            obj = BNode()
+            for child in children:
+                self._read_property_element(obj, child, language)
+
+        elif len(children) == 1 and datatype is None:
+            obj = self._read_node_element(children[0], language)
+
+        elif len(children) == 0 and len(element) == 0:
+            if datatype is not None:
+                obj = Literal(element.text or '', None, self._get_uri(datatype))
+            else:
+                obj = Literal(element.text or '', language)
+
+        else:
+            raise UnsupportedRDFXML('property element contents')
+
+        self._index.add(subject, URIRef(predicate), obj)
+
+
+def read_rdfxml(doc, index):
+    """
+    Adds the triples described by the RDF/XML document doc (a lxml tree) to
+    index. Raises UnsupportedRDFXML if the document uses RDF/XML constructs
+    not supported by this reader.
+    """
+    RDFXMLReader(index).read(doc)
@@ -20,21 +20,42 @@
 from __future__ import unicode_literals
 
 import codecs
+from io import BytesIO
 from lxml import etree
 import os
+import threading
 
 from django.utils.translation import ugettext as _
 from six import text_type
 
+from ...metrics import time_phase
 from ..base import parse_contacts_info, TemplateParseException
 from ..translation import get_trans_index
 from ..wiring import get_behaviour_skeleton, get_wiring_skeleton, parse_wiring_old_version
+from ..xpath import get_xpath_evaluator
 
 
-XMLSCHEMA_FILE = codecs.open(os.path.join(os.path.dirname(__file__), '../schemas/xml_schema.xsd'), 'rb')
-XMLSCHEMA_DOC = etree.parse(XMLSCHEMA_FILE)
-XMLSCHEMA_FILE.close()
-XMLSCHEMA = etree.XMLSchema(XMLSCHEMA_DOC)
+XMLSCHEMA_PATH = os.path.join(os.path.dirname(__file__), '../schemas/xml_schema.xsd')
+
+_xml_schema = None
+_xml_schema_lock = threading.Lock()
+
+
+def get_xml_schema():
+    """
+    Returns the compiled XML schema of the macdescription format. The schema
+    is compiled the first time it is needed and then reused
+    """
+    global _xml_schema
+
+    if _xml_schema is None:
+        with _xml_schema_lock:
+            if _xml_schema is None:
+                with codecs.open(XMLSCHEMA_PATH, 'rb') as xmlschema_file:
+                    _xml_schema = etree.XMLSchema(etree.parse(xmlschema_file))
+
+    return _xml_schema
+
 
 WIRECLOUD_TEMPLATE_NS = 'http://wirecloud.conwet.fi.upm.es/ns/macdescription/1'
 
@@ -131,7 +152,8 @@ class ApplicationMashupTemplateParser(object):
     def _init(self):
 
         try:
-            XMLSCHEMA.assertValid(self._doc)
+            with time_phase('xsd_validation'):
+                get_xml_schema().assertValid(self._doc)
         except Exception as e:
             raise TemplateParseException('%s' % e)
 
@@ -139,7 +161,7 @@ class ApplicationMashupTemplateParser(object):
         self._parse_basic_info()
 
     def _xpath(self, query, element):
-        return element.xpath(query, namespaces={'t': WIRECLOUD_TEMPLATE_NS})
+        return get_xpath_evaluator(query, WIRECLOUD_TEMPLATE_NS)(element)
 
     def get_xpath(self, query, element, required=True):
         elements = self._xpath(query, element)
@@ -638,3 +660,709 @@ class ApplicationMashupTemplateParser(object):
             self._parse_extra_info()
 
         return dict(self._info)
+
+
+MACDESCRIPTION_ELEMENTS = (
+    'altcontents', 'authors', 'behaviour', 'changelog', 'component', 'connection', 'contents', 'contributors',
+    'description', 'details', 'doc', 'email', 'embedded', 'endpoint', 'feature', 'homepage', 'image',
+    'inputendpoint', 'issuetracker', 'license', 'licenseurl', 'longdescription', 'msg', 'operator', 'option',
+    'outputendpoint', 'persistentvariables', 'position', 'preference', 'preferences', 'preferencevalue',
+    'rendering', 'requirements', 'resource', 'script', 'scripts', 'smartphoneimage', 'source', 'sourcehandle',
+    'sources', 'structure', 'tab', 'target', 'targethandle', 'targets', 'title', 'translation', 'translations',
+    'variable', 'variablevalue', 'visualdescription', 'wiring',
+)
+MACDESCRIPTION_TAGS = dict(('{%s}%s' % (WIRECLOUD_TEMPLATE_NS, name), name) for name in MACDESCRIPTION_ELEMENTS)
+PREFERENCEVALUE_TAG = '{%s}preferencevalue' % WIRECLOUD_TEMPLATE_NS
+VARIABLEVALUE_TAG = '{%s}variablevalue' % WIRECLOUD_TEMPLATE_NS
+POSITION_TAG = '{%s}position' % WIRECLOUD_TEMPLATE_NS
+RENDERING_TAG = '{%s}rendering' % WIRECLOUD_TEMPLATE_NS
+STRUCTURE_TAG = '{%s}structure' % WIRECLOUD_TEMPLATE_NS
+TAB_TAG = '{%s}tab' % WIRECLOUD_TEMPLATE_NS
+WIRING_TAG = '{%s}wiring' % WIRECLOUD_TEMPLATE_NS
+CONNECTION_TAG = '{%s}connection' % WIRECLOUD_TEMPLATE_NS
+OPERATOR_TAG = '{%s}operator' % WIRECLOUD_TEMPLATE_NS
+VISUALDESCRIPTION_TAG = '{%s}visualdescription' % WIRECLOUD_TEMPLATE_NS
+
+
+def _group_children(element):
+    """
+    Walks the child elements of element grouping them by local name (only
+    elements of the macdescription namespace are taken into account)
+    """
+    children = {}
+    for child in element:
+        name = MACDESCRIPTION_TAGS.get(child.tag)
+        if name is None:
+            continue
+
+        if name in children:
+            children[name].append(child)
+        else:
+            children[name] = [child]
+
+    return children
+
+
+class ApplicationMashupTreeWalkParser(ApplicationMashupTemplateParser):
+    """
+    Alternative engine for parsing macdescription documents. Instead of
+    running an XPath query for each field, the validated tree is walked once,
+    dispatching each element by its tag name. The resulting info is the same
+    returned by ApplicationMashupTemplateParser.
+    """
+
+    _root_children = None
+
+    def _init(self):
+
+        try:
+            with time_phase('xsd_validation'):
+                get_xml_schema().assertValid(self._doc)
+        except Exception as e:
+            raise TemplateParseException('%s' % e)
+
+        self._root_children = _group_children(self._doc)
+        self._resource_description = self._root_children.get('details', [])[0]
+        self._parse_basic_info()
+
+    def _get_first_child(self, children, name, required=True):
+        elements = children.get(name, ())
+
+        if len(elements) == 0 and required:
+            raise TemplateParseException('Missing %s element' % name)
+        elif len(elements) > 0:
+            return elements[0]
+        else:
+            return None
+
+    def _get_child_text(self, children, name):
+        elements = children.get(name, ())
+        if len(elements) == 1 and elements[0].text and len(elements[0].text.strip()) > 0:
+            return text_type(elements[0].text)
+        else:
+            return ''
+
+    def _parse_extra_info(self):
+        super(ApplicationMashupTreeWalkParser, self)._parse_extra_info()
+        self._root_children = None
+
+    def _parse_basic_info(self):
+
+        self._info['vendor'] = self._doc.get('vendor', '').strip()
+        self._info['name'] = self._doc.get('name', '').strip()
+        self._info['version'] = self._doc.get('version', '').strip()
+
+        details = _group_children(self._resource_description)
+
+        self._info['title'] = self._get_child_text(details, 'title')
+        self._add_translation_index(self._info['title'], type='resource', field='title')
+
+        self._info['description'] = self._get_child_text(details, 'description')
+        self._add_translation_index(self._info['description'], type='resource', field='description')
+        self._info['longdescription'] = self._get_child_text(details, 'longdescription')
+
+        self._info['authors'] = parse_contacts_info(self._get_child_text(details, 'authors'))
+        self._info['contributors'] = parse_contacts_info(self._get_child_text(details, 'contributors'))
+        self._info['email'] = self._get_child_text(details, 'email')
+        self._info['image'] = self._get_child_text(details, 'image')
+        self._info['smartphoneimage'] = self._get_child_text(details, 'smartphoneimage')
+        self._info['homepage'] = self._get_child_text(details, 'homepage')
+        self._info['doc'] = self._get_child_text(details, 'doc')
+        self._info['license'] = self._get_child_text(details, 'license')
+        self._info['licenseurl'] = self._get_child_text(details, 'licenseurl')
+        self._info['issuetracker'] = self._get_child_text(details, 'issuetracker')
+        self._info['changelog'] = self._get_child_text(details, 'changelog')
+        self._parse_requirements()
+
+    def _parse_requirements(self):
+
+        self._info['requirements'] = []
+        requirements_element = self._get_first_child(self._root_children, 'requirements', required=False)
+        if requirements_element is None:
+            return
+
+        for requirement in _group_children(requirements_element).get('feature', ()):
+            self._info['requirements'].append({
+                'type': 'feature',
+                'name': requirement.get('name').strip()
+            })
+
+    def _parse_visualdescription(self, visualdescription_element):
+
+        visualdescription = get_wiring_skeleton()['visualdescription']
+
+        children = _group_children(visualdescription_element)
+        self._parse_wiring_component_view_info(visualdescription, children)
+        self._parse_wiring_connection_view_info(visualdescription, children)
+        self._parse_wiring_behaviour_view_info(visualdescription, children)
+
+        return visualdescription
+
+    def _parse_wiring_behaviour_view_info(self, target, children):
+
+        for behaviour in children.get('behaviour', ()):
+
+            behaviour_info = get_behaviour_skeleton()
+            behaviour_info['title'] = behaviour.get('title')
+            behaviour_info['description'] = behaviour.get('description')
+
+            behaviour_children = _group_children(behaviour)
+            self._parse_wiring_component_view_info(behaviour_info, behaviour_children)
+            self._parse_wiring_connection_view_info(behaviour_info, behaviour_children)
+
+            target['behaviours'].append(behaviour_info)
+
+    def _get_endpoint_names(self, endpoint_groups):
+        names = []
+        for endpoint_group in endpoint_groups:
+            names.extend(endpoint.text for endpoint in _group_children(endpoint_group).get('endpoint', ()))
+
+        return names
+
+    def _parse_wiring_component_view_info(self, target, children):
+
+        for component in children.get('component', ()):
+            component_children = _group_children(component)
+            component_info = {
+                'collapsed': component.get('collapsed', 'false').strip().lower() == 'true',
+                'endpoints': {
+                    'source': self._get_endpoint_names(component_children.get('sources', ())),
+                    'target': self._get_endpoint_names(component_children.get('targets', ()))
+                }
+            }
+
+            position = self._get_first_child(component_children, 'position', required=False)
+            if position is not None:
+                component_info['position'] = {
+                    'x': int(position.get('x')),
+                    'y': int(position.get('y'))
+                }
+
+            target['components'][component.get('type')][component.get('id')] = component_info
+
+    def _parse_wiring_connection_view_info(self, target, children):
+
+        for connection in children.get('connection', ()):
+
+            connection_info = {
+                'sourcename': connection.get('sourcename'),
+                'targetname': connection.get('targetname'),
+            }
+
+            connection_children = _group_children(connection)
+            sourcehandle_element = self._get_first_child(connection_children, 'sourcehandle', required=False)
+            targethandle_element = self._get_first_child(connection_children, 'targethandle', required=False)
+
+            if sourcehandle_element is not None:
+                connection_info['sourcehandle'] = {
+                    'x': int(sourcehandle_element.get('x')),
+                    'y': int(sourcehandle_element.get('y'))
+                }
+            else:
+                connection_info['sourcehandle'] = 'auto'
+
+            if targethandle_element is not None:
+                connection_info['targethandle'] = {
+                    'x': int(targethandle_element.get('x')),
+                    'y': int(targethandle_element.get('y'))
+                }
+            else:
+                connection_info['targethandle'] = 'auto'
+
+            target['connections'].append(connection_info)
+
+    def _parse_wiring_endpoints(self):
+
+        if self._info['type'] == 'mashup':
+            self._info['wiring'] = get_wiring_skeleton()
+        else:
+            self._info['wiring'] = {}
+
+        self._info['wiring']['inputs'] = []
+        self._info['wiring']['outputs'] = []
+
+        wiring_element = self._get_first_child(self._root_children, 'wiring', required=False)
+        if wiring_element is None:
+            return
+
+        wiring_children = _group_children(wiring_element)
+
+        for slot in wiring_children.get('inputendpoint', ()):
+            self._add_translation_index(slot.get('label'), type='inputendpoint', variable=slot.get('name'))
+            self._add_translation_index(slot.get('actionlabel', ''), type='inputendpoint', variable=slot.get('name'))
+            self._add_translation_index(slot.get('description', ''), type='inputendpoint', variable=slot.get('name'))
+            self._info['wiring']['inputs'].append({
+                'name': slot.get('name'),
+                'type': slot.get('type'),
+                'label': slot.get('label', ''),
+                'description': slot.get('description', ''),
+                'actionlabel': slot.get('actionlabel', ''),
+                'friendcode': slot.get('friendcode', ''),
+            })
+
+        for event in wiring_children.get('outputendpoint', ()):
+            self._add_translation_index(event.get('label'), type='outputendpoint', variable=event.get('name'))
+            self._add_translation_index(event.get('description', ''), type='outputendpoint', variable=event.get('name'))
+            self._info['wiring']['outputs'].append({
+                'name': event.get('name'),
+                'type': event.get('type'),
+                'label': event.get('label', ''),
+                'description': event.get('description', ''),
+                'friendcode': event.get('friendcode', ''),
+            })
+
+    def _parse_wiring_info(self):
+
+        self._parse_wiring_endpoints()
+
+        if self._info['type'] == "mashup":
+
+            mashup_wiring_elements = self._get_root_grandchildren('structure', 'wiring')
+            if len(mashup_wiring_elements) == 0:
+                return
+
+            mashup_wiring_element = mashup_wiring_elements[0]
+            version = mashup_wiring_element.get('version', "1.0")
+
+            mashup_wiring_children = _group_children(mashup_wiring_element)
+            connections = [self._parse_wiring_connection(connection) for connection in mashup_wiring_children.get('connection', ())]
+
+            operators = {}
+            for operator in mashup_wiring_children.get('operator', ()):
+                operator_info = self._parse_wiring_operator(operator)
+                operators[operator_info['id']] = operator_info
+
+            visualdescription = None
+            if version == '2.0':
+                visualdescription_element = self._get_first_child(mashup_wiring_children, 'visualdescription', required=False)
+                if visualdescription_element is not None:
+                    visualdescription = self._parse_visualdescription(visualdescription_element)
+
+            self._set_mashup_wiring_info(version, connections, operators, visualdescription)
+
+    def _set_mashup_wiring_info(self, version, connections, operators, visualdescription):
+
+        self._info['wiring']['version'] = version
+        self._info['wiring']['connections'] = connections
+        self._info['wiring']['operators'] = operators
+
+        # Other wiring versions are kept as they are, as done by
+        # ApplicationMashupTemplateParser
+        if version == '1.0':
+            inputs = self._info['wiring']['inputs']
+            outputs = self._info['wiring']['outputs']
+            self._info['wiring'] = parse_wiring_old_version(self._info['wiring'])
+            self._info['wiring']['inputs'] = inputs
+            self._info['wiring']['outputs'] = outputs
+        elif version == '2.0' and visualdescription is not None:
+            self._info['wiring']['visualdescription'] = visualdescription
+
+    def _parse_wiring_connection(self, connection):
+
+        connection_children = _group_children(connection)
+        source_element = connection_children.get('source', [])[0]
+        target_element = connection_children.get('target', [])[0]
+
+        return {
+            'readonly': connection.get('readonly', 'false').lower() == 'true',
+            'source': {
+                'type': source_element.get('type'),
+                'endpoint': source_element.get('endpoint'),
+                'id': source_element.get('id'),
+            },
+            'target': {
+                'type': target_element.get('type'),
+                'endpoint': target_element.get('endpoint'),
+                'id': target_element.get('id'),
+            }
+        }
+
+    def _parse_wiring_operator(self, operator):
+
+        operator_info = {
+            'id': operator.get('id'),
+            'name': '/'.join((operator.get('vendor'), operator.get('name'), operator.get('version'))),
+            'preferences': {},
+        }
+
+        for pref in _group_children(operator).get('preferencevalue', ()):
+            operator_info['preferences'][pref.get('name')] = {
+                'readonly': pref.get('readonly', 'false').lower() == 'true',
+                'hidden': pref.get('hidden', 'false').lower() == 'true',
+                'value': pref.get('value'),
+            }
+
+        return operator_info
+
+    def _parse_widget_info(self):
+
+        self._parse_resource_preferences()
+        self._parse_resource_persistentvariables()
+        self._parse_wiring_info()
+
+        xhtml_element = self._root_children.get('contents', [])[0]
+        self._info['contents'] = {
+            'src': xhtml_element.get('src'),
+            'contenttype': xhtml_element.get('contenttype', 'text/html'),
+            'charset': xhtml_element.get('charset', 'utf-8'),
+            'useplatformstyle': xhtml_element.get('useplatformstyle', 'false').lower() == 'true',
+            'cacheable': xhtml_element.get('cacheable', 'true').lower() == 'true'
+        }
+
+        self._info['altcontents'] = []
+        for altcontents in _group_children(xhtml_element).get('altcontents', ()):
+            self._info['altcontents'].append({
+                'scope': altcontents.get('scope'),
+                'src': altcontents.get('src'),
+                'contenttype': altcontents.get('contenttype', 'text/html'),
+                'charset': altcontents.get('charset', 'utf-8')
+            })
+
+        rendering_element = self._get_first_child(self._root_children, 'rendering')
+        self._info['widget_width'] = rendering_element.get('width')
+        self._info['widget_height'] = rendering_element.get('height')
+
+    def _parse_operator_info(self):
+
+        self._parse_resource_preferences()
+        self._parse_resource_persistentvariables()
+        self._parse_wiring_info()
+
+        self._info['js_files'] = []
+        for scripts in self._root_children.get('scripts', ()):
+            for script in _group_children(scripts).get('script', ()):
+                self._info['js_files'].append(script.get('src'))
+
+    def _get_root_grandchildren(self, name, child_name):
+        elements = []
+        for element in self._root_children.get(name, ()):
+            elements.extend(_group_children(element).get(child_name, ()))
+
+        return elements
+
+    def _parse_resource_preferences(self):
+
+        self._info['preferences'] = []
+        for preference in self._get_root_grandchildren('preferences', 'preference'):
+            self._add_translation_index(preference.get('label'), type='vdef', variable=preference.get('name'), field='label')
+            self._add_translation_index(preference.get('description', ''), type='vdef', variable=preference.get('name'), field='description')
+            preference_info = {
+                'name': preference.get('name'),
+                'type': preference.get('type'),
+                'label': preference.get('label', ''),
+                'description': preference.get('description', ''),
+                'readonly': preference.get('readonly', 'false').lower() == 'true',
+                'default': preference.get('default', ''),
+                'value': preference.get('value'),
+                'secure': preference.get('secure', 'false').lower() == 'true',
+            }
+
+            if preference_info['type'] == 'list':
+                preference_info['options'] = []
+                for option_index, option in enumerate(_group_children(preference).get('option', ())):
+                    option_label = option.get('label', option.get('name'))
+                    self._add_translation_index(option_label, type='upo', variable=preference.get('name'), option=option_index)
+                    preference_info['options'].append({
+                        'label': option_label,
+                        'value': option.get('value'),
+                    })
+
+            self._info['preferences'].append(preference_info)
+
+    def _parse_resource_persistentvariables(self):
+
+        self._info['properties'] = []
+        for prop in self._get_root_grandchildren('persistentvariables', 'variable'):
+            self._add_translation_index(prop.get('label'), type='vdef', variable=prop.get('name'))
+            self._add_translation_index(prop.get('description', ''), type='vdef', variable=prop.get('name'))
+            self._info['properties'].append({
+                'name': prop.get('name'),
+                'type': prop.get('type'),
+                'label': prop.get('label', ''),
+                'description': prop.get('description', ''),
+                'default': prop.get('default', ''),
+                'secure': prop.get('secure', 'false').lower() == 'true',
+            })
+
+    def _parse_preference_values(self, children):
+        values = {}
+
+        for preference in children.get('preferencevalue', ()):
+            values[preference.get('name')] = preference.get('value')
+
+        return values
+
+    def _parse_mashup_params(self):
+
+        self._info['params'] = []
+        for param in self._get_root_grandchildren('preferences', 'preference'):
+            self._info['params'].append({
+                'name': param.get('name'),
+                'label': param.get('label'),
+                'type': param.get('type'),
+            })
+
+    def _parse_embedded_resources(self):
+
+        self._info['embedded'] = []
+        for resource in self._get_root_grandchildren('embedded', 'resource'):
+            self._info['embedded'].append({
+                'vendor': resource.get('vendor'),
+                'name': resource.get('name'),
+                'version': resource.get('version'),
+                'src': resource.get('src')
+            })
+
+    def _parse_tab(self, tab):
+
+        tab_children = _group_children(tab)
+
+        return {
+            'name': tab.get('name'),
+            'preferences': self._parse_preference_values(tab_children),
+            'resources': [self._parse_tab_resource(resource) for resource in tab_children.get('resource', ())],
+        }
+
+    def _parse_tab_resource(self, resource):
+
+        position = None
+        rendering = None
+        properties = {}
+        preferences = {}
+
+        for child in resource:
+            tag = child.tag
+            if tag == PREFERENCEVALUE_TAG:
+                preferences[child.get('name')] = {
+                    'readonly': child.get('readonly', 'false').lower() == 'true',
+                    'hidden': child.get('hidden', 'false').lower() == 'true',
+                    'value': child.get('value'),
+                }
+            elif tag == VARIABLEVALUE_TAG:
+                properties[child.get('name')] = {
+                    'readonly': child.get('readonly', 'false').lower() == 'true',
+                    'value': child.get('value'),
+                }
+            elif tag == POSITION_TAG and position is None:
+                position = child
+            elif tag == RENDERING_TAG and rendering is None:
+                rendering = child
+
+        if position is None:
+            raise TemplateParseException('Missing position element')
+
+        if rendering is None:
+            raise TemplateParseException('Missing rendering element')
+
+        return {
+            'id': resource.get('id'),
+            'name': resource.get('name'),
+            'vendor': resource.get('vendor'),
+            'version': resource.get('version'),
+            'title': resource.get('title'),
+            'readonly': resource.get('readonly', '').lower() == 'true',
+            'properties': properties,
+            'preferences': preferences,
+            'position': {
+                'x': position.get('x'),
+                'y': position.get('y'),
+                'z': position.get('z'),
+            },
+            'rendering': {
+                'fulldragboard': rendering.get('fulldragboard', 'false').lower() == 'true',
+                'minimized': rendering.get('minimized', 'false').lower() == 'true',
+                'width': rendering.get('width'),
+                'height': rendering.get('height'),
+                'layout': rendering.get('layout'),
+            },
+        }
+
+    def _parse_workspace_info(self):
+
+        workspace_structure = self._root_children.get('structure', [])[0]
+        structure_children = _group_children(workspace_structure)
+
+        self._info['preferences'] = self._parse_preference_values(structure_children)
+        self._parse_mashup_params()
+        self._parse_embedded_resources()
+        self._info['tabs'] = [self._parse_tab(tab) for tab in structure_children.get('tab', ())]
+        self._parse_wiring_info()
+
+    def _parse_translation_catalogue(self):
+
+        self._info['translations'] = {}
+        self._info['default_lang'] = 'en'
+        self._info['translation_index_usage'] = {}
+
+        translations = self._get_first_child(self._root_children, 'translations', required=False)
+
+        if translations is None:
+            return
+
+        missing_translations = []
+        extra_translations = set()
+
+        self._info['default_lang'] = translations.get('default')
+
+        for translation in _group_children(translations).get('translation', ()):
+            current_catalogue = {}
+
+            for msg in _group_children(translation).get('msg', ()):
+                if msg.get('name') not in self._translation_indexes:
+                    extra_translations.add(msg.get('name'))
+
+                current_catalogue[msg.get('name')] = msg.text
+
+            self._info['translations'][translation.get('lang')] = current_catalogue
+
+        if self._info['default_lang'] not in self._info['translations']:
+            raise TemplateParseException(_("There isn't a translation element for the default translation language: (%(default_lang)s)") % {'default_lang': self._info['default_lang']})
+
+        for index in self._translation_indexes:
+            if index not in self._info['translations'][self._info['default_lang']]:
+                missing_translations.append(index)
+
+        if len(missing_translations) > 0:
+            msg = _("The following translation indexes need a default value: %(indexes)s.")
+            raise TemplateParseException(msg % {'indexes': ', '.join(missing_translations)})
+
+        if len(extra_translations) > 0:
+            msg = _("The following translation indexes are not used: %(indexes)s.")
+            raise TemplateParseException(msg % {'indexes': ', '.join(extra_translations)})
+
+        self._info['translation_index_usage'] = self._translation_indexes
+
+
+class ApplicationMashupStreamingParser(ApplicationMashupTreeWalkParser):
+    """
+    Variant of the tree walk engine that parses the document incrementally
+    using iterparse. The tabs and the elements of the mashup wiring are
+    processed as soon as they are read and then dropped from the tree, so the
+    memory needed for parsing big mashups stays roughly flat in document size.
+    The template can be provided as a string or as a file-like object, but it
+    is not retained once parsed, so get_contents is not supported (see
+    TemplateParser.get_contents).
+    """
+
+    def __init__(self, template):
+
+        self._info = {}
+        self._translation_indexes = {}
+
+        if isinstance(template, bytes):
+            template = BytesIO(template)
+        elif isinstance(template, text_type):
+            template = BytesIO(template.encode('utf-8'))
+
+        self._events = etree.iterparse(template, events=('start', 'end'), schema=get_xml_schema())
+        event, self._doc = next(self._events)
+
+        root_element_qname = etree.QName(self._doc)
+        xmlns = root_element_qname.namespace
+
+        if xmlns is not None and xmlns != WIRECLOUD_TEMPLATE_NS:
+            raise TemplateParseException("Invalid namespace: " + xmlns)
+
+        if root_element_qname.localname not in ('widget', 'operator', 'mashup'):
+            raise TemplateParseException("Invalid root element: " + root_element_qname.localname)
+
+        self._info['type'] = root_element_qname.localname
+
+    def _init(self):
+
+        try:
+            try:
+                self._parse_stream()
+            except TemplateParseException:
+                # Schema violations are reported some events after reading
+                # the invalid element, give them precedence
+                for event, element in self._events:
+                    pass
+                raise
+        except etree.XMLSyntaxError as e:
+            # Errors found by the streaming validator have no line numbers
+            raise TemplateParseException('%s' % e.msg)
+        finally:
+            self._events = None
+
+        self._root_children = _group_children(self._doc)
+        self._resource_description = self._root_children.get('details', [])[0]
+        self._parse_basic_info()
+
+    def _parse_stream(self):
+
+        structure = None
+        mashup_wiring = None
+        visualdescription = None
+
+        self._structure_preferences = {}
+        self._tabs = []
+        self._wiring_version = None
+        self._connections = []
+        self._operators = {}
+        self._visualdescription = None
+
+        for event, element in self._events:
+
+            parent = element.getparent()
+
+            if event == 'start':
+                if parent is self._doc and element.tag == STRUCTURE_TAG and structure is None:
+                    structure = element
+                elif parent is structure and element.tag == WIRING_TAG and mashup_wiring is None:
+                    mashup_wiring = element
+                    self._wiring_version = element.get('version', '1.0')
+                elif parent is mashup_wiring and element.tag == VISUALDESCRIPTION_TAG and visualdescription is None and self._wiring_version == '2.0':
+                    visualdescription = element
+                    self._visualdescription = get_wiring_skeleton()['visualdescription']
+                continue
+
+            if parent is None:
+                continue
+
+            tag = element.tag
+            if parent is structure and tag == TAB_TAG:
+                self._tabs.append(self._parse_tab(element))
+            elif parent is structure and tag == PREFERENCEVALUE_TAG:
+                self._structure_preferences[element.get('name')] = element.get('value')
+            elif parent is mashup_wiring and tag == CONNECTION_TAG:
+                self._connections.append(self._parse_wiring_connection(element))
+            elif parent is mashup_wiring and tag == OPERATOR_TAG:
+                operator_info = self._parse_wiring_operator(element)
+                self._operators[operator_info['id']] = operator_info
+            elif parent is visualdescription and tag in MACDESCRIPTION_TAGS:
+                children = {MACDESCRIPTION_TAGS[tag]: [element]}
+                self._parse_wiring_component_view_info(self._visualdescription, children)
+                self._parse_wiring_connection_view_info(self._visualdescription, children)
+                self._parse_wiring_behaviour_view_info(self._visualdescription, children)
+            else:
+                continue
+
+            # Drop the processed subtree and any previous (already processed)
+            # sibling still attached to the tree
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+    def _parse_workspace_info(self):
+
+        self._info['preferences'] = self._structure_preferences
+        self._parse_mashup_params()
+        self._parse_embedded_resources()
+        self._info['tabs'] = self._tabs
+        self._parse_wiring_info()
+
+    def _parse_wiring_info(self):
+
+        self._parse_wiring_endpoints()
+
+        if self._info['type'] == "mashup" and self._wiring_version is not None:
+            self._set_mashup_wiring_info(self._wiring_version, self._connections, self._operators, self._visualdescription)
+
+    def _parse_extra_info(self):
+        super(ApplicationMashupStreamingParser, self)._parse_extra_info()
+        self._tabs = self._connections = self._operators = self._visualdescription = None
+
+    def get_contents(self):
+
+        raise TemplateParseException('The contents of templates parsed incrementally are not retained')
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compact representation of the structures repeated many times on the info
+returned by the template parsers (preferences, properties, endpoints, tab
+resources and connections). Each structure is stored using a record with
+__slots__ instead of a dict, sharing the tuple of keys between all the
+records with the same shape, so the original dicts can be rebuilt without
+losing keys nor their order.
+"""
+
+from __future__ import unicode_literals
+
+import six
+
+from ..frozen import FrozenList
+
+
+# Shared key tuples, indexed by themselves
+_KEY_ORDERS = {}
+
+
+def _intern_keys(keys):
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+def _export(value):
+
+    if isinstance(value, Record):
+        return value.to_dict()
+    elif isinstance(value, (FrozenList, list)):
+        return [_export(item) for item in value]
+    elif isinstance(value, dict):
+        return {key: _export(item) for key, item in six.iteritems(value)}
+
+    return value
+
+
+def _record_field(record_class):
+
+    def convert(value):
+        return record_class.from_dict(value) if isinstance(value, dict) else value
+
+    return convert
+
+
+def _record_list_field(record_class):
+
+    def convert(value):
+        if not isinstance(value, (FrozenList, list)):
+            return value
+
+        return FrozenList(record_class.from_dict(item) if isinstance(item, dict) else item for item in value)
+
+    return convert
+
+
+def _record_dict_field(record_class):
+
+    def convert(value):
+        if not isinstance(value, dict):
+            return value
+
+        return {key: record_class.from_dict(item) if isinstance(item, dict) else item for key, item in six.iteritems(value)}
+
+    return convert
+
+
+class Record(object):
+    """
+    Base class of the compact records. Subclasses list the known keys on
+    __slots__ and can provide converters for the values of some of them.
+    Unknown keys are stored on a separated dict.
+    """
+
+    __slots__ = ('_keys', '_extra')
+
+    # key -> function converting the value of the key
+    converters = {}
+
+    @classmethod
+    def from_dict(cls, data):
+
+        record = cls.__new__(cls)
+        extra = None
+        for key, value in six.iteritems(data):
+            if key in cls.__slots__:
+                converter = cls.converters.get(key)
+                setattr(record, key, value if converter is None else converter(value))
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+
+        record._keys = _intern_keys(tuple(data))
+        record._extra = extra
+        return record
+
+    def to_dict(self):
+        return {key: _export(self[key]) for key in self._keys}
+
+    def __getitem__(self, key):
+
+        if key in self.__slots__:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join('%s=%r' % (key, self[key]) for key in self._keys))
+
+
+class Option(Record):
+
+    __slots__ = ('label', 'value')
+
+
+class Preference(Record):
+
+    __slots__ = ('name', 'type', 'label', 'description', 'readonly', 'default', 'value', 'secure', 'options')
+
+    converters = {
+        'options': _record_list_field(Option),
+    }
+
+
+class Property(Record):
+
+    __slots__ = ('name', 'type', 'label', 'description', 'default', 'secure')
+
+
+class Endpoint(Record):
+
+    __slots__ = ('name', 'type', 'label', 'description', 'actionlabel', 'friendcode')
+
+
+class ConnectionEndpoint(Record):
+
+    __slots__ = ('type', 'id', 'endpoint')
+
+
+class Connection(Record):
+
+    __slots__ = ('readonly', 'source', 'target')
+
+    converters = {
+        'source': _record_field(ConnectionEndpoint),
+        'target': _record_field(ConnectionEndpoint),
+    }
+
+
+class Position(Record):
+
+    __slots__ = ('x', 'y', 'z')
+
+
+class Rendering(Record):
+
+    __slots__ = ('width', 'height', 'layout', 'minimized', 'fulldragboard')
+
+
+class VariableValue(Record):
+
+    __slots__ = ('value', 'readonly', 'hidden')
+
+
+class TabResource(Record):
+
+    __slots__ = ('id', 'vendor', 'name', 'version', 'title', 'readonly', 'properties', 'preferences', 'position', 'rendering')
+
+    converters = {
+        'properties': _record_dict_field(VariableValue),
+        'preferences': _record_dict_field(VariableValue),
+        'position': _record_field(Position),
+        'rendering': _record_field(Rendering),
+    }
+
+
+def compact_resource_info(info):
+    """
+    Returns a copy of info (as returned by TemplateParser.get_resource_info)
+    using records for storing its preferences, properties, wiring endpoints,
+    connections and tab resources. The rest of the structure is shared with
+    info.
+    """
+
+    compact = dict(info)
+
+    if isinstance(info.get('preferences'), (FrozenList, list)):
+        compact['preferences'] = _record_list_field(Preference)(info['preferences'])
+    if isinstance(info.get('properties'), (FrozenList, list)):
+        compact['properties'] = _record_list_field(Property)(info['properties'])
+
+    if isinstance(info.get('wiring'), dict):
+        wiring = compact['wiring'] = dict(info['wiring'])
+        for key, record_class in (('inputs', Endpoint), ('outputs', Endpoint), ('connections', Connection)):
+            if key in wiring:
+                wiring[key] = _record_list_field(record_class)(wiring[key])
+
+    if isinstance(info.get('tabs'), (FrozenList, list)):
+        compact['tabs'] = FrozenList(
+            dict(tab, resources=_record_list_field(TabResource)(tab['resources'])) if isinstance(tab, dict) and 'resources' in tab else tab
+            for tab in info['tabs']
+        )
+
+    return compact
+
+
+def expand_resource_info(compact):
+    """
+    Returns the info described by compact (as returned by
+    compact_resource_info) using the usual dict based structure. The
+    returned info is a new copy.
+    """
+
+    return _export(compact)
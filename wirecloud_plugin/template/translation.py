@@ -1,6 +1,9 @@
 import re
 
 
+TRANS_TOKEN = '__MSG_%s__'
+
+
 def get_trans_index(value):
     """Checks if the string received as argument is a translation index"""
     if type(value).__name__ == "str" or type(value).__name__ == "unicode":
@@ -10,6 +13,70 @@ def get_trans_index(value):
     return None
 
 
+def compile_trans_pattern(indexes):
+    """Returns a regex matching the translation tokens of the given indexes"""
+    # Longest indexes first, so tokens are not matched by one of their prefixes
+    alternatives = '|'.join(re.escape(index) for index in sorted(indexes, key=len, reverse=True))
+    return re.compile('__MSG_(%s)__' % alternatives)
+
+
+def split_trans_tokens(text, pattern):
+    """
+    Splits text into a list alternating literal strings (even positions) and
+    translation indexes (odd positions). Returns None if text does not
+    contain any translation token matched by pattern.
+    """
+    segments = pattern.split(text)
+    return segments if len(segments) > 1 else None
+
+
+def render_trans_tokens(segments, translation):
+    """
+    Builds the string described by segments, replacing each translation
+    index by its value in translation. Indexes not available in translation
+    are left untouched.
+    """
+    parts = list(segments)
+    for i in range(1, len(parts), 2):
+        index = parts[i]
+        parts[i] = translation[index] if index in translation else TRANS_TOKEN % index
+    return ''.join(parts)
+
+
+class TranslationPlan(object):
+    """
+    Precompiled substitution of the translation tokens found in a set of
+    target strings. Each target string is split once into literal strings and
+    translation indexes, so translating it is a single join using one dict
+    lookup per token.
+    """
+
+    def __init__(self):
+        self._targets = []
+        self._patterns = {}
+
+    def add_target(self, key, text, indexes):
+        """
+        Registers text as a target identified by key. Only the tokens of the
+        given indexes will be translated.
+        """
+        indexes = frozenset(indexes)
+        if indexes not in self._patterns:
+            self._patterns[indexes] = compile_trans_pattern(indexes)
+
+        segments = split_trans_tokens(text, self._patterns[indexes])
+        if segments is not None:
+            self._targets.append((key, segments))
+
+    def apply(self, translation):
+        """Returns the (key, translated text) pair of each target containing translation tokens"""
+        return [(key, render_trans_tokens(segments, translation)) for key, segments in self._targets]
+
+
 def replace_trans_index(index, value, text):
 
-    return text.replace('__MSG_' + index + '__', value)
+    segments = split_trans_tokens(text, compile_trans_pattern((index,)))
+    if segments is None:
+        return text
+
+    return render_trans_tokens(segments, {index: value})
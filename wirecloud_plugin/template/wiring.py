@@ -19,6 +19,9 @@
 
 from __future__ import unicode_literals
 
+import six
+
+
 def get_endpoint_name(endpoint):
     return "%s/%s/%s" % (endpoint['type'], endpoint['id'], endpoint['endpoint'])
 
@@ -150,3 +153,123 @@ def parse_wiring_old_version(wiring_status):
                 new_version['visualdescription']['components']['widget'][widget_id]['name'] = widget['name']
 
     return new_version
+
+
+def get_component_instance_name(component_type, component_id):
+    return "%s/%s" % (component_type, component_id)
+
+
+class WiringValidator(object):
+    """
+    Checks the connections of the wiring of a mashup (as returned by
+    TemplateParser.get_resource_info). Component instances and endpoints are
+    indexed using hashes (keyed by get_endpoint_name), so all the
+    connections are checked in linear time.
+
+    components is an optional mapping from component ids
+    (vendor/name/version) to the info of those components. The endpoints of
+    the component instances are only checked when their info is available.
+    """
+
+    def __init__(self, info, components=None):
+        self._components = components if components is not None else {}
+        self._component_endpoints = {}
+
+        # instance name -> component id
+        self._instances = {}
+        # instances whose endpoints are known
+        self._checked_instances = set()
+        self._sources = set()
+        self._targets = set()
+
+        for tab in info.get('tabs', ()):
+            for resource in tab['resources']:
+                component_id = '/'.join((resource['vendor'], resource['name'], resource['version']))
+                self._add_instance('widget', resource['id'], component_id)
+
+        for operator_id, operator in six.iteritems(info['wiring'].get('operators', {})):
+            self._add_instance('operator', operator_id, operator['name'])
+
+        self._connections = info['wiring'].get('connections', ())
+
+    def _get_component_endpoints(self, component_id):
+
+        try:
+            return self._component_endpoints[component_id]
+        except KeyError:
+            pass
+
+        component = self._components.get(component_id)
+        if component is None:
+            endpoints = None
+        else:
+            endpoints = (
+                [endpoint['name'] for endpoint in component['wiring']['outputs']],
+                [endpoint['name'] for endpoint in component['wiring']['inputs']],
+            )
+
+        self._component_endpoints[component_id] = endpoints
+        return endpoints
+
+    def _add_instance(self, component_type, component_id, resource_id):
+
+        instance_name = get_component_instance_name(component_type, component_id)
+        self._instances[instance_name] = resource_id
+
+        endpoints = self._get_component_endpoints(resource_id)
+        if endpoints is None:
+            return
+
+        self._checked_instances.add(instance_name)
+        outputs, inputs = endpoints
+        self._sources.update(get_endpoint_name({'type': component_type, 'id': component_id, 'endpoint': name}) for name in outputs)
+        self._targets.update(get_endpoint_name({'type': component_type, 'id': component_id, 'endpoint': name}) for name in inputs)
+
+    def _check_endpoint(self, endpoint, name, endpoints):
+
+        instance_name = get_component_instance_name(endpoint['type'], endpoint['id'])
+        if instance_name not in self._instances:
+            return 'missing component instance'
+        elif instance_name in self._checked_instances and name not in endpoints:
+            return 'missing endpoint'
+
+    def validate(self):
+        """
+        Returns a list describing the issues found on the connections:
+        dangling connections (connecting component instances or endpoints
+        not available) and duplicated connections.
+        """
+
+        issues = []
+        connections = {}
+
+        for index, connection in enumerate(self._connections):
+            sourcename = get_endpoint_name(connection['source'])
+            targetname = get_endpoint_name(connection['target'])
+
+            for side, name, endpoints in (('source', sourcename, self._sources), ('target', targetname, self._targets)):
+                reason = self._check_endpoint(connection[side], name, endpoints)
+                if reason is not None:
+                    issues.append({
+                        'issue': 'dangling',
+                        'connection': index,
+                        'side': side,
+                        'endpoint': name,
+                        'reason': reason,
+                    })
+
+            first = connections.setdefault((sourcename, targetname), index)
+            if first != index:
+                issues.append({
+                    'issue': 'duplicated',
+                    'connection': index,
+                    'duplicate_of': first,
+                    'sourcename': sourcename,
+                    'targetname': targetname,
+                })
+
+        return issues
+
+
+def validate_wiring(info, components=None):
+    return WiringValidator(info, components).validate()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import threading
+
+from lxml import etree
+
+
+# lxml serializes the evaluations of each XPath object using a lock, so every
+# thread compiles and reuses its own evaluators
+_evaluators = threading.local()
+
+
+def get_xpath_evaluator(query, namespace):
+    """
+    Returns a compiled XPath evaluator for the given query. The "t" prefix
+    used in the queries is bound to namespace, if namespace is None the
+    prefix is removed from the query instead.
+    """
+    try:
+        cache = _evaluators.cache
+    except AttributeError:
+        cache = _evaluators.cache = {}
+
+    try:
+        return cache[(query, namespace)]
+    except KeyError:
+        pass
+
+    if namespace is not None:
+        evaluator = etree.XPath(query, namespaces={'t': namespace})
+    else:
+        evaluator = etree.XPath(query.replace('t:', ''))
+
+    cache[(query, namespace)] = evaluator
+    return evaluator
@@ -23,6 +23,36 @@ from shutil import rmtree
 from six.moves.urllib.request import pathname2url
 import zipfile
 
+from django.conf import settings
+
+from .metrics import time_phase
+
+
+DEFAULT_MAX_MEMBER_SIZE = 100 * 1024 * 1024
+DEFAULT_MAX_TOTAL_SIZE = 500 * 1024 * 1024
+DEFAULT_MAX_COMPRESSION_RATIO = 100
+# Members smaller than this size (in bytes) are not checked against the
+# maximum compression ratio, as small text files can be highly compressed
+COMPRESSION_RATIO_MIN_SIZE = 1024 * 1024
+EXTRACT_CHUNK_SIZE = 64 * 1024
+
+
+def get_wgt_limits():
+    """
+    Returns the configured (max_member_size, max_total_size,
+    max_compression_ratio) limits applied to the wgt files. The default
+    limits are used if Django settings are not configured.
+    """
+
+    if not settings.configured:
+        return DEFAULT_MAX_MEMBER_SIZE, DEFAULT_MAX_TOTAL_SIZE, DEFAULT_MAX_COMPRESSION_RATIO
+
+    return (
+        getattr(settings, 'WIRECLOUD_PLUGIN_WGT_MAX_MEMBER_SIZE', DEFAULT_MAX_MEMBER_SIZE),
+        getattr(settings, 'WIRECLOUD_PLUGIN_WGT_MAX_TOTAL_SIZE', DEFAULT_MAX_TOTAL_SIZE),
+        getattr(settings, 'WIRECLOUD_PLUGIN_WGT_MAX_COMPRESSION_RATIO', DEFAULT_MAX_COMPRESSION_RATIO),
+    )
+
 
 class InvalidContents(Exception):
 
@@ -38,14 +68,87 @@ class WgtFile(object):
 
     _template_filename = 'config.xml'
 
-    def __init__(self, _file):
-        self._zip = zipfile.ZipFile(_file)
-        for filename in self._zip.namelist():
-            normalized_filename = os.path.normpath(filename)
-            if normalized_filename.startswith('../'):
-                raise ValueError('Invalid file name: %s', filename)
-            if normalized_filename.startswith('/'):
-                raise ValueError('Invalid absolute file name: %s', filename)
+    def __init__(self, _file, max_member_size=None, max_total_size=None, max_compression_ratio=None):
+
+        limits = get_wgt_limits()
+        if max_member_size is None:
+            max_member_size = limits[0]
+        if max_total_size is None:
+            max_total_size = limits[1]
+        if max_compression_ratio is None:
+            max_compression_ratio = limits[2]
+
+        self.max_member_size = max_member_size
+        self.max_total_size = max_total_size
+        self.max_compression_ratio = max_compression_ratio
+
+        with time_phase('open_wgt'):
+            self._zip = zipfile.ZipFile(_file)
+            try:
+                for filename in self._zip.namelist():
+                    normalized_filename = os.path.normpath(filename)
+                    if normalized_filename.startswith('../'):
+                        raise ValueError('Invalid file name: %s' % filename)
+                    if normalized_filename.startswith('/'):
+                        raise ValueError('Invalid absolute file name: %s' % filename)
+
+                self._check_sizes()
+            except:
+                # Rejected wgt files are not returned to the caller
+                self._zip.close()
+                raise
+
+    def _check_sizes(self):
+        # The sizes declared on the central directory are checked before
+        # decompressing anything. As members are never decompressed beyond
+        # their declared size, this also bounds the memory and disk space
+        # used when reading or extracting them
+        total_size = 0
+        for member in self._zip.infolist():
+            if member.file_size > self.max_member_size:
+                raise InvalidContents('The file %s of the wgt file exceeds the maximum size (%d bytes)' % (member.filename, self.max_member_size))
+
+            if member.file_size > COMPRESSION_RATIO_MIN_SIZE and member.file_size > member.compress_size * self.max_compression_ratio:
+                raise InvalidContents('The file %s of the wgt file exceeds the maximum compression ratio (%d)' % (member.filename, self.max_compression_ratio))
+
+            total_size += member.file_size
+            if total_size > self.max_total_size:
+                raise InvalidContents('The contents of the wgt file exceed the maximum size (%d bytes)' % self.max_total_size)
+
+    def _iter_member(self, name):
+        """
+        Yields the decompressed contents of the given member in chunks,
+        failing if it is bigger than the size declared for it
+        """
+        member = self._zip.getinfo(name)
+        remaining = member.file_size
+
+        member_file = self._zip.open(member)
+        try:
+            while True:
+                try:
+                    chunk = member_file.read(min(EXTRACT_CHUNK_SIZE, remaining + 1))
+                except zipfile.BadZipfile as e:
+                    # e.g. the CRC of the decompressed data does not match,
+                    # as the data was truncated to the declared size
+                    raise InvalidContents('The file %s of the wgt file is corrupted' % name, details='%s' % e)
+
+                if len(chunk) == 0:
+                    break
+
+                remaining -= len(chunk)
+                if remaining < 0:
+                    raise InvalidContents('The file %s of the wgt file is bigger than the size declared for it' % name)
+
+                yield chunk
+        finally:
+            member_file.close()
+
+    def _extract_member(self, name, output_path):
+
+        with open(output_path, 'wb') as f:
+            for chunk in self._iter_member(name):
+                f.write(chunk)
 
     @property
     def namelist(self):
@@ -55,7 +158,7 @@ class WgtFile(object):
         return self._zip.fp
 
     def read(self, path):
-        return self._zip.read(path)
+        return b''.join(self._iter_member(path))
 
     def get_template(self):
         try:
@@ -64,15 +167,14 @@ class WgtFile(object):
             raise InvalidContents('Missing config.xml at the root of the zipfile (wgt)')
 
     def extract_file(self, file_name, output_path, recreate_=False):
-        contents = self.read(file_name)
+        # Fail before creating any directory if the file is not available
+        self._zip.getinfo(file_name)
 
         dir_path = os.path.dirname(output_path)
         if not os.path.exists(dir_path):
             os.makedirs(dir_path)
 
-        f = open(output_path, 'wb')
-        f.write(contents)
-        f.close()
+        self._extract_member(file_name, output_path)
 
     def extract_localized_files(self, file_name, output_dir):
 
@@ -111,9 +213,7 @@ class WgtFile(object):
                     folder += os.sep + namedir.replace("/", os.sep)
                     if not os.path.exists(folder) or not os.path.isdir(folder):
                         os.mkdir(folder)
-                outfile = open(os.path.join(output_path, local_name.replace("/", os.sep)), 'wb')
-                outfile.write(self._zip.read(name))
-                outfile.close()
+                self._extract_member(name, os.path.join(output_path, local_name.replace("/", os.sep)))
 
     def extract(self, path):
 
@@ -134,9 +234,7 @@ class WgtFile(object):
                     folder += os.sep + namedir.replace("/", os.sep)
                     if not os.path.exists(folder) or not os.path.isdir(folder):
                         os.mkdir(folder)
-                outfile = open(os.path.join(path, name.replace("/", os.sep)), 'wb')
-                outfile.write(self._zip.read(name))
-                outfile.close()
+                self._extract_member(name, os.path.join(path, name.replace("/", os.sep)))
 
     def close(self):
         self._zip.close()
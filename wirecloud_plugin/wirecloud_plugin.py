@@ -20,47 +20,35 @@
 from __future__ import unicode_literals
 
 import os
-import urllib
 import base64
 from io import BytesIO
 
-import requests
-
 from django.conf import settings
 
 from wstore.asset_manager.resource_plugins.plugin import Plugin
 from wstore.store_commons.utils.version import Version
+from .catalog import update_product_spec
+from .cache import get_parse_cache, hash_wgt_file, ParsedResource
+from .download import download_wgt
+from .metrics import inc, time_phase
+from .parse_pool import get_parse_pool
+from .persistent_cache import get_persistent_parse_cache
 from .wgt import WgtFile, InvalidContents
 from .template import TemplateParser, TemplateParseException
 
 
 class WirecloudPlugin(Plugin):
 
-    _tmp_files = []
-    _template_parser = None
+    # Plugin instances are shared by concurrent requests, so all the state
+    # of a hook invocation must be kept in local variables
 
-    def _download_wgt(self, url, name):
+    def _download_wgt(self, url):
         """
-        Downloads a wgt file for a given location and saves it in
-        a temporal file
+        Downloads a wgt file for a given location into a private spooled
+        temporal file
         """
-        tmp_path = os.path.join(settings.BASEDIR, 'tmp')
-
-        if not os.path.isdir(tmp_path):
-            os.mkdir(tmp_path)
-
-        file_name = name + '_tmp.wgt'
-        wgt_path = os.path.join(tmp_path, file_name)
-
-        try:
-            urllib.urlretrieve(url, wgt_path)
-        except:
-            # The URL is not valid
-            raise ValueError('The URL provided is not valid: does not exists')
-
-        self._tmp_files.append(wgt_path)
-
-        return wgt_path
+        with time_phase('download'):
+            return download_wgt(url)
 
     def _build_template_parser(self, wgt_file):
         # Get template file
@@ -69,19 +57,63 @@ class WirecloudPlugin(Plugin):
 
         return template_parser
 
-    def _get_template_parser(self, download_link, resource_path, name):
-        if download_link != '':
-            wgt_path = self._download_wgt(download_link, name)
-        else:
-            # Build wgt object from path
-            content_path = resource_path
+    def _get_local_path(self, resource_path):
+        content_path = resource_path
 
-            if resource_path[0] == '/':
-                content_path = resource_path[1:]
+        if resource_path[0] == '/':
+            content_path = resource_path[1:]
 
-            wgt_path = os.path.join(settings.BASEDIR, content_path)
+        return os.path.join(settings.BASEDIR, content_path)
 
-        return self._build_template_parser(WgtFile(wgt_path))
+    def _parse_wgt(self, wgt_source):
+        wgt_file = WgtFile(wgt_source)
+        try:
+            parse_pool = get_parse_pool()
+            if parse_pool is not None:
+                with time_phase('parse'):
+                    result = parse_pool.parse(wgt_file.get_template())
+                return ParsedResource(result['resource_type'], result['info'])
+
+            template_parser = self._build_template_parser(wgt_file)
+            return ParsedResource(template_parser.get_resource_type(), template_parser.get_frozen_resource_info())
+        finally:
+            wgt_file.close()
+
+    def _get_parsed_resource(self, download_link, resource_path):
+        """
+        Returns the parsed info of the wgt file, reusing previous parsing
+        results for the same wgt contents when available
+        """
+        downloaded_wgt = None
+
+        try:
+            if download_link != '':
+                downloaded_wgt = self._download_wgt(download_link)
+                wgt_source = downloaded_wgt.file
+                wgt_hash = downloaded_wgt.hash
+            else:
+                # Build wgt object from path
+                wgt_source = self._get_local_path(resource_path)
+                wgt_hash = hash_wgt_file(wgt_source)
+
+            def parse():
+                inc('wirecloud_plugin_parse_cache_misses_total', 'Number of wgt files not found on the parse cache')
+
+                persistent_cache = get_persistent_parse_cache()
+                if persistent_cache is None:
+                    return self._parse_wgt(wgt_source)
+
+                def parse_and_store():
+                    inc('wirecloud_plugin_persistent_cache_misses_total', 'Number of wgt files not found on the persistent parse cache')
+                    return self._parse_wgt(wgt_source)
+
+                return persistent_cache.get_or_set(wgt_hash, parse_and_store)
+
+            inc('wirecloud_plugin_parse_cache_requests_total', 'Number of wgt files requested to the parse cache')
+            return get_parse_cache().get_or_set(wgt_hash, parse)
+        finally:
+            if downloaded_wgt is not None:
+                downloaded_wgt.close()
 
     def _get_template_parser_from_data(self, wgt_data):
             wgt_file = WgtFile(BytesIO(base64.b64decode(wgt_data['data'])))
@@ -91,17 +123,7 @@ class WirecloudPlugin(Plugin):
         wgt_file = WgtFile(wgt)
         return self._build_template_parser(wgt_file)
 
-    def _remove_tmp_files(self):
-        # Remote tmp file if needed
-        for tmp in self._tmp_files:
-            try:
-                os.remove(tmp)
-            except:
-                pass
-
-        self._tmp_files = []
-
-    def _get_media_type(self):
+    def _get_media_type(self, mac_type):
         # Include widget type
         valid_types = {
             'widget': 'wirecloud/widget',
@@ -109,7 +131,6 @@ class WirecloudPlugin(Plugin):
             'operator': 'wirecloud/operator'
         }
 
-        mac_type = self._template_parser.get_resource_type()
         return valid_types[mac_type]
 
     def _get_paths(self, asset):
@@ -127,7 +148,7 @@ class WirecloudPlugin(Plugin):
         local_path, ext_url = self._get_paths(asset)
 
         try:
-            self._template_parser = self._get_template_parser(ext_url, local_path, asset.pk)
+            self._get_parsed_resource(ext_url, local_path)
         except InvalidContents as e:
             raise e
         except TemplateParseException as e:
@@ -137,8 +158,6 @@ class WirecloudPlugin(Plugin):
         except:
             raise Exception("The Wirecloud resource could not be created")
 
-        self._remove_tmp_files()
-
     def on_post_product_spec_attachment(self, asset, asset_t, product_spec):
         def changeMediaType(spec, media):
             if spec.get("name") == "Media type":
@@ -146,30 +165,17 @@ class WirecloudPlugin(Plugin):
             return spec
 
         local_path, ext_url = self._get_paths(asset)
-        self._template_parser = self._get_template_parser(ext_url, local_path, asset.pk)
+        parsed_resource = self._get_parsed_resource(ext_url, local_path)
 
-        media_type = self._get_media_type()
+        media_type = self._get_media_type(parsed_resource.resource_type)
 
         asset.content_type = media_type
-        asset.meta_info = self._template_parser.get_resource_info()
+        asset.meta_info = parsed_resource.get_resource_info()
 
-        asset.save()
+        with time_phase('asset_save'):
+            asset.save()
 
         # Update product specification
 
         product_spec["productSpecCharacteristic"] = [changeMediaType(x, media_type) for x in product_spec["productSpecCharacteristic"]]
-        headers = {
-            'content-type': 'application/json',
-            'X-Nick-Name': settings.STORE_NAME,
-            'X-Roles': 'provider',
-            'X-Email': settings.WSTOREMAIL
-        }
-
-        url = settings.CATALOG
-        if not url.endswith("/"):
-            url += "/"
-        url += "api/catalogManagement/v2/productSpecification/{}".format(product_spec["id"])
-
-        requests.put(url, json=product_spec, headers=headers)
-
-        self._remove_tmp_files()
+        update_product_spec(product_spec)